@@ -0,0 +1,79 @@
+# Constant-time weighted sampling with Walker's alias method.
+# Usage:
+#   table = AliasTable(weights)
+#   buffer = RandomBuffer()
+#   i = table.draw(buffer.next())       # index i with probability weights[i] / sum
+#   indices = table.drawMany(np.random.random_sample(n))
+
+import numpy as np
+
+class AliasTable():
+
+    def __init__(self, weights):
+        """
+        Builds the table (Vose's method) for nonnegative |weights|. If they
+        sum to 0, every index is equally likely.
+        """
+        weights = np.asarray(weights, dtype=float)
+        self.n = len(weights)
+        total = weights.sum()
+        if self.n and total <= 0:
+            weights = np.ones(self.n)
+            total = float(self.n)
+        scaled = (weights * self.n / total).tolist() if self.n else []
+        prob = [1.0] * self.n
+        alias = range(self.n)
+        small = [i for i in range(self.n) if scaled[i] < 1.0]
+        large = [i for i in range(self.n) if scaled[i] >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        # whatever is left is 1 up to rounding
+
+        # Python lists for scalar draws, arrays for vectorized ones.
+        self.prob = prob
+        self.alias = alias
+        self.probArray = np.array(prob, dtype=float)
+        self.aliasArray = np.array(alias, dtype=np.int64)
+
+    def draw(self, u):
+        """
+        Returns an index drawn with the uniform number |u| in [0, 1).
+        """
+        x = u * self.n
+        i = min(int(x), self.n - 1)
+        return i if x - i < self.prob[i] else self.alias[i]
+
+    def drawMany(self, u):
+        """
+        Returns an array of indices, one for each uniform number in |u|.
+        """
+        x = u * self.n
+        i = np.minimum(x.astype(np.int64), self.n - 1)
+        return np.where(x - i < self.probArray[i], i, self.aliasArray[i])
+
+class RandomBuffer():
+
+    def __init__(self, size = 4096):
+        """
+        Uniform numbers from np.random, drawn |size| at a time, so a search
+        pays for one numpy call per |size| draws.
+        """
+        self.size = size
+        self.buffer = []
+        self.index = 0
+
+    def next(self):
+        if self.index == len(self.buffer):
+            self.buffer = np.random.random_sample(self.size).tolist()
+            self.index = 0
+        u = self.buffer[self.index]
+        self.index += 1
+        return u
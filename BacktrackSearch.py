@@ -3,12 +3,127 @@
 #   search = BacktrackingSearch()
 #   search.solve(csp)
 
+import os
+import cPickle as pickle
 import numpy as np
 import random
+import heapq
+import time
+from AliasSampler import AliasTable, RandomBuffer
+from BranchAndBoundSearch import KnapsackBound
+from LineupSet import LineupSet
+from PlayerTable import ensurePlayerTable
+
+class LinearBoundIndex():
+    """
+    Bound propagation for one LinearConstraint of the CSP, such as the
+    salary cap. Built once per solve, it holds each constrained variable's
+    domain (rows of the player table) sorted by the constrained attribute,
+    with the smallest and largest value of each. Given the running total of
+    the assigned variables and the min/max sums of the unassigned ones, it
+    returns the slice of a domain whose values can still lead to a total in
+    [lower, upper].
+    """
+
+    def __init__(self, table, domainIndices, constraint):
+        self.lower = constraint.lower if constraint.lower is not None else float('-inf')
+        self.upper = constraint.upper if constraint.upper is not None else float('inf')
+        column = table.column(constraint.attribute)
+        # Per-row values, as Python numbers for cheap running totals.
+        self.column = column
+        self.values = column.tolist()
+        self.sortedRows = {}
+        self.sortedValues = {}
+        self.minValue = {}
+        self.maxValue = {}
+        for var in constraint.variables:
+            rows = domainIndices[var]
+            self.sortedRows[var] = rows[np.argsort(column[rows], kind='mergesort')]
+            self.sortedValues[var] = column[self.sortedRows[var]]
+            self.minValue[var] = self.values[self.sortedRows[var][0]] if len(rows) else 0
+            self.maxValue[var] = self.values[self.sortedRows[var][-1]] if len(rows) else 0
+
+    def remainingBounds(self):
+        """
+        Returns the (min, max) sums over all constrained variables.
+        """
+        return sum(self.minValue.itervalues()), sum(self.maxValue.itervalues())
+
+    def valueBounds(self, var, total, remainingMin, remainingMax):
+        """
+        Returns the (low, high) range of values of |var| that keep the sum
+        within the bounds, where |total| is the sum over the assigned
+        variables and |remainingMin| / |remainingMax| the bounds over the
+        unassigned variables including |var|.
+        """
+        otherMin = remainingMin - self.minValue[var]
+        otherMax = remainingMax - self.maxValue[var]
+        return self.lower - total - otherMax, self.upper - total - otherMin
+
+    def feasibleRows(self, var, total, remainingMin, remainingMax):
+        """
+        Returns the rows of |var|'s domain with a value in valueBounds.
+        """
+        low, high = self.valueBounds(var, total, remainingMin, remainingMax)
+        values = self.sortedValues[var]
+        lo = np.searchsorted(values, low, side='left')
+        hi = np.searchsorted(values, high, side='right')
+        return self.sortedRows[var][lo:hi]
+
+    def feasibleCount(self, var, total, remainingMin, remainingMax):
+        """
+        Returns the number of rows feasibleRows would return.
+        """
+        low, high = self.valueBounds(var, total, remainingMin, remainingMax)
+        values = self.sortedValues[var]
+        lo = np.searchsorted(values, low, side='left')
+        hi = np.searchsorted(values, high, side='right')
+        return max(hi - lo, 0)
+
+    def cutCounts(self, var, total, remainingMin, remainingMax):
+        """
+        Returns the number of values of |var|'s domain below and above the
+        slice feasibleRows would return.
+        """
+        low, high = self.valueBounds(var, total, remainingMin, remainingMax)
+        values = self.sortedValues[var]
+        lo = np.searchsorted(values, low, side='left')
+        hi = np.searchsorted(values, high, side='right')
+        return min(lo, len(values)), len(values) - max(hi, lo)
+
+class SearchFrame():
+    """
+    One level of the explicit search stack of BacktrackingSearch: the
+    variable being assigned, its values in the order they are tried (and,
+    for sampled values, how many lineups each may produce), the cursor of
+    the next value to try, and the node's weight and total projection. While
+    a value is assigned, |row| is its player-table row and |mark| the length
+    of the live-domain trail before it was propagated.
+    """
+
+    def __init__(self, var, values, counts, weight, numLineupsPerPlayer, projection):
+        self.var = var
+        self.values = values
+        self.counts = counts
+        self.cursor = 0
+        self.weight = weight
+        self.numLineupsPerPlayer = numLineupsPerPlayer
+        self.projection = projection
+        self.row = None
+        self.mark = None
+
+# The BacktrackingSearch attributes save_state writes: settings, results
+# so far and the search frontier, and the live domains when propagating.
+STATE_FIELDS = ['numLineups', 'ep_greedy', 'comparisonIndex', 'mcv', 'ac3', 'varOrder', 'propagate', \
+    'maxStaleRestarts', 'staleRestarts', 'restartFound', 'optimalAssignment', 'optimalWeight', \
+    'numOptimalAssignments', 'numAssignments', 'numOperations', 'firstAssignmentNumOperations', \
+    'allAssignments', 'bestProjection', 'qualityCurve', 'checkInterval', 'assignment', 'frames', \
+    'pendingRoot', 'linearTotals', 'remainingMin', 'remainingMax', 'randoms']
+DOMAIN_FIELDS = ['alive', 'domainSize', 'trail', 'factorWeight']
 
 class BacktrackingSearch():
 
-    def reset_results(self):
+    def reset_results(self, keepLineups = True, checkDuplicates = True):
         """
         This function resets the statistics of the different aspects of the
         CSP solver. We will be using the values here for grading, so please
@@ -24,15 +139,24 @@ class BacktrackingSearch():
         self.numOptimalAssignments = 0
         self.numAssignments = 0
 
-        # Keep track of the number of times backtrack() gets called.
+        # Keep track of the number of nodes backtrack() visits.
         self.numOperations = 0
 
         # Keep track of the number of operations to get to the very first successful
         # assignment (doesn't have to be optimal).
         self.firstAssignmentNumOperations = 0
 
-        # List of all solutions found.
-        self.allAssignments = []
+        # All solutions found, as rows of player indices into the slate
+        # (only counted when streamed by iter_lineups), fingerprinted if the
+        # search can find a roster twice.
+        self.allAssignments = LineupSet(self.csp, keepLineups=keepLineups, checkDuplicates=checkDuplicates)
+
+        # With a deadline: the best projection of a lineup found so far,
+        # whether the deadline stopped the search, and the quality over time
+        # as (seconds, lineups found, best projection) at every checkpoint.
+        self.bestProjection = None
+        self.timedOut = False
+        self.qualityCurve = []
 
     def print_stats(self):
         """
@@ -66,13 +190,21 @@ class BacktrackingSearch():
         if self.csp.unaryFactors[var]:
             w *= self.csp.unaryFactors[var][val]
             if w == 0: return w
+        groupmates = self.groupmates.get(var, [])
+        if groupmates:
+            # The rank window implies the ordering factors of the group.
+            low, high = self.rank_window(assignment, var)
+            if not low <= self.groupOf[var][2][val] <= high: return 0
         for var2, factor in self.csp.binaryFactors[var].iteritems():
             if var2 not in assignment: continue  # Not assigned yet
+            if var2 in groupmates: continue
             w *= factor[val][assignment[var2]]
             if w == 0: return w
         return w
 
-    def solve(self, csp, numLineups, ep_greedy, comparisonIndex, mcv = False, ac3 = False):
+    def solve(self, csp, numLineups, ep_greedy, comparisonIndex, mcv = False, ac3 = False, \
+            maxStaleRestarts = 10000, varOrder = 'random', stats = None, timeLimit = None, \
+            deadline = None, checkInterval = 16):
         """
         Solves the given weighted CSP using heuristics as specified in the
         parameter. Note that unlike a typical unweighted CSP where the search
@@ -81,22 +213,75 @@ class BacktrackingSearch():
         described in reset_result().
 
         @param csp: A weighted CSP.
-        @param mcv: When enabled, Most Constrained Variable heuristics is used.
+        @param mcv: When enabled, Most Constrained Variable heuristics is used
+            (same as varOrder = 'mcv').
         @param ac3: When enabled, AC-3 will be used after each assignment of an
-            variable is made.
+            variable is made, pruning the live domains of the unassigned
+            variables and cutting branches whose domains become empty.
+        @param maxStaleRestarts: When ep_greedy < 0, the search restarts until
+            numLineups lineups are found or this many restarts in a row find
+            no new lineup.
+        @param varOrder: Variable ordering: 'random', 'mcv' (smallest live
+            domain), 'domwdeg' (smallest live domain per weighted degree,
+            where a binary factor's weight counts the domain wipeouts it
+            caused) or 'salary' (smallest slice of values satisfying the
+            linear constraints).
+        @param stats: Optional SearchStats that counts the nodes per depth
+            and the cuts per rule (see SearchStats.CUT_RULES).
+        @param timeLimit: Anytime mode: if set, seconds after which the
+            search stops, keeping the lineups found so far.
+        @param deadline: Anytime mode: if set, the time.time() at which the
+            search stops (the earlier of the two applies).
+        @param checkInterval: In anytime mode, the clock is read and a point
+            of self.qualityCurve recorded every this many nodes.
+        """
+        for assignment in self.iter_lineups(csp, numLineups, ep_greedy, comparisonIndex, mcv, ac3, \
+                maxStaleRestarts, varOrder, stats, timeLimit, deadline, checkInterval, keepLineups=True):
+            pass
+        # Print summary of solutions.
+        self.print_stats()
+
+    def iter_lineups(self, csp, numLineups, ep_greedy, comparisonIndex, mcv = False, ac3 = False, \
+            maxStaleRestarts = 10000, varOrder = 'random', stats = None, timeLimit = None, \
+            deadline = None, checkInterval = 16, keepLineups = False):
+        """
+        Generator form of solve, with the same parameters: yields every new
+        lineup, as a dictionary from variable to domain value in canonical
+        form, as soon as backtrack() completes it. Unless |keepLineups|,
+        self.allAssignments only counts the lineups without storing them, so
+        streaming consumers such as a FanDuelWriter or a bounded heap keep
+        memory constant whatever numLineups is. With ep_greedy >= 0 the
+        depth-first search over canonical lineups never reaches a roster
+        twice, so no fingerprints are kept either; the restarts of
+        ep_greedy < 0 can, and keep one per lineup (about 100 bytes) to
+        reject duplicates.
+
+        The search can be paused by pause() or by the deadline, or by just
+        not asking for the next lineup; save_state then writes its frontier
+        to disk and resume continues it, or split_frontier divides it among
+        processes (ParallelBacktrackingSearch.resume).
         """
         # CSP to be solved.
         self.csp = csp
 
+        # Instrumentation, if requested.
+        self.stats = stats
+
         # Set the search heuristics requested asked.
         self.mcv = mcv
         self.ac3 = ac3
+        self.varOrder = 'mcv' if mcv else varOrder
+        # Live domains are kept for AC-3 and the domain-size orderings; without
+        # AC-3 they are pruned by forward checking only.
+        self.propagate = ac3 or self.varOrder in ('mcv', 'domwdeg')
 
-        # Reset solutions from previous search.
-        self.reset_results()
+        # Reset solutions from previous search; only restarts can repeat a
+        # roster.
+        self.reset_results(keepLineups, checkDuplicates=ep_greedy < 0.0)
 
-        # The dictionary of domains of every variable in the CSP.
-        self.domains = {var: list(self.csp.values[var]) for var in self.csp.variables}
+        # Anytime mode: the earlier of the deadlines, checked every
+        # checkInterval nodes.
+        self.set_deadline(timeLimit, deadline, checkInterval)
 
         # Set the total number of lineups to generate
         self.numLineups = numLineups
@@ -107,60 +292,654 @@ class BacktrackingSearch():
         # Comparison index
         self.comparisonIndex = comparisonIndex
 
-        # Perform backtracking search.
+        # When ep_greedy < 0, the number of restarts in a row that found no
+        # new lineup, and the number of lineups when the current one began.
+        self.maxStaleRestarts = maxStaleRestarts
+        self.staleRestarts = 0
+        self.restartFound = 0
+
+        self.prepare_search()
+
+        # A buffer of uniform numbers for the samplers.
+        self.randoms = RandomBuffer()
+
+        # The search frontier: the current partial assignment and a stack of
+        # SearchFrames, one per assigned variable, and whether the root node
+        # (of the next restart) still has to be entered.
+        self.assignment = {}
+        self.frames = []
         if ep_greedy < 0.0:
-            while len(self.allAssignments) < self.numLineups:
-                self.backtrack({}, 0, 1, numLineups)
+            # Duplicates are rejected, so stop once restarts keep failing to
+            # find a new lineup (e.g. the CSP has fewer than numLineups).
+            self.pendingRoot = self.restart_pending()
         else:
-            self.backtrack({}, 0, 1, numLineups)
-        # Print summary of solutions.
+            self.pendingRoot = True
+
+        # Perform backtracking search.
+        for assignment in self.resume():
+            yield assignment
+
+    def prepare_search(self):
+        """
+        Builds the structures the search derives from self.csp and its
+        settings, and the initial state of the linear bounds and live
+        domains.
+        """
+        # The linear constraints below bound the salary; refuse to search
+        # without a cap rather than return unconstrained lineups.
+        self.csp.get_salary_bounds()
+
+        self.prepare_groups()
+
+        # Columnar player table; domains are arrays of its rows.
+        self.table = ensurePlayerTable(self.csp)
+
+        # The position in its domain of every row of the player table, per
+        # variable (-1 outside the domain).
+        self.positionOf = {}
+        for var in self.csp.variables:
+            rows = self.csp.domainIndices[var]
+            self.positionOf[var] = np.full(len(self.table), -1, dtype=np.int64)
+            self.positionOf[var][rows] = np.arange(len(rows))
+        # the domain of each grouped variable as rows in rank order
+        self.rankRows = {var: self.csp.domainIndices[var][np.argsort(self.rankAt[var])] \
+            for var in self.groupOf}
+
+        # Bound propagation for the linear constraints (e.g. the salary cap):
+        # the running total of each constraint over the assigned variables,
+        # and the min/max sums over its unassigned variables, updated
+        # incrementally on every assignment.
+        self.linearIndexes = [LinearBoundIndex(self.table, self.csp.domainIndices, constraint) \
+            for constraint in self.csp.linearConstraints]
+        self.linearOf = {var: [c for c, index in enumerate(self.linearIndexes) \
+            if var in index.sortedRows] for var in self.csp.variables}
+        self.linearTotals = [0] * len(self.linearIndexes)
+        self.remainingMin = [index.remainingBounds()[0] for index in self.linearIndexes]
+        self.remainingMax = [index.remainingBounds()[1] for index in self.linearIndexes]
+
+        # Walker alias tables over each variable's domain, built on first use
+        # per (variable, weight column). Samplers draw from the whole domain
+        # and reject values that are infeasible or already used, which leaves
+        # the distribution over the acceptable values unchanged; after
+        # maxRejections failed draws they sample exactly from the acceptable
+        # values instead.
+        self.aliasTables = {}
+        self.weightTables = {}
+        self.maxRejections = 16
+
+        # Live domains for arc consistency and forward checking.
+        if self.propagate:
+            self.init_domains()
+
+    def prepare_groups(self):
+        """
+        Sets up the symmetry groups of self.csp: for each variable in a group
+        its groupmates, and (group, index in the group, rank of each value)
+        in self.groupOf. Every search keeps a group's values in canonical
+        order while it assigns them (see rank_window), so each roster is
+        reached once.
+        """
+        self.groupmates = {}
+        self.groupOf = {}
+        # the rank of every domain position of each grouped variable
+        self.rankAt = {}
+        for group, rank in zip(getattr(self.csp, 'symmetryGroups', []), getattr(self.csp, 'symmetryRanks', [])):
+            for i, var in enumerate(group):
+                self.groupmates[var] = [var2 for var2 in group if var2 != var]
+                self.groupOf[var] = (group, i, rank)
+                self.rankAt[var] = np.array([rank[val] for val in self.csp.values[var]], dtype=np.int64)
+
+    def rank_window(self, assignment, var):
+        """
+        Returns the (low, high) range of ranks |var| can take in its symmetry
+        group given the assigned groupmates: strictly after the value of
+        every earlier slot and before that of every later one, leaving a
+        distinct rank for each unassigned slot in between. For example in
+        WR1-WR3 with n values, WR1 ranks in [0, n - 3], and with WR3
+        assigned rank r, WR2 ranks in [1, r - 1].
+        """
+        group, i, rank = self.groupOf[var]
+        low = i
+        high = len(rank) - len(group) + i
+        for j, var2 in enumerate(group):
+            if var2 in assignment:
+                if j < i:
+                    low = max(low, rank[assignment[var2]] + i - j)
+                elif j > i:
+                    high = min(high, rank[assignment[var2]] - (j - i))
+        return low, high
+
+    def linearBounds(self, c, var):
+        """
+        Returns (total, remainingMin, remainingMax) of linear constraint |c|
+        for bounding the values of |var|, where the min/max sums over the
+        unassigned variables are tightened by the rank windows of the other
+        unassigned slots of the symmetry groups.
+        """
+        total, remainingMin, remainingMax = self.linearTotals[c], self.remainingMin[c], self.remainingMax[c]
+        index = self.linearIndexes[c]
+        for other in self.groupOf:
+            if other == var or other in self.assignment or other not in index.sortedRows:
+                continue
+            low, high = self.rank_window(self.assignment, other)
+            if low > high:
+                return total, float('inf'), float('-inf')
+            values = index.column[self.rankRows[other][low:high + 1]]
+            remainingMin += values.min() - index.minValue[other]
+            remainingMax += values.max() - index.maxValue[other]
+        return total, remainingMin, remainingMax
+
+    def set_deadline(self, timeLimit, deadline, checkInterval):
+        now = time.time()
+        # The quality curve of a resumed or loaded search continues from its
+        # last point, so its seconds never go back.
+        self.startTime = now - (self.qualityCurve[-1][0] if self.qualityCurve else 0.0)
+        self.deadline = deadline
+        if timeLimit is not None:
+            self.deadline = min(self.deadline, now + timeLimit) if deadline is not None \
+                else now + timeLimit
+        self.checkInterval = checkInterval
+        self.timedOut = False
+
+    def check_deadline(self):
+        """
+        Records the current point of the quality curve and stops the search
+        if the deadline has passed.
+        """
+        now = time.time()
+        self.qualityCurve.append((now - self.startTime, len(self.allAssignments), self.bestProjection))
+        if now >= self.deadline:
+            self.timedOut = True
+
+    def restart_pending(self):
+        return len(self.allAssignments) < self.numLineups and self.staleRestarts < self.maxStaleRestarts \
+            and not self.timedOut
+
+    def pause(self):
+        """
+        Makes the search stop at the next node, e.g. when called from a
+        SearchStats trace function or a signal handler; resume continues it.
+        """
+        self.pauseRequested = True
+
+    def resume(self, numLineups = None, timeLimit = None, deadline = None):
+        """
+        Continues a paused, timed out or loaded search from its frontier,
+        yielding every new lineup as iter_lineups does.
+
+        @param numLineups: If set, the new total number of lineups to find.
+        @param timeLimit: If set, a new time limit in seconds, as for solve.
+        @param deadline: If set, a new deadline, as for solve.
+        """
+        if numLineups is not None:
+            self.numLineups = numLineups
+        if timeLimit is not None or deadline is not None:
+            self.set_deadline(timeLimit, deadline, self.checkInterval)
+        self.timedOut = False
+        self.pauseRequested = False
+        if self.deadline is not None:
+            self.check_deadline()
+        for assignment in self.backtrack():
+            yield assignment
+        if self.deadline is not None:
+            self.check_deadline()
+
+    def save_state(self, filename):
+        """
+        Writes the search frontier to |filename|: the frame stack and partial
+        assignment, the linear totals and live domains, the lineups and
+        counters so far and the random number generators, so that load_state
+        and resume continue the search exactly where it stopped, in this or
+        another process. Call it between lineups or after the search paused.
+        """
+        state = self.get_state()
+        # written to a temporary file and renamed, so a crash never leaves
+        # a partial state behind
+        partial = filename + '.tmp%d' % os.getpid()
+        with open(partial, 'wb') as outputfile:
+            pickle.dump(state, outputfile, pickle.HIGHEST_PROTOCOL)
+        os.rename(partial, filename)
+
+    def load_state(self, csp, filename, stats = None):
+        """
+        Restores a search written by save_state for the same |csp|; resume
+        then continues it. This also restores the global random and
+        numpy.random generators.
+        """
+        with open(filename, 'rb') as inputfile:
+            state = pickle.load(inputfile)
+        self.set_state(csp, state, stats)
+
+    def get_state(self):
+        """
+        Returns the state save_state writes, as a dictionary that shares the
+        frames, lineups and domains of this search.
+        """
+        state = dict((field, getattr(self, field)) for field in STATE_FIELDS)
+        if self.propagate:
+            state.update((field, getattr(self, field)) for field in DOMAIN_FIELDS)
+        state['randomState'] = random.getstate()
+        state['numpyState'] = np.random.get_state()
+        return state
+
+    def set_state(self, csp, state, stats = None):
+        """
+        Restores a state returned by get_state (or split_frontier) for the
+        same |csp|, as load_state does.
+        """
+        self.csp = csp
+        self.stats = stats
+        self.mcv = state['mcv']
+        self.ac3 = state['ac3']
+        self.varOrder = state['varOrder']
+        self.propagate = state['propagate']
+        self.prepare_search()
+        for field, value in state.iteritems():
+            if field not in ('randomState', 'numpyState'):
+                setattr(self, field, value)
+        random.setstate(state['randomState'])
+        np.random.set_state(state['numpyState'])
+        self.set_deadline(None, None, state['checkInterval'])
+
+    def split_frontier(self, numParts):
+        """
+        Splits the frontier of a paused or loaded search into up to
+        |numParts| states, as get_state returns them, whose subtrees are
+        disjoint and together hold the rest of the search, so they can be
+        resumed in other processes (see ParallelBacktrackingSearch.resume).
+        The first state continues the current subtree; the values the
+        shallowest frame with numParts - 1 values left (or else the frame
+        with the most) has not tried yet are split into consecutive blocks,
+        one per other state, which start from that frame with the deeper
+        assignments undone and end with it. With ep_greedy < 0 every state
+        then goes on with restarts of its own. Every state holds the
+        lineups found so far. This search is left as it was.
+        """
+        copyState = lambda state: pickle.loads(pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+        state = copyState(self.get_state())
+        numLeft = [len(frame.values) - frame.cursor for frame in self.frames]
+        if not any(numLeft) or numParts < 2:
+            return [state]
+        depth = next((d for d, n in enumerate(numLeft) if n >= numParts - 1), numLeft.index(max(numLeft)))
+        frame = self.frames[depth]
+        untried = range(frame.cursor, len(frame.values))
+        blocks = [block.tolist() for block in np.array_split(untried, min(numParts - 1, len(untried)))]
+
+        # the other states: the frame before its next value, with its values
+        # cut to one block and those left above it kept by the first state
+        for top in reversed(self.frames[depth:]):
+            if top.row is not None:
+                self.unassign(top)
+        unwound = self.get_state()
+        unwound['frames'] = unwound['frames'][:depth + 1]
+        parts = []
+        for block in blocks:
+            part = copyState(unwound)
+            for above in part['frames'][:depth]:
+                above.values = above.values[:above.cursor]
+                if above.counts is not None:
+                    above.counts = above.counts[:above.cursor]
+            top = part['frames'][depth]
+            top.values = [top.values[i] for i in block]
+            top.counts = [top.counts[i] for i in block] if top.counts is not None else None
+            top.cursor = 0
+            parts.append(part)
+
+        # restore this search, and cut the first state's frame to the values
+        # it already tried
+        for field, value in copyState(state).iteritems():
+            if field not in ('randomState', 'numpyState'):
+                setattr(self, field, value)
+        top = state['frames'][depth]
+        top.values = top.values[:top.cursor]
+        if top.counts is not None:
+            top.counts = top.counts[:top.cursor]
+        return [state] + parts
+
+    def solveTopK(self, csp, numLineups):
+        """
+        Finds the |numLineups| lineups with the highest total projection whose
+        salary is within the salary floor and cap of |csp| (see
+        CSP.get_salary_bounds), and stores them in self.allAssignments in
+        descending order of projection.
+
+        This is a best-first search over partial lineups. Each heap entry
+        stands for the not yet explored children of an expanded node, sorted
+        by an admissible bound (the partial projection plus the LP relaxation
+        of the remaining slots), so every pop either emits the next best
+        lineup or expands one node, and the work done is proportional to the
+        number of lineups requested rather than to the size of the tree.
+
+        @param csp: A weighted CSP whose domains hold (player, salary,
+            projection, efficiency) tuples, with a salary cap as added by
+            addConstraints.
+        @param numLineups: Number of lineups to return.
+        """
+        self.csp = csp
+        self.reset_results()
+        self.numLineups = numLineups
+        self.salaryFloor, self.salaryCap = csp.get_salary_bounds()
+        self.prepare_groups()
+
+        self.topKOrder = list(csp.variables)
+        domains = [list(csp.values[var]) for var in self.topKOrder]
+        self.topKBound = KnapsackBound(domains)
+        self.topKDomains = domains
+
+        # Heap entries are (-bound, tie breaker, node, child index), where a
+        # node is (assignment, salary, projection, sorted children).
+        heap = []
+        counter = 0
+        root = self.expandTopK({}, 0, 0.0)
+        if root[3]:
+            heapq.heappush(heap, (-root[3][0][0], counter, root, 0))
+
+        while heap and len(self.allAssignments) < self.numLineups:
+            negBound, _, node, index = heapq.heappop(heap)
+            self.numOperations += 1
+            assignment, salary, projection, children = node
+            bound, val = children[index]
+            if index + 1 < len(children):
+                counter += 1
+                heapq.heappush(heap, (-children[index + 1][0], counter, node, index + 1))
+
+            var = self.topKOrder[len(assignment)]
+            newAssignment = dict(assignment)
+            newAssignment[var] = val
+            if len(newAssignment) == self.csp.numVars:
+                self.numAssignments += 1
+                self.allAssignments.append(newAssignment)
+                if len(self.allAssignments) == 1:
+                    self.optimalAssignment = newAssignment
+                    self.optimalWeight = 1
+                    self.numOptimalAssignments = 1
+                    self.firstAssignmentNumOperations = self.numOperations
+                continue
+
+            child = self.expandTopK(newAssignment, salary + val[1], projection + val[2])
+            if child[3]:
+                counter += 1
+                heapq.heappush(heap, (-child[3][0][0], counter, child, 0))
         self.print_stats()
 
+    def expandTopK(self, assignment, salary, projection):
+        """
+        Returns the top-K search node for a partial assignment: the values of
+        the next slot that are consistent and can still complete a lineup
+        within the salary bounds, paired with their bounds and sorted best
+        first.
+        """
+        depth = len(assignment)
+        var = self.topKOrder[depth]
+        children = []
+        for val in self.topKDomains[depth]:
+            newSalary = salary + val[1]
+            if newSalary > self.salaryCap:
+                continue
+            if self.salaryFloor is not None and newSalary + self.topKBound.maxSalary[depth + 1] < self.salaryFloor:
+                continue
+            rest = self.topKBound.relaxationBound(depth + 1, self.salaryCap - newSalary)
+            if rest is None:
+                continue
+            if self.get_delta_weight(assignment, var, val) == 0:
+                continue
+            children.append((projection + val[2] + rest, val))
+        children.sort(key=lambda child: child[0], reverse=True)
+        return (assignment, salary, projection, children)
+
     def calculateScore(self, assignment):
         score = 0
         for position in assignment:
             score += assignment[position][1]
         return score
 
-    def backtrack(self, assignment, numAssigned, weight, numLineupsPerPlayer):
+    def feasibleRows(self, var):
         """
-        Perform the back-tracking algorithms to find all possible solutions to
-        the CSP.
+        Returns the rows of |var|'s domain that satisfy the bounds of every
+        linear constraint on it, in the order of the first constraint.
+        """
+        rows = None
+        for c in self.linearOf[var]:
+            feasible = self.linearIndexes[c].feasibleRows(var, *self.linearBounds(c, var))
+            rows = feasible if rows is None else rows[np.in1d(rows, feasible)]
+        return self.csp.domainIndices[var] if rows is None else rows
 
-        @param assignment: A dictionary of current assignment. Unassigned variables
-            do not have entries, while an assigned variable has the assigned value
-            as value in dictionary. e.g. if the domain of the variable A is [5,6],
-            and 6 was assigned to it, then assignment[A] == 6.
-        @param numAssigned: Number of currently assigned variables
-        @param weight: The weight of the current partial assignment.
+    def candidateRows(self, var, excluded):
+        """
+        Returns the rows of |var|'s domain that satisfy the linear
+        constraints, fall in the rank window of its symmetry group, are live
+        and are not in |excluded|.
+        """
+        rows = self.feasibleRows(var)
+        if var in self.groupOf:
+            low, high = self.rank_window(self.assignment, var)
+            ranks = self.rankAt[var][self.positionOf[var][rows]]
+            rows = rows[(ranks >= low) & (ranks <= high)]
+        if self.propagate:
+            rows = rows[self.alive[var][self.positionOf[var][rows]]]
+        if excluded:
+            rows = rows[~np.in1d(rows, list(excluded))]
+        return rows
+
+    def slotWeights(self, var, index):
+        """
+        Returns the sampling weights of |var|'s domain positions: column
+        |index| of the player table, clipped at 0 (uniform if that sums to 0). Symmetry
+        groups are filled in slot order, so for a group slot with k slots
+        after it, the weight of rank r is multiplied by the sum of the weight
+        products of every k values ranked after r. The chain of draws then
+        picks each set of groupmates with probability proportional to the
+        product of its weights, as sampling the slots freely would.
+        """
+        if (var, index) not in self.weightTables:
+            self.weightTables[var, index] = self.computeSlotWeights(var, index)
+        return self.weightTables[var, index]
+
+    def computeSlotWeights(self, var, index):
+        # negative values (e.g. projections) cannot be probabilities
+        weights = np.maximum(self.table.column(index)[self.csp.domainIndices[var]].astype(float), 0)
+        if weights.sum() <= 0:
+            weights = np.ones(len(weights))
+        if var not in self.groupOf:
+            return weights
+        group, i, rank = self.groupOf[var]
+        byRank = np.argsort(self.rankAt[var])
+        k = len(group) - 1 - i
+        for weights in [weights, np.ones(len(weights))]:
+            ranked = weights[byRank].tolist()
+            # sums holds the elementary symmetric sums e_0..e_k of the
+            # weights ranked strictly after r
+            sums = [1.0] + [0.0] * k
+            above = np.empty(len(ranked))
+            for r in range(len(ranked) - 1, -1, -1):
+                above[byRank[r]] = sums[k]
+                sums = [1.0] + [sums[j] + ranked[r] * sums[j - 1] for j in range(1, k + 1)]
+            # uniform weights if too few values have a positive weight to
+            # fill the slots after this one
+            if (weights * above).sum() > 0:
+                break
+        return weights * above
+
+    def aliasTable(self, var, index):
+        if (var, index) not in self.aliasTables:
+            self.aliasTables[var, index] = AliasTable(self.slotWeights(var, index))
+        return self.aliasTables[var, index]
+
+    def sampleRows(self, var, index, n, excluded):
+        """
+        Draws |n| values of |var| with replacement, with probability
+        proportional to column |index| of the player table among the
+        candidateRows (uniform if those weights sum to 0).
+
+        @return counts: A dictionary from row to the number of times it was
+            drawn, empty if there are no candidates.
+        """
+        table = self.aliasTable(var, index)
+        domain = self.csp.domainIndices[var]
+        bounds = [(self.linearIndexes[c],) + self.linearIndexes[c].valueBounds(var, \
+            *self.linearBounds(c, var)) for c in self.linearOf[var]]
+        window = self.rank_window(self.assignment, var) if var in self.groupOf else None
+        if n == 1 and table.n:
+            for attempt in range(self.maxRejections):
+                position = table.draw(self.randoms.next())
+                if window and not window[0] <= self.rankAt[var][position] <= window[1]:
+                    continue
+                row = int(domain[position])
+                if row in excluded:
+                    continue
+                if self.propagate and not self.alive[var][position]:
+                    continue
+                if all(low <= linear.values[row] <= high for linear, low, high in bounds):
+                    return {row: 1}
+        elif table.n:
+            accepted = []
+            numAccepted = 0
+            while numAccepted < n:
+                size = max(2 * n, 64)
+                positions = table.drawMany(np.random.random_sample(size))
+                rows = domain[positions]
+                mask = np.ones(size, dtype=bool)
+                if window:
+                    ranks = self.rankAt[var][positions]
+                    mask &= (ranks >= window[0]) & (ranks <= window[1])
+                for linear, low, high in bounds:
+                    values = linear.column[rows]
+                    mask &= (values >= low) & (values <= high)
+                if self.propagate:
+                    mask &= self.alive[var][positions]
+                if excluded:
+                    mask &= ~np.in1d(rows, list(excluded))
+                if mask.sum() * self.maxRejections < size:
+                    break
+                accepted.append(rows[mask])
+                numAccepted += len(accepted[-1])
+            if numAccepted >= n:
+                rows, counts = np.unique(np.concatenate(accepted)[:n], return_counts=True)
+                return dict(zip(rows.tolist(), counts.tolist()))
+
+        # Too few acceptable values for rejection: sample them exactly.
+        rows = self.candidateRows(var, excluded)
+        if not len(rows):
+            return {}
+        weights = self.slotWeights(var, index)[self.positionOf[var][rows]]
+        if weights.sum() > 0:
+            weights = weights / weights.sum()
+        else:
+            weights = np.ones(len(rows)) / len(rows)
+        stones = np.random.multinomial(n, weights)
+        return {row: count for row, count in zip(rows.tolist(), stones.tolist()) if count}
+
+    def feasibleCount(self, var):
+        """
+        Returns an upper bound on the number of values of |var| that satisfy
+        the linear constraints: the size of the smallest slice.
         """
-        if len(self.allAssignments) >= self.numLineups:
-            return
+        count = len(self.csp.domainIndices[var])
+        for c in self.linearOf[var]:
+            count = min(count, self.linearIndexes[c].feasibleCount(var, *self.linearBounds(c, var)))
+        return count
 
-        score = self.calculateScore(assignment)
+    def updateLinear(self, var, row, sign):
+        """
+        Adds (sign 1) or removes (sign -1) the value at |row| for |var| to the
+        running totals of the linear constraints on |var|.
+        """
+        for c in self.linearOf[var]:
+            index = self.linearIndexes[c]
+            self.linearTotals[c] += sign * index.values[row]
+            self.remainingMin[c] -= sign * index.minValue[var]
+            self.remainingMax[c] -= sign * index.maxValue[var]
 
-        if score > 60000:
-            return
+    def backtrack(self):
+        """
+        Perform the back-tracking algorithms to find all possible solutions to
+        the CSP, iteratively over the explicit stack self.frames. A generator:
+        it yields every new complete assignment (in canonical form) after
+        adding it to self.allAssignments, and returns when the search space
+        (or, with ep_greedy < 0, the restarts) is exhausted, numLineups
+        lineups were found, the deadline passed or pause() was called. The
+        frontier is left as it is, so resume can continue it.
+        """
+        frames = self.frames
+        stats = self.stats
+        lineups = self.allAssignments
+        numLineups = self.numLineups
+        while True:
+            if lineups.numLineups >= numLineups or self.timedOut or self.pauseRequested:
+                if stats is not None and lineups.numLineups >= numLineups:
+                    stats.cut('lineupBudget', len(frames))
+                elif stats is not None and self.timedOut:
+                    stats.cut('deadline', len(frames))
+                return
 
-        maxSalary = 9400
-        if score + (9 - numAssigned) * maxSalary < 58000:
-            return 
+            if self.pendingRoot:
+                self.pendingRoot = False
+                self.restartFound = len(self.allAssignments)
+                frame, lineup = self.enter_node(0, 1, self.numLineups, 0.0)
+            elif not frames:
+                if self.ep_greedy < 0.0:
+                    self.staleRestarts = 0 if len(self.allAssignments) > self.restartFound \
+                        else self.staleRestarts + 1
+                    self.pendingRoot = self.restart_pending()
+                    if self.pendingRoot:
+                        continue
+                return
+            else:
+                # Undo the value tried last at the top frame and assign the
+                # next one; the frame is done when none is left.
+                top = frames[-1]
+                if top.row is not None:
+                    self.unassign(top)
+                child = self.next_value(top)
+                if child is None:
+                    frames.pop()
+                    continue
+                weight, numLineupsPerPlayer = child
+                frame, lineup = self.enter_node(len(frames), weight, numLineupsPerPlayer, \
+                    top.projection + self.assignment[top.var][2])
 
-        minSalary = 4000
-        if score + (9 - numAssigned) * minSalary > 60000:
-            return 
+            if lineup is not None:
+                yield lineup
+            elif frame is not None:
+                frames.append(frame)
+
+    def enter_node(self, numAssigned, weight, numLineupsPerPlayer, projection):
+        """
+        Visits a node of the search tree below the current partial
+        assignment: a complete lineup is recorded and returned, otherwise the
+        next variable is selected and its values ordered into a new
+        SearchFrame.
+
+        @param numAssigned: Number of currently assigned variables
+        @param weight: The weight of the current partial assignment.
+        @param numLineupsPerPlayer: Number of lineups the node may produce,
+            which sets how many values the sampler draws.
+        @param projection: Total projection of the partial assignment.
 
+        @return (frame, lineup): The new frame or the new lineup; both None
+            if the node is a dead end or the lineup a duplicate.
+        """
+        stats = self.stats
+        assignment = self.assignment
         self.numOperations += 1
+        if stats is not None:
+            stats.node(numAssigned)
+        if self.deadline is not None and self.numOperations % self.checkInterval == 0:
+            self.check_deadline()
         assert weight > 0
         if numAssigned == self.csp.numVars:
-            # A satisfiable solution have been found. Update the statistics.            
-            # if len(self.allAssignments) % 1000 == 0:
-            #     print len(self.allAssignments)
+            # A satisfiable solution have been found. Update the statistics.
+            # Symmetry groups are already in canonical order, but restarts of
+            # the samplers can regenerate a lineup we already have (only
+            # then is allAssignments checking duplicates).
+            lineup = dict(assignment)
+            if not self.allAssignments.appendUnique(lineup):
+                if stats is not None:
+                    stats.cut('duplicate', numAssigned)
+                return None, None
             self.numAssignments += 1
-            newAssignment = {}
-            for var in self.csp.variables:
-                newAssignment[var] = assignment[var]
-            self.allAssignments.append(newAssignment)
+            if self.deadline is not None and (self.bestProjection is None or projection > self.bestProjection):
+                self.bestProjection = projection
 
             if len(self.optimalAssignment) == 0 or weight >= self.optimalWeight:
                 if weight == self.optimalWeight:
@@ -169,77 +948,113 @@ class BacktrackingSearch():
                     self.numOptimalAssignments = 1
                 self.optimalWeight = weight
 
-                self.optimalAssignment = newAssignment
+                self.optimalAssignment = {var: lineup[var] for var in self.csp.variables}
                 if self.firstAssignmentNumOperations == 0:
                     self.firstAssignmentNumOperations = self.numOperations
-            return
+            return None, lineup
 
         # Select the next variable to be assigned.
         var = self.get_unassigned_variable(assignment)
-        ordered_values = []
-        p = None
+        counts = None
+        if stats is not None:
+            self.count_linear_cuts(var, numAssigned)
 
-        # Efficiency-based algorithm - not based on epsilon-greedy at all
+        # Efficiency-based algorithm - not based on epsilon-greedy at all.
+        # Values outside the rank window of a symmetry group are rejected
+        # while sampling, so a sampled value is never out of order.
         if self.ep_greedy < 0.0:
-            efficiency_list = [player[3] for player in self.domains[var]]
-            efficiency_sum = sum(efficiency_list)
-            efficiency_list = map(lambda x: x / efficiency_sum, efficiency_list)
-            pick = list(np.random.multinomial(1, efficiency_list))
-            ordered_values.append(self.domains[var][pick.index(1)])
+            picks = self.sampleRows(var, 3, 1, ())
+            if not picks:
+                if stats is not None:
+                    stats.cut('noValues', numAssigned)
+                return None, None
+            ordered_values = [self.table.tuples[row] for row in picks]
 
         # Epsilon-Greedy Algorithm - deterministic will sort by efficiency, random will choose
         # from a multinomial distribution based on the salaries of each player
         else:
-            p = np.random.random_sample()
+            p = self.randoms.next()
             if p <= self.ep_greedy:
-                ordered_values = sorted(self.domains[var], key=lambda tup: tup[self.comparisonIndex],reverse=True)
+                rows = self.candidateRows(var, ())
+                if not len(rows):
+                    if stats is not None:
+                        stats.cut('noValues', numAssigned)
+                    return None, None
+                column = self.table.column(self.comparisonIndex)
+                # stable, so ties keep their salary order as sorted() did
+                order = np.argsort(-column[rows], kind='mergesort')
+                ordered_values = [self.table.tuples[row] for row in rows[order].tolist()]
             else:
-                salary_array = []
-                curr_players = assignment.values()
-                players = []
-                for player in self.domains[var]:
-                    if player not in curr_players:
-                        players.append(player)
-                        salary_array.append(float(player[self.comparisonIndex]))
-
-                salary_sum = sum(salary_array)
-                prob_array = map(lambda x: x / salary_sum, salary_array)
-                stones = np.random.multinomial(numLineupsPerPlayer, prob_array)
-                ordered_values = {players[i]:stones[i] for i in range(0, len(stones)) if stones[i] > 0}
-
-        # Continue the backtracking recursion using |var| and |ordered_values|.
-        if not self.ac3:
-            # When arc consistency check is not enabled.
-            for val in ordered_values:
-                deltaWeight = self.get_delta_weight(assignment, var, val)
-                if deltaWeight > 0:
-                    assignment[var] = val
-                    self.backtrack(assignment, numAssigned + 1, weight * deltaWeight, \
-                        ordered_values[val] if (self.ep_greedy is not -1 and p > self.ep_greedy) else numLineupsPerPlayer)
-                    del assignment[var]
-        # else:
-        #     # Arc consistency check is enabled.
-        #     # Problem 1c: skeleton code for AC-3
-        #     # You need to implement arc_consistency_check().
-        #     for val in ordered_values:
-        #         deltaWeight = self.get_delta_weight(assignment, var, val)
-        #         if deltaWeight > 0:
-        #             assignment[var] = val
-        #             # create a deep copy of domains as we are going to look
-        #             # ahead and change domain values
-        #             localCopy = copy.deepcopy(self.domains)
-        #             # fix value for the selected variable so that hopefully we
-        #             # can eliminate values for other variables
-        #             self.domains[var] = [val]
-
-        #             # enforce arc consistency
-        #             self.arc_consistency_check(var)
-
-        #             self.backtrack(assignment, numAssigned + 1, weight * deltaWeight, \
-        #                 ordered_values[val] if (self.ep_greedy is not -1 and p > self.ep_greedy) else numLineupsPerPlayer)
-        #             # restore the previous domains
-        #             self.domains = localCopy
-        #             del assignment[var]
+                curr_players = set(self.table.rowOf[val] for val in assignment.itervalues())
+                stones = self.sampleRows(var, self.comparisonIndex, numLineupsPerPlayer, curr_players)
+                if not stones:
+                    if stats is not None:
+                        stats.cut('noValues', numAssigned)
+                    return None, None
+                # each sampled value may produce as many lineups as it was drawn
+                stones = {self.table.tuples[row]: count for row, count in stones.iteritems()}
+                ordered_values = list(stones)
+                counts = [stones[val] for val in ordered_values]
+
+        return SearchFrame(var, ordered_values, counts, weight, numLineupsPerPlayer, projection), None
+
+    def next_value(self, frame):
+        """
+        Assigns the next value of |frame| that keeps a positive weight and,
+        with live domains, consistent domains.
+
+        @return (weight, numLineupsPerPlayer): The child node's arguments to
+            enter_node, or None if the frame has no value left.
+        """
+        stats = self.stats
+        assignment = self.assignment
+        var = frame.var
+        while frame.cursor < len(frame.values):
+            val = frame.values[frame.cursor]
+            frame.cursor += 1
+            deltaWeight = self.get_delta_weight(assignment, var, val)
+            if deltaWeight <= 0:
+                if stats is not None:
+                    stats.cut('zeroWeight', len(self.frames) - 1)
+                continue
+            assignment[var] = val
+            frame.row = self.table.rowOf[val]
+            self.updateLinear(var, frame.row, 1)
+            # With live domains, the values pruned after the assignment are
+            # restored from the trail before the next value is tried.
+            if self.propagate:
+                frame.mark = len(self.trail)
+                if not self.arc_consistency_check(assignment, var, frame.row):
+                    if stats is not None:
+                        stats.cut('inconsistent', len(self.frames) - 1)
+                    self.unassign(frame)
+                    continue
+            numLineupsPerPlayer = frame.counts[frame.cursor - 1] if frame.counts is not None \
+                else frame.numLineupsPerPlayer
+            return frame.weight * deltaWeight, numLineupsPerPlayer
+        return None
+
+    def unassign(self, frame):
+        """
+        Undoes the assignment of the current value of |frame|.
+        """
+        if self.propagate:
+            self.restore_domains(frame.mark)
+        self.updateLinear(frame.var, frame.row, -1)
+        del self.assignment[frame.var]
+        frame.row = None
+
+    def count_linear_cuts(self, var, depth):
+        """
+        Counts the values of |var| the linear constraints cut at this node as
+        overCap (above the slice) or floorUnreachable (below it).
+        """
+        for c in self.linearOf[var]:
+            below, above = self.linearIndexes[c].cutCounts(var, *self.linearBounds(c, var))
+            if above:
+                self.stats.cut('overCap', depth, above)
+            if below:
+                self.stats.cut('floorUnreachable', depth, below)
 
     def get_unassigned_variable(self, assignment):
         """
@@ -257,48 +1072,116 @@ class BacktrackingSearch():
         for var in self.csp.variables:
             if var not in assignment:
                 choices.append(var)
-        var = random.choice(choices)
-        return var
-
-    # def arc_consistency_check(self, var):
-    #     """
-    #     Perform the AC-3 algorithm. The goal is to reduce the size of the
-    #     domain values for the unassigned variables based on arc consistency.
-
-    #     @param var: The variable whose value has just been set.
-    #     """
-    #     # Problem 1c
-    #     # Hint: How to get variables neighboring variable |var|?
-    #     # => for var2 in self.csp.get_neighbor_vars(var):
-    #     #       # use var2
-    #     #
-    #     # Hint: How to check if two values are inconsistent?
-    #     # For unary factors
-    #     #   => self.csp.unaryFactors[var1][val1] == 0
-    #     #
-    #     # For binary factors
-    #     #   => self.csp.binaryFactors[var1][var2][val1][val2] == 0
-    #     #   (self.csp.binaryFactors[var1][var2] returns a nested dict of all assignments)
-
-    #     # BEGIN_YOUR_CODE (around 20 lines of code expected)
-    #     def enforceArcConsistency(X_i, X_j):           
-    #         valuesToRemove = []
-    #         for value_i in self.domains[X_i]:
-    #             shouldAdd = True
-    #             for value_j in self.domains[X_j]:
-    #                 if not self.csp.binaryFactors[X_i][X_j][value_i][value_j] == 0:
-    #                     shouldAdd = False
-    #             if shouldAdd:
-    #                 valuesToRemove.append(value_i)
-    #         for val in valuesToRemove:
-    #             self.domains[X_i].remove(val)
-
-    #     queue = [var]
-    #     while queue:
-    #         var1 = queue.pop(0)
-    #         for var2 in self.csp.get_neighbor_vars(var1):
-    #             domain_var2 = set(self.domains[var2])
-    #             enforceArcConsistency(var2, var1)
-    #             if set(self.domains[var2]) != domain_var2:
-    #                 queue.append(var2)
-    #     # END_YOUR_CODE
\ No newline at end of file
+        if self.varOrder == 'random':
+            var = random.choice(choices)
+            # Within a symmetry group, fill the slots in order (WR1 before
+            # WR2), as slotWeights assumes.
+            if var in self.groupOf:
+                var = [var2 for var2 in self.groupOf[var][0] if var2 not in assignment][0]
+            return var
+
+        # The counters below are maintained on assign and unassign, so every
+        # ordering costs O(vars) per node; ties go to the first variable.
+        if self.varOrder == 'mcv':
+            return min(choices, key=lambda var: self.domainSize[var])
+        if self.varOrder == 'domwdeg':
+            def domOverWdeg(var):
+                wdeg = sum(self.factorWeight[var, var2] for var2 in self.csp.binaryFactors[var] \
+                    if var2 not in assignment)
+                return float(self.domainSize[var]) / max(wdeg, 1)
+            return min(choices, key=domOverWdeg)
+        if self.varOrder == 'salary':
+            return min(choices, key=self.feasibleCount)
+        raise Exception('Unknown variable ordering %s' % self.varOrder)
+
+    def init_domains(self):
+        """
+        Sets up the live domains used by arc consistency: a boolean array per
+        variable over the positions of its domain (csp.domainIndices) and its
+        number of live values, the trail of removals to undo on backtrack,
+        and for every binary factor a boolean matrix of the compatible pairs
+        of positions and a dom/wdeg weight. Values with a zero unary factor
+        are removed up front.
+        """
+        self.alive = {}
+        for var in self.csp.variables:
+            rows = self.csp.domainIndices[var]
+            self.alive[var] = np.ones(len(rows), dtype=bool)
+            if self.csp.unaryFactors[var]:
+                for i, row in enumerate(rows.tolist()):
+                    if self.csp.unaryFactors[var][self.table.tuples[row]] == 0:
+                        self.alive[var][i] = False
+        self.domainSize = {var: int(self.alive[var].sum()) for var in self.csp.variables}
+        self.trail = []
+
+        # The ordering factors of the symmetry groups are kept, so AC-3 also
+        # narrows the rank windows of unassigned groupmates.
+        self.compatible = {}
+        self.factorWeight = {}
+        for var1 in self.csp.variables:
+            values1 = [self.table.tuples[row] for row in self.csp.domainIndices[var1].tolist()]
+            for var2, factor in self.csp.binaryFactors[var1].iteritems():
+                self.factorWeight[var1, var2] = 1
+                values2 = [self.table.tuples[row] for row in self.csp.domainIndices[var2].tolist()]
+                if hasattr(factor, 'compatible'):
+                    self.compatible[var1, var2] = factor.compatible(values1, values2)
+                else:
+                    self.compatible[var1, var2] = np.array([[factor[val1][val2] != 0 for val2 in values2] \
+                        for val1 in values1], dtype=bool).reshape(len(values1), len(values2))
+
+    def remove_values(self, var, positions):
+        """
+        Removes |positions| from the live domain of |var|, recording them on
+        the trail.
+        """
+        self.alive[var][positions] = False
+        self.domainSize[var] -= len(positions)
+        self.trail.append((var, positions))
+
+    def restore_domains(self, mark):
+        """
+        Undoes the removals made since the trail had length |mark|.
+        """
+        while len(self.trail) > mark:
+            var, positions = self.trail.pop()
+            self.alive[var][positions] = True
+            self.domainSize[var] += len(positions)
+
+    def arc_consistency_check(self, assignment, var, row):
+        """
+        Perform the AC-3 algorithm after |var| was assigned the value at
+        |row| of the player table: the domain of |var| is reduced to that
+        value, then values of the unassigned variables without support in a
+        neighbor's domain are removed until every arc is consistent. Without
+        self.ac3 only the neighbors of |var| are revised (forward checking).
+        All removals go on the trail, to be undone with restore_domains.
+
+        @return consistent: False if a domain became empty.
+        """
+        # Nothing to propagate without binary factors; the domain of an
+        # assigned variable is only read as support for its neighbors.
+        if not self.csp.binaryFactors[var]:
+            return True
+        others = np.flatnonzero(self.alive[var])
+        others = others[others != self.positionOf[var][row]]
+        if len(others):
+            self.remove_values(var, others)
+
+        queue = [var]
+        while queue:
+            var1 = queue.pop(0)
+            for var2 in self.csp.get_neighbor_vars(var1):
+                if var2 in assignment:
+                    continue
+                # values of var2 that no live value of var1 supports
+                supported = self.compatible[var2, var1][:, self.alive[var1]].any(axis=1)
+                unsupported = np.flatnonzero(self.alive[var2] & ~supported)
+                if len(unsupported):
+                    self.remove_values(var2, unsupported)
+                    if self.domainSize[var2] == 0:
+                        self.factorWeight[var1, var2] += 1
+                        self.factorWeight[var2, var1] += 1
+                        return False
+                    if self.ac3 and var2 not in queue:
+                        queue.append(var2)
+        return True
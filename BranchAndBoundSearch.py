@@ -0,0 +1,274 @@
+# An exact branch and bound solver for the max-projection lineup.
+# Usage:
+#   search = BranchAndBoundSearch()
+#   search.solve(csp)
+#   search.print_stats()
+#   search.optimalAssignment, search.optimalProjection, search.gap, search.absoluteGap
+
+from bisect import bisect_right
+
+class KnapsackBound():
+    """
+    Upper bounds on the projection that the remaining slots of a lineup can
+    add for a given salary budget, shared by the exact and top-K searches.
+    """
+
+    def __init__(self, domains):
+        """
+        Precomputes the LP relaxation of the multiple-choice knapsack over
+        every suffix of |domains|, a list with the domain of each slot in
+        search order. For each slot, only the players on the
+        upper convex hull of (salary, projection) matter to the relaxation;
+        starting from the cheapest player of every remaining slot, the LP
+        optimum takes hull upgrades in order of decreasing projection gained
+        per dollar until the budget runs out, the last one fractionally.
+
+        For depth d, self.baseSalary[d] / self.baseProjection[d] hold the sums
+        over the cheapest hull player of each remaining slot, and
+        self.upgradeSalary[d] / self.upgradeProjection[d] the cumulative
+        salary and projection of the sorted upgrades.
+        """
+        upgrades = []
+        bases = []
+        for domain in domains:
+            hull = self.convexHull(domain)
+            bases.append(hull[0])
+            slotUpgrades = []
+            for i in range(1, len(hull)):
+                dSalary = hull[i][0] - hull[i - 1][0]
+                dProjection = hull[i][1] - hull[i - 1][1]
+                slotUpgrades.append((dProjection / dSalary, dSalary, dProjection))
+            upgrades.append(slotUpgrades)
+
+        numSlots = len(domains)
+        self.baseSalary = [0] * (numSlots + 1)
+        self.baseProjection = [0.0] * (numSlots + 1)
+        self.upgradeSalary = [[] for _ in range(numSlots + 1)]
+        self.upgradeProjection = [[] for _ in range(numSlots + 1)]
+        self.upgrades = [[] for _ in range(numSlots + 1)]
+        # The largest salary the slots from depth d on can add, for the
+        # salary floor.
+        self.maxSalary = [0] * (numSlots + 1)
+        for d in range(numSlots - 1, -1, -1):
+            if bases[d] is None:
+                # An empty domain makes every suffix containing it infeasible.
+                self.baseSalary[d] = float('inf')
+                continue
+            self.maxSalary[d] = self.maxSalary[d + 1] + max(tup[1] for tup in domains[d])
+            self.baseSalary[d] = self.baseSalary[d + 1] + bases[d][0]
+            self.baseProjection[d] = self.baseProjection[d + 1] + bases[d][1]
+            self.upgrades[d] = sorted(self.upgrades[d + 1] + upgrades[d], reverse=True)
+            salarySum = 0
+            projectionSum = 0.0
+            for efficiency, dSalary, dProjection in self.upgrades[d]:
+                salarySum += dSalary
+                projectionSum += dProjection
+                self.upgradeSalary[d].append(salarySum)
+                self.upgradeProjection[d].append(projectionSum)
+
+    def convexHull(self, domain):
+        """
+        Returns the upper-left convex hull of the (salary, projection) points
+        of |domain|, sorted by increasing salary, or [None] if the domain is
+        empty.
+        """
+        if not domain:
+            return [None]
+        # Cheapest first; among equal salaries keep the best projection.
+        points = sorted(set((float(tup[1]), float(tup[2])) for tup in domain), \
+            key=lambda pt: (pt[0], -pt[1]))
+        hull = []
+        for point in points:
+            if hull and point[0] == hull[-1][0]:
+                continue
+            if hull and point[1] <= hull[-1][1]:
+                continue
+            while len(hull) >= 2:
+                (x1, y1), (x2, y2) = hull[-2], hull[-1]
+                # Drop the middle point if it lies on or below the chord.
+                if (y2 - y1) * (point[0] - x1) <= (point[1] - y1) * (x2 - x1):
+                    hull.pop()
+                else:
+                    break
+            hull.append(point)
+        return hull
+
+    def relaxationBound(self, depth, budget):
+        """
+        Returns an upper bound on the projection the slots from |depth| on can
+        add with |budget| salary left, or None if even the cheapest players
+        do not fit.
+        """
+        base = self.baseSalary[depth]
+        if base > budget:
+            return None
+        spare = budget - base
+        salaries = self.upgradeSalary[depth]
+        i = bisect_right(salaries, spare)
+        bound = self.baseProjection[depth]
+        if i > 0:
+            bound += self.upgradeProjection[depth][i - 1]
+        if i < len(salaries):
+            efficiency, dSalary, dProjection = self.upgrades[depth][i]
+            used = salaries[i - 1] if i > 0 else 0
+            bound += efficiency * (spare - used)
+        return bound
+
+class BranchAndBoundSearch():
+
+    def reset_results(self):
+        """
+        Resets the statistics of the solver.
+        """
+        # Best complete assignment found and its total projection. The
+        # incumbent starts at -inf so that lineups with a projection of 0 or
+        # less are still found (and not pruned by the bound).
+        self.optimalAssignment = {}
+        self.optimalProjection = float('-inf')
+
+        # LP-relaxation bound at the root, and the best upper bound on the
+        # optimum that is still valid when the search stops.
+        self.rootBound = 0.0
+        self.upperBound = 0.0
+
+        # Absolute optimality gap upperBound - optimalProjection, and the
+        # relative gap, divided by |upperBound|. Both are 0 whenever the
+        # search ran to completion and inf if it was aborted before finding
+        # a lineup.
+        self.absoluteGap = 0.0
+        self.gap = 0.0
+
+        # Number of nodes expanded and number of subtrees cut by the bound.
+        self.numNodes = 0
+        self.numPruned = 0
+
+        # Whether the search stopped because maxNodes was reached.
+        self.aborted = False
+
+    def print_stats(self):
+        """
+        Prints a message summarizing the outcome of the solver.
+        """
+        if self.optimalAssignment:
+            print "Best projection %f (bound %f, gap %f or %.4f%%) in %d nodes" % \
+                (self.optimalProjection, self.upperBound, self.absoluteGap, 100 * self.gap, self.numNodes)
+        elif self.aborted:
+            print "No solution was found in %d nodes." % self.numNodes
+        else:
+            print "No solution was found."
+
+    def solve(self, csp, maxNodes = None):
+        """
+        Finds the lineup with the highest total projection whose total salary
+        is within the salary floor and cap of |csp| (see
+        CSP.get_salary_bounds). Each variable of |csp| is one roster slot
+        whose domain holds (player, salary, projection, efficiency) tuples, as
+        built by createCSPWithVariables. Binary factors (e.g. RB1 != RB2) are
+        respected.
+
+        @param csp: A weighted CSP with a salary cap, as added by addConstraints.
+        @param maxNodes: Optional limit on the number of expanded nodes. If it
+            is reached, the best lineup so far is kept and |gap| reports how
+            far it can be from the optimum.
+        """
+        self.csp = csp
+        self.salaryFloor, self.salaryCap = csp.get_salary_bounds()
+        self.maxNodes = maxNodes
+        self.reset_results()
+
+        self.order = list(csp.variables)
+        # Try the highest projected players first so good incumbents are found early.
+        self.domains = [sorted(csp.values[var], key=lambda tup: tup[2], reverse=True) \
+            for var in self.order]
+        self.bound = KnapsackBound(self.domains)
+
+        self.rootBound = self.bound.relaxationBound(0, self.salaryCap)
+        self.upperBound = self.rootBound
+        if self.rootBound is None:
+            self.upperBound = 0.0
+            return
+
+        openBound = self.branch({}, 0, 0, 0.0)
+        if self.aborted:
+            self.upperBound = max(self.optimalProjection, openBound)
+        else:
+            self.upperBound = self.optimalProjection
+        if not self.optimalAssignment:
+            if self.aborted:
+                self.absoluteGap = self.gap = float('inf')
+            return
+        self.absoluteGap = self.upperBound - self.optimalProjection
+        if self.absoluteGap > 0:
+            self.gap = self.absoluteGap / abs(self.upperBound) if self.upperBound != 0 else float('inf')
+
+    def branch(self, assignment, depth, salary, projection):
+        """
+        Depth-first branch and bound over the slots in self.order.
+
+        @return: When the search is aborted, the largest relaxation bound of
+            the subtrees left unexplored below this node; otherwise -inf.
+        """
+        self.numNodes += 1
+        if depth == len(self.order):
+            if not self.optimalAssignment or projection > self.optimalProjection:
+                self.optimalProjection = projection
+                self.optimalAssignment = {var: assignment[var] for var in self.order}
+            return float('-inf')
+
+        var = self.order[depth]
+        for index, val in enumerate(self.domains[depth]):
+            if self.maxNodes is not None and self.numNodes >= self.maxNodes:
+                self.aborted = True
+                return self.openBound(depth, salary, projection, index)
+            newSalary = salary + val[1]
+            if not self.salaryFits(depth, newSalary):
+                continue
+            if not self.consistent(assignment, var, val):
+                continue
+            rest = self.bound.relaxationBound(depth + 1, self.salaryCap - newSalary)
+            if rest is None or projection + val[2] + rest <= self.optimalProjection:
+                self.numPruned += 1
+                continue
+            assignment[var] = val
+            openBound = self.branch(assignment, depth + 1, newSalary, projection + val[2])
+            del assignment[var]
+            if self.aborted:
+                return max(openBound, self.openBound(depth, salary, projection, index + 1))
+        return float('-inf')
+
+    def openBound(self, depth, salary, projection, start):
+        """
+        Returns the largest relaxation bound over the values of slot |depth|
+        from index |start| on, given the partial salary and projection, or
+        -inf if none of them fits.
+        """
+        bound = float('-inf')
+        for val in self.domains[depth][start:]:
+            newSalary = salary + val[1]
+            if not self.salaryFits(depth, newSalary):
+                continue
+            rest = self.bound.relaxationBound(depth + 1, self.salaryCap - newSalary)
+            if rest is not None:
+                bound = max(bound, projection + val[2] + rest)
+        return bound
+
+    def salaryFits(self, depth, salary):
+        """
+        Returns whether a lineup with |salary| for the slots up to |depth|
+        can still end up between the salary floor and cap.
+        """
+        if salary > self.salaryCap:
+            return False
+        return self.salaryFloor is None or salary + self.bound.maxSalary[depth + 1] >= self.salaryFloor
+
+    def consistent(self, assignment, var, val):
+        """
+        Returns whether |val| for |var| satisfies every unary and binary
+        factor against the assigned variables.
+        """
+        if self.csp.unaryFactors[var] and self.csp.unaryFactors[var][val] == 0:
+            return False
+        for var2, factor in self.csp.binaryFactors[var].iteritems():
+            if var2 in assignment and factor[val][assignment[var2]] == 0:
+                return False
+        return True
@@ -0,0 +1,50 @@
+# Writing lineups as a FanDuel upload file, one row at a time.
+# Usage:
+#   with open('upload.csv', 'wb') as outputfile:
+#       writer = FanDuelWriter(outputfile, csp)
+#       for assignment in search.iter_lineups(csp, numLineups, ep_greedy, comparisonIndex):
+#           writer.write(assignment)
+
+import csv
+from PlayerTable import ensurePlayerTable
+
+class FanDuelWriter():
+
+    def __init__(self, outputfile, csp, writeHeader = True):
+        """
+        Writes the header row of the upload file: one column per variable of
+        |csp|, named by its position (QB, RB, RB, WR, WR, WR, TE, K, D);
+        disable |writeHeader| when appending to an upload file.
+
+        @param outputfile: A file opened for writing ('wb' for the csv module).
+        @param csp: The CSP the lineups come from, as built by
+            createCSPWithVariables; for a future week its player table holds
+            the Id column of the FanDuel salary file.
+        """
+        self.table = ensurePlayerTable(csp)
+        self.variables = list(csp.variables)
+        self.writer = csv.writer(outputfile)
+        if writeHeader:
+            self.writer.writerow([var.rstrip('0123456789') for var in self.variables])
+
+        # Number of lineup rows written.
+        self.numRows = 0
+
+    def write(self, assignment):
+        """
+        Writes the player Ids of a complete |assignment| (a dictionary from
+        variable to domain value) as one row.
+        """
+        self.writeIndices([self.table.rowOf[assignment[var]] for var in self.variables])
+
+    def writeIndices(self, indices):
+        """
+        write for a lineup given as one player-table index per variable, such
+        as a row of LineupSet.indices().
+        """
+        ids = [self.table.ids[row] for row in indices]
+        for row, playerId in zip(indices, ids):
+            if not playerId:
+                raise Exception('No FanDuel Id for %s' % self.table.names[row])
+        self.writer.writerow(ids)
+        self.numRows += 1
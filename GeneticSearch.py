@@ -0,0 +1,336 @@
+# A genetic algorithm that evolves lineup populations on islands, optionally
+# in worker processes, and returns the best distinct lineups it saw.
+# Usage:
+#   search = GeneticSearch(numWorkers = 4)
+#   search.solve(csp, numLineups, comparisonIndex, seed = [0])
+#   search.allAssignments   # LineupSet, best projection first
+
+import multiprocessing
+import numpy as np
+from AliasSampler import AliasTable
+from LineupFilter import LineupFilter
+from LineupSet import LineupSet
+from PlayerTable import ensurePlayerTable
+
+# The CSP being solved and its LineupFilter, set once per worker process by
+# setIslandCSP so they are not pickled with every job.
+islandCSP = None
+islandFilter = None
+
+def setIslandCSP(csp):
+    global islandCSP, islandFilter
+    islandCSP = csp
+    islandFilter = LineupFilter(csp)
+
+def slotGroups(lineupFilter):
+    """
+    Returns the columns crossover exchanges together: each symmetry group
+    (e.g. the WR trio) and every other slot on its own.
+    """
+    grouped = set()
+    groups = []
+    for columns, rankOfRow in lineupFilter.groups:
+        groups.append(list(columns))
+        grouped.update(columns)
+    for j in range(len(lineupFilter.variables)):
+        if j not in grouped:
+            groups.append([j])
+    return groups
+
+def violation(lineupFilter, lineups):
+    """
+    Returns how far each lineup is from satisfying the linear constraints,
+    plus a large penalty per repeated player within a symmetry group.
+    """
+    total = np.zeros(len(lineups))
+    for (columns, values, lower, upper), totals in zip(lineupFilter.linear, lineupFilter.linearTotals(lineups)):
+        if lower is not None:
+            total += np.maximum(lower - totals, 0)
+        if upper is not None:
+            total += np.maximum(totals - upper, 0)
+    for columns, rankOfRow in lineupFilter.groups:
+        for a in range(len(columns)):
+            for b in range(a + 1, len(columns)):
+                total += 1e6 * (lineups[:, columns[a]] == lineups[:, columns[b]])
+    return total
+
+def repair(lineupFilter, lineups, numRounds):
+    """
+    Moves lineups that break the salary bounds (or repeat a player within a
+    group) towards feasibility, in place: every round each such lineup
+    tries a uniformly drawn player for one random slot and keeps it unless
+    the violation grows.
+    """
+    bad = np.flatnonzero(violation(lineupFilter, lineups) > 0)
+    for r in range(numRounds):
+        if not len(bad):
+            break
+        before = violation(lineupFilter, lineups[bad])
+        slots = np.random.randint(len(lineupFilter.domains), size=len(bad))
+        candidates = lineups[bad].copy()
+        for j, domain in enumerate(lineupFilter.domains):
+            mutated = np.flatnonzero(slots == j)
+            if len(mutated) and len(domain):
+                candidates[mutated, j] = domain[np.random.randint(len(domain), size=len(mutated))]
+        after = violation(lineupFilter, candidates)
+        keep = after <= before
+        lineups[bad[keep]] = candidates[keep]
+        bad = bad[after > 0]
+
+def boundedDraw(lineupFilter, lineups, j, draw, weights, numTries = 8):
+    """
+    Returns a new player for slot |j| of each of |lineups|, drawn with
+    draw(j, n) among the players that keep the lineup within the bounds of
+    every linear constraint (the salary floor and cap). Draws are rejected
+    for up to |numTries| rounds; after that the player is drawn exactly from
+    the acceptable ones, with probability proportional to |weights| (the
+    weights of slot j's domain). A lineup no player fits keeps its player.
+    """
+    domain = lineupFilter.domains[j]
+    result = lineups[:, j].copy()
+    # the range of each constraint's values that slot j may take
+    bounds = []
+    for (columns, values, lower, upper), totals in zip(lineupFilter.linear, lineupFilter.linearTotals(lineups)):
+        if j in columns:
+            rest = totals - values[lineups[:, j]]
+            low = lower - rest if lower is not None else np.full(len(lineups), -np.inf)
+            high = upper - rest if upper is not None else np.full(len(lineups), np.inf)
+            bounds.append((values, low, high))
+
+    pending = np.arange(len(lineups))
+    for attempt in range(numTries):
+        if not len(pending):
+            return result
+        candidates = draw(j, len(pending))
+        fits = np.ones(len(pending), dtype=bool)
+        for values, low, high in bounds:
+            fits &= (values[candidates] >= low[pending]) & (values[candidates] <= high[pending])
+        result[pending[fits]] = candidates[fits]
+        pending = pending[~fits]
+
+    for i in pending.tolist():
+        fits = np.ones(len(domain), dtype=bool)
+        for values, low, high in bounds:
+            fits &= (values[domain] >= low[i]) & (values[domain] <= high[i])
+        if not fits.any():
+            continue
+        p = np.where(fits, weights, 0)
+        p = p / p.sum() if p.sum() > 0 else fits / float(fits.sum())
+        result[i] = domain[np.random.choice(len(domain), p=p)]
+    return result
+
+def evolveIsland(job):
+    """
+    Evolves one island for a number of generations and returns its final
+    population (best first), the distinct feasible lineups it saw (up to
+    archiveSize, best first, canonical) with their projections, and the
+    number of lineups evaluated.
+    """
+    islandSeed, population, numGenerations, comparisonIndex, populationSize, \
+        mutationRate, numElites, numRepairRounds, archiveSize = job
+    np.random.seed(islandSeed)
+    lineupFilter = islandFilter
+    table = islandFilter.table
+    domains = lineupFilter.domains
+    numVars = len(domains)
+    groups = slotGroups(lineupFilter)
+    weights = [np.where(allowed, table.column(comparisonIndex)[rows], 0).astype(float) \
+        for rows, allowed in zip(domains, lineupFilter.allowed)]
+    aliases = [AliasTable(w) for w in weights]
+
+    def draw(j, n):
+        return domains[j][aliases[j].drawMany(np.random.random_sample(n))]
+
+    if population is None:
+        population = np.empty((populationSize, numVars), dtype=np.int64)
+        for j in range(numVars):
+            population[:, j] = draw(j, populationSize)
+        repair(lineupFilter, population, numRepairRounds)
+
+    archive = []
+    numEvaluations = 0
+    for generation in range(numGenerations + 1):
+        # batch fitness: total projection; infeasible lineups and repeats of
+        # a lineup already in the population come last, which keeps the
+        # population diverse enough to fill large portfolios
+        feasible = lineupFilter.feasible(population)
+        first = uniqueLineups(lineupFilter.canonical(population.copy()))[1]
+        distinct = np.zeros(len(population), dtype=bool)
+        distinct[first] = True
+        fitness = np.where(feasible & distinct, table.projections[population].sum(axis=1), -np.inf)
+        numEvaluations += len(population)
+        order = np.argsort(-fitness, kind='mergesort')
+        population = population[order]
+        fitness = fitness[order]
+        archive.append(lineupFilter.canonical(population[(feasible & distinct)[order]].copy()))
+        if generation == numGenerations:
+            break
+
+        # binary tournaments (the population is sorted, so the lower index wins)
+        picks = np.random.randint(len(population), size=(2, 2, populationSize))
+        parentsA = population[picks[0].min(axis=0)]
+        parentsB = population[picks[1].min(axis=0)]
+
+        # crossover exchanges whole slot groups
+        children = parentsA.copy()
+        for columns in groups:
+            fromB = np.random.random_sample(populationSize) < 0.5
+            children[np.ix_(fromB, columns)] = parentsB[np.ix_(fromB, columns)]
+
+        # mutation replaces one player, drawn as for the initial population
+        # but only among those that keep the lineup within the salary bounds
+        mutated = np.flatnonzero(np.random.random_sample(populationSize) < mutationRate)
+        slots = np.random.randint(numVars, size=len(mutated))
+        for j in range(numVars):
+            rows = mutated[slots == j]
+            if len(rows):
+                children[rows, j] = boundedDraw(lineupFilter, children[rows], j, draw, weights[j])
+        repair(lineupFilter, children, numRepairRounds)
+
+        population = np.vstack([population[:numElites], children[:populationSize - numElites]])
+
+    lineups = np.vstack(archive) if archive else np.empty((0, numVars), dtype=np.int64)
+    lineups, first = uniqueLineups(lineups)
+    projections = table.projections[lineups].sum(axis=1)
+    best = np.argsort(-projections, kind='mergesort')[:archiveSize]
+    return population, lineups[best], projections[best], numEvaluations
+
+def uniqueLineups(lineups):
+    """
+    Returns the distinct rows of |lineups| in order of first appearance,
+    and the index of each one's first appearance.
+    """
+    if not len(lineups):
+        return lineups, np.empty(0, dtype=np.int64)
+    rows, first = np.unique(lineups, axis=0, return_index=True)
+    first.sort()
+    return lineups[first], first
+
+class GeneticSearch():
+
+    def __init__(self, numWorkers = 1, numIslands = 4, populationSize = 1000, numEpochs = 5, \
+            generationsPerEpoch = 10, mutationRate = 0.3, numElites = 20, numMigrants = 10, \
+            numRepairRounds = 20, maxReseeds = 10):
+        """
+        @param numWorkers: Number of worker processes (1 runs in-process).
+        @param numIslands: Number of independently evolving populations. The
+            output depends only on the seed and the parameters here other
+            than numWorkers.
+        @param populationSize: Lineups per island.
+        @param numEpochs: Number of times the islands exchange migrants.
+        @param generationsPerEpoch: Generations each island evolves between
+            migrations.
+        @param mutationRate: Fraction of children with one player replaced.
+        @param numElites: Best lineups of an island kept every generation.
+        @param numMigrants: Best lineups of each island that replace the
+            worst of the next island after every epoch.
+        @param numRepairRounds: Repair rounds for lineups outside the salary
+            bounds; lineups still infeasible get the lowest fitness.
+        @param maxReseeds: Number of extra epochs at most, each from new
+            random populations, run while fewer distinct feasible lineups
+            than requested were found.
+        """
+        self.numWorkers = numWorkers
+        self.numIslands = numIslands
+        self.populationSize = populationSize
+        self.numEpochs = numEpochs
+        self.generationsPerEpoch = generationsPerEpoch
+        self.mutationRate = mutationRate
+        self.numElites = numElites
+        self.numMigrants = numMigrants
+        self.numRepairRounds = numRepairRounds
+        self.maxReseeds = maxReseeds
+
+    def reset_results(self):
+        # Best distinct feasible lineups seen on any island, best first.
+        self.allAssignments = LineupSet(self.csp)
+
+        # Number of lineups whose fitness was evaluated, and of extra epochs
+        # from new populations.
+        self.numEvaluations = 0
+        self.numReseeds = 0
+
+    def print_stats(self):
+        print 'Genetic search: %d lineups evaluated over %d islands, %d kept' % \
+            (self.numEvaluations, self.numIslands, len(self.allAssignments))
+
+    def solve(self, csp, numLineups, comparisonIndex, seed = [0]):
+        """
+        Evolves the islands and stores the |numLineups| lineups with the
+        highest projection among all feasible lineups seen in
+        self.allAssignments. Island i is seeded from seed + [i, epoch];
+        |comparisonIndex| weights the players drawn for the initial
+        populations and for mutations (1 salary, 2 projection,
+        3 efficiency).
+
+        Islands converge, so if fewer than |numLineups| distinct feasible
+        lineups were seen after numEpochs, every island restarts from a new
+        random population for another epoch, until enough were seen, an
+        epoch adds none or maxReseeds epochs ran. A shortfall is reported.
+        """
+        self.csp = csp
+        self.reset_results()
+        ensurePlayerTable(csp)
+
+        if self.numWorkers > 1:
+            pool = multiprocessing.Pool(self.numWorkers, setIslandCSP, (csp,))
+            mapJobs = pool.map
+        else:
+            pool = None
+            setIslandCSP(csp)
+            mapJobs = lambda evolve, jobs: [evolve(job) for job in jobs]
+
+        populations = [None] * self.numIslands
+        archives = []
+        numFound = 0
+        epoch = 0
+        completed = False
+        try:
+            while True:
+                jobs = [(list(seed) + [i, epoch], populations[i], self.generationsPerEpoch, comparisonIndex, \
+                    self.populationSize, self.mutationRate, self.numElites, self.numRepairRounds, numLineups) \
+                    for i in range(self.numIslands)]
+                results = mapJobs(evolveIsland, jobs)
+                populations = [result[0] for result in results]
+                for population, lineups, projections, numEvaluations in results:
+                    archives.append((lineups, projections))
+                    self.numEvaluations += numEvaluations
+
+                # ring migration: the best of island i replace the worst of i + 1
+                if self.numIslands > 1 and self.numMigrants > 0:
+                    migrants = [population[:self.numMigrants].copy() for population in populations]
+                    for i in range(self.numIslands):
+                        populations[i][-self.numMigrants:] = migrants[i - 1]
+
+                epoch += 1
+                if epoch < self.numEpochs:
+                    continue
+                found = len(uniqueLineups(np.vstack([archive[0] for archive in archives]))[0])
+                if found >= numLineups or self.numReseeds == self.maxReseeds or \
+                        (self.numReseeds > 0 and found == numFound):
+                    break
+                numFound = found
+                self.numReseeds += 1
+                populations = [None] * self.numIslands
+            completed = True
+        finally:
+            # an island that raised (or ^C) must not leave the workers running
+            if pool is not None:
+                if not completed:
+                    pool.terminate()
+                else:
+                    pool.close()
+                pool.join()
+
+        # (the comprehensions must not rebind lineups: Python 2 leaks their names)
+        lineups = np.vstack([archive[0] for archive in archives])
+        projections = np.concatenate([archive[1] for archive in archives])
+        lineups, first = uniqueLineups(lineups)
+        projections = projections[first]
+        for i in np.argsort(-projections, kind='mergesort').tolist():
+            if len(self.allAssignments) >= numLineups:
+                break
+            self.allAssignments.appendUniqueIndices(lineups[i].tolist())
+        if len(self.allAssignments) < numLineups:
+            print 'Genetic search found only %d distinct feasible lineups of the %d requested' % \
+                (len(self.allAssignments), numLineups)
@@ -0,0 +1,118 @@
+# Vectorized constraint checks for batches of complete lineups.
+# Usage:
+#   lineupFilter = LineupFilter(csp)
+#   mask = lineupFilter.feasible(lineups)   # lineups: (N, numVars) player rows
+#   lineups = lineupFilter.canonical(lineups[mask])
+
+import numpy as np
+from PlayerTable import ensurePlayerTable
+
+class LineupFilter():
+
+    def __init__(self, csp):
+        """
+        Precomputes, for the variables of |csp| in order, the position of
+        every player in each domain, the values the unary factors allow,
+        a compatibility matrix per binary factor outside the symmetry
+        groups, the player ranks of each group and the columns of each
+        linear constraint.
+        """
+        table = ensurePlayerTable(csp)
+        self.table = table
+        self.variables = list(csp.variables)
+        column = dict((var, j) for j, var in enumerate(self.variables))
+        self.domains = [csp.domainIndices[var] for var in self.variables]
+
+        self.positionOf = []
+        self.allowed = []
+        for var, rows in zip(self.variables, self.domains):
+            positionOf = np.full(len(table), -1, dtype=np.int64)
+            positionOf[rows] = np.arange(len(rows))
+            self.positionOf.append(positionOf)
+            mask = np.ones(len(rows), dtype=bool)
+            if csp.unaryFactors[var]:
+                mask = np.array([csp.unaryFactors[var][table.tuples[row]] != 0 \
+                    for row in rows.tolist()], dtype=bool)
+            self.allowed.append(mask)
+
+        # Symmetry groups need distinct values and are sorted on completion;
+        # every other binary factor is checked with a compatibility matrix.
+        grouped = set()
+        self.groups = []
+        for group, rank in zip(csp.symmetryGroups, csp.symmetryRanks):
+            rankOfRow = np.full(len(table), -1, dtype=np.int64)
+            for val, r in rank.iteritems():
+                rankOfRow[table.rowOf[val]] = r
+            self.groups.append(([column[var] for var in group], rankOfRow))
+            for var1 in group:
+                for var2 in group:
+                    grouped.add((var1, var2))
+        self.factors = []
+        for var1 in self.variables:
+            for var2, factor in csp.binaryFactors[var1].iteritems():
+                if column[var1] > column[var2] or (var1, var2) in grouped:
+                    continue
+                values1 = [table.tuples[row] for row in csp.domainIndices[var1].tolist()]
+                values2 = [table.tuples[row] for row in csp.domainIndices[var2].tolist()]
+                compatible = np.array([[factor[val1][val2] != 0 for val2 in values2] \
+                    for val1 in values1], dtype=bool).reshape(len(values1), len(values2))
+                self.factors.append((column[var1], column[var2], compatible))
+
+        # (columns, values per player row, lower, upper) per linear constraint
+        self.linear = [([column[var] for var in constraint.variables], table.column(constraint.attribute), \
+            constraint.lower, constraint.upper) for constraint in csp.linearConstraints]
+
+    def positions(self, lineups):
+        """
+        Returns the domain positions of the players of |lineups|, -1 for a
+        player outside its slot's domain.
+        """
+        positions = np.empty(lineups.shape, dtype=np.int64)
+        for j in range(len(self.variables)):
+            positions[:, j] = self.positionOf[j][lineups[:, j]]
+        return positions
+
+    def linearTotals(self, lineups):
+        """
+        Returns the total of every linear constraint for each lineup.
+        """
+        return [values[lineups[:, columns]].sum(axis=1) for columns, values, lower, upper in self.linear]
+
+    def feasible(self, lineups, positions = None):
+        """
+        Returns a boolean mask of the lineups that satisfy every factor, have
+        distinct players within each symmetry group and satisfy the linear
+        constraints.
+        """
+        if positions is None:
+            positions = self.positions(lineups)
+        feasible = np.ones(len(lineups), dtype=bool)
+        for j in range(len(self.variables)):
+            inDomain = positions[:, j] >= 0
+            feasible &= inDomain
+            feasible[inDomain] &= self.allowed[j][positions[inDomain, j]]
+        if not feasible.any():
+            return feasible
+        for j1, j2, compatible in self.factors:
+            feasible &= compatible[positions[:, j1], positions[:, j2]]
+        for columns, rankOfRow in self.groups:
+            for a in range(len(columns)):
+                for b in range(a + 1, len(columns)):
+                    feasible &= lineups[:, columns[a]] != lineups[:, columns[b]]
+        for (columns, values, lower, upper), totals in zip(self.linear, self.linearTotals(lineups)):
+            if lower is not None:
+                feasible &= totals >= lower
+            if upper is not None:
+                feasible &= totals <= upper
+        return feasible
+
+    def canonical(self, lineups):
+        """
+        Puts the players of each symmetry group of |lineups| in canonical
+        order, in place, and returns |lineups|.
+        """
+        for columns, rankOfRow in self.groups:
+            members = lineups[:, columns]
+            order = np.argsort(rankOfRow[members], axis=1)
+            lineups[:, columns] = members[np.arange(len(members))[:, None], order]
+        return lineups
@@ -0,0 +1,156 @@
+# A compact container for the lineups found by a search.
+# Usage:
+#   lineups = LineupSet(csp)
+#   lineups.append(assignment)
+#   lineups.appendUnique(assignment)   # False if the roster is already there
+#   lineups.projectionTotals(), lineups.scoreTotals(scores)
+#   for assignment in lineups: ...   # dicts, as in allAssignments before
+# A lineup costs 36 bytes of matrix (nine int32 indices, up to twice that
+# while the matrix grows) plus, unless checkDuplicates is disabled, about
+# 100 bytes of fingerprint. With neither kept, memory is constant.
+
+import numpy as np
+from PlayerTable import ensurePlayerTable
+
+class LineupSet():
+
+    def __init__(self, csp, capacity = 1024, keepLineups = True, checkDuplicates = True):
+        """
+        Takes the player table of the slate from |csp| and builds an empty
+        (N, numVars) int32 matrix of indices into it, one row per lineup
+        and one column per variable of the CSP.
+
+        @param csp: A CSP whose domains hold (player, salary, projection,
+            efficiency) tuples, as built by createCSPWithVariables.
+        @param keepLineups: When disabled, lineups are only counted (and
+            fingerprinted, if checkDuplicates); the matrix stays empty.
+        @param checkDuplicates: When disabled, no fingerprints are kept and
+            appendUnique adds every lineup; for callers that cannot produce
+            the same roster twice, such as a depth-first search over
+            canonical lineups.
+        """
+        self.variables = list(csp.variables)
+
+        # The player table: every domain value, and its row.
+        table = ensurePlayerTable(csp)
+        self.players = table.tuples
+        self.playerIndex = table.rowOf
+        self.salaries = table.salaries.astype(float)
+        self.projections = table.projections
+
+        self.keepLineups = keepLineups
+        self.lineups = np.zeros((capacity if keepLineups else 0, len(self.variables)), dtype=np.int32)
+        self.numLineups = 0
+
+        # Order-independent 64-bit fingerprints (hash of the sorted player
+        # indices) of the lineups (None without checkDuplicates), and how
+        # many appendUnique calls found / missed a match.
+        self.fingerprints = set() if checkDuplicates else None
+        self.dedupHits = 0
+        self.dedupMisses = 0
+
+    def __len__(self):
+        return self.numLineups
+
+    def __getitem__(self, i):
+        """
+        Returns lineup |i| as a dictionary from variable to domain value, the
+        format BacktrackingSearch used to store in allAssignments.
+        """
+        if i < 0:
+            i += self.numLineups
+        if not 0 <= i < self.numLineups:
+            raise IndexError("lineup index out of range: %d" % i)
+        row = self.lineups[i]
+        return {var: self.players[row[j]] for j, var in enumerate(self.variables)}
+
+    def __iter__(self):
+        for i in range(self.numLineups):
+            yield self[i]
+
+    def append(self, assignment):
+        """
+        Adds a complete assignment (a dictionary from variable to domain
+        value) as a new lineup.
+        """
+        self.appendIndices([self.playerIndex[assignment[var]] for var in self.variables])
+
+    def appendUnique(self, assignment):
+        """
+        Adds a complete assignment unless a lineup with the same players, in
+        any slot order, is already in the set.
+
+        @return: True if the lineup was added, False if it was a duplicate.
+        """
+        return self.appendUniqueIndices([self.playerIndex[assignment[var]] for var in self.variables])
+
+    def appendUniqueIndices(self, indices):
+        """
+        appendUnique for a lineup given as one player-table index per variable.
+        """
+        if self.fingerprints is not None and self.fingerprint(indices) in self.fingerprints:
+            self.dedupHits += 1
+            return False
+        self.dedupMisses += 1
+        self.appendIndices(indices)
+        return True
+
+    def appendIndices(self, indices):
+        """
+        Adds a lineup given as one player-table index per variable.
+        """
+        if self.fingerprints is not None:
+            self.fingerprints.add(self.fingerprint(indices))
+        if not self.keepLineups:
+            self.numLineups += 1
+            return
+        if self.numLineups == len(self.lineups):
+            grown = np.zeros((2 * len(self.lineups), len(self.variables)), dtype=np.int32)
+            grown[:self.numLineups] = self.lineups
+            self.lineups = grown
+        self.lineups[self.numLineups] = indices
+        self.numLineups += 1
+
+    def fingerprint(self, indices):
+        return hash(tuple(sorted(indices)))
+
+    def indices(self):
+        """
+        Returns the (N, numVars) matrix of player indices of the lineups.
+        """
+        return self.lineups[:self.numLineups]
+
+    def playerVector(self, values, default = 0.0):
+        """
+        Returns a vector over the player table of |values|, a dictionary
+        keyed by player name such as the scores or projections returned by
+        getSalariesAndPositions and getProjections.
+        """
+        return np.array([values.get(val[0], default) for val in self.players], dtype=float)
+
+    def totals(self, playerValues):
+        """
+        Returns the sum of |playerValues|, a vector over the player table,
+        for every lineup.
+        """
+        return playerValues[self.indices()].sum(axis=1)
+
+    def salaryTotals(self):
+        return self.totals(self.salaries)
+
+    def projectionTotals(self):
+        return self.totals(self.projections)
+
+    def scoreTotals(self, scores):
+        """
+        Returns the actual score of every lineup given the |scores|
+        dictionary of the week. Raises KeyError for a player of a lineup
+        without a score, rather than scoring him 0.
+        """
+        totals = self.totals(self.playerVector(scores, np.nan))
+        missing = np.isnan(totals)
+        if missing.any():
+            for row in self.indices()[missing][0]:
+                if self.players[row][0] not in scores:
+                    raise KeyError(self.players[row][0])
+        return totals
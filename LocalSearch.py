@@ -0,0 +1,255 @@
+# Local search that improves complete lineups by swapping players.
+# Usage:
+#   search = LocalSearch(schedule = 'anneal', maxIterations = 2000)
+#   search.solve(csp, seeds)   # seeds: e.g. another search's allAssignments
+#   search.allAssignments      # the improved lineups, as a LineupSet
+#   best = search.improve(assignment)   # after solve, for a single lineup
+
+import math
+import random
+import time
+import numpy as np
+from LineupSet import LineupSet
+from PlayerTable import ensurePlayerTable
+
+class LocalSearch():
+
+    def __init__(self, schedule = 'anneal', maxIterations = 2000, timeLimit = None, \
+            temperature = 1.0, cooling = 0.998, tabuTenure = 10, pairMoveRate = 0.3):
+        """
+        @param schedule: 'anneal' (simulated annealing over random moves) or
+            'tabu' (best non-tabu swap at every iteration).
+        @param maxIterations: Number of moves tried per lineup.
+        @param timeLimit: If set, seconds after which a lineup's search stops.
+        @param temperature: Initial annealing temperature, in objective points.
+        @param cooling: Factor the temperature is multiplied by every move.
+        @param tabuTenure: Number of iterations a player that was swapped out
+            may not come back, unless that gives a new best lineup.
+        @param pairMoveRate: Fraction of annealing moves that replace the
+            players of two slots at once, e.g. a cheaper RB paying for a
+            better WR, which single swaps cannot do at the salary cap.
+        """
+        self.schedule = schedule
+        self.maxIterations = maxIterations
+        self.timeLimit = timeLimit
+        self.temperature = temperature
+        self.cooling = cooling
+        self.tabuTenure = tabuTenure
+        self.pairMoveRate = pairMoveRate
+
+    def reset_results(self):
+        # Improved lineups, one per distinct result.
+        self.allAssignments = LineupSet(self.csp)
+
+        # Number of moves tried and accepted, and of lineups that improved.
+        self.numIterations = 0
+        self.numAccepted = 0
+        self.numImproved = 0
+
+    def print_stats(self):
+        print 'Local search: %d moves tried, %d accepted, %d of the lineups improved' % \
+            (self.numIterations, self.numAccepted, self.numImproved)
+
+    def solve(self, csp, seeds, objectiveIndex = 2):
+        """
+        Improves every lineup of |seeds| and stores the distinct results, in
+        canonical form, in self.allAssignments.
+
+        @param csp: A weighted CSP, as built by createCSPWithVariables.
+        @param seeds: Complete assignments, e.g. a LineupSet.
+        @param objectiveIndex: Domain tuple position to maximize the total of
+            (2 projection, 3 efficiency).
+        """
+        self.csp = csp
+        self.reset_results()
+        self.prepare(objectiveIndex)
+        for assignment in seeds:
+            improved = self.improve(assignment)
+            self.allAssignments.appendUnique(self.csp.canonical_assignment(improved))
+
+    def prepare(self, objectiveIndex):
+        """
+        Precomputes per slot its domain (rows of the player table) and per
+        linear constraint which slots it covers, so that the salary and
+        objective change of a swap are O(1) lookups.
+        """
+        self.table = ensurePlayerTable(self.csp)
+        self.variables = list(self.csp.variables)
+        self.slotOf = dict((var, j) for j, var in enumerate(self.variables))
+        self.domains = [self.csp.domainIndices[var] for var in self.variables]
+        self.domainLists = [rows.tolist() for rows in self.domains]
+        self.objectiveColumn = self.table.column(objectiveIndex).astype(float)
+        self.objective = self.objectiveColumn.tolist()
+        self.groupmates = {}
+        for group in self.csp.symmetryGroups:
+            for var in group:
+                self.groupmates[var] = [var2 for var2 in group if var2 != var]
+        # (coefficient per slot, values per row as list and array, lower, upper)
+        self.linear = []
+        for constraint in self.csp.linearConstraints:
+            inConstraint = [1 if var in constraint.variables else 0 for var in self.variables]
+            column = self.table.column(constraint.attribute)
+            lower = constraint.lower if constraint.lower is not None else float('-inf')
+            upper = constraint.upper if constraint.upper is not None else float('inf')
+            self.linear.append((inConstraint, column.tolist(), column, lower, upper))
+
+    def consistent(self, rows, j, row):
+        """
+        Returns whether slot |j| may hold |row| given the players of the
+        other slots: unary and binary factors, where groupmates only need
+        distinct players as the lineup is put in canonical form at the end.
+        """
+        var = self.variables[j]
+        val = self.table.tuples[row]
+        if self.csp.unaryFactors[var] and self.csp.unaryFactors[var][val] == 0:
+            return False
+        groupmates = self.groupmates.get(var, [])
+        for var2, factor in self.csp.binaryFactors[var].iteritems():
+            if var2 in groupmates:
+                continue
+            if factor[val][self.table.tuples[rows[self.slotOf[var2]]]] == 0:
+                return False
+        return True
+
+    def improve(self, assignment):
+        """
+        Runs the search from the complete |assignment| and returns the best
+        lineup seen, as a dictionary from variable to domain value. Moves
+        never leave the linear constraints, so a feasible seed stays
+        feasible.
+        """
+        rows = [self.table.rowOf[assignment[var]] for var in self.variables]
+        totals = [sum(values[rows[j]] for j in range(len(rows)) if inConstraint[j]) \
+            for inConstraint, values, column, lower, upper in self.linear]
+        if self.schedule == 'anneal':
+            best = self.anneal(rows, totals)
+        elif self.schedule == 'tabu':
+            best = self.tabu(rows, totals)
+        else:
+            raise Exception('Unknown schedule %s' % self.schedule)
+        if sum(self.objective[row] for row in best) > sum(self.objective[self.table.rowOf[assignment[var]]] \
+                for var in self.variables) + 1e-9:
+            self.numImproved += 1
+        return {var: self.table.tuples[row] for var, row in zip(self.variables, best)}
+
+    def moveDeltas(self, rows, changes):
+        """
+        Returns the change of every linear constraint's total for the
+        |changes| [(slot, new row)].
+        """
+        deltas = []
+        for c, (inConstraint, values, column, lower, upper) in enumerate(self.linear):
+            delta = 0
+            for j, row in changes:
+                if inConstraint[j]:
+                    delta += values[row] - values[rows[j]]
+            deltas.append(delta)
+        return deltas
+
+    def feasible(self, totals, deltas):
+        for (inConstraint, values, column, lower, upper), total, delta in zip(self.linear, totals, deltas):
+            if not lower <= total + delta <= upper:
+                return False
+        return True
+
+    def anneal(self, rows, totals):
+        """
+        Simulated annealing over random single and pair swaps: a feasible
+        swap that loses |delta| points is accepted with probability
+        exp(-delta / temperature).
+        """
+        rows = list(rows)
+        current = sum(self.objective[row] for row in rows)
+        best, bestRows = current, list(rows)
+        temperature = self.temperature
+        start = time.time()
+        numSlots = len(rows)
+        for it in range(self.maxIterations):
+            if self.timeLimit is not None and it % 256 == 0 and time.time() - start > self.timeLimit:
+                break
+            self.numIterations += 1
+            temperature *= self.cooling
+
+            if numSlots > 1 and random.random() < self.pairMoveRate:
+                j1, j2 = random.sample(range(numSlots), 2)
+                changes = [(j1, random.choice(self.domainLists[j1])), (j2, random.choice(self.domainLists[j2]))]
+                if changes[0][1] == changes[1][1]:
+                    continue
+            else:
+                j = random.randrange(numSlots)
+                changes = [(j, random.choice(self.domainLists[j]))]
+            if any(row in rows for j, row in changes):
+                continue
+            deltas = self.moveDeltas(rows, changes)
+            if not self.feasible(totals, deltas):
+                continue
+            delta = sum(self.objective[row] - self.objective[rows[j]] for j, row in changes)
+            if delta < 0 and random.random() >= math.exp(delta / max(temperature, 1e-12)):
+                continue
+
+            old = [(j, rows[j]) for j, row in changes]
+            for j, row in changes:
+                rows[j] = row
+            if not all(self.consistent(rows, j, row) for j, row in changes):
+                for j, row in old:
+                    rows[j] = row
+                continue
+            self.numAccepted += 1
+            for c in range(len(totals)):
+                totals[c] += deltas[c]
+            current += delta
+            if current > best + 1e-9:
+                best, bestRows = current, list(rows)
+        return bestRows
+
+    def tabu(self, rows, totals):
+        """
+        Tabu search over single swaps: every iteration makes the best
+        feasible swap of any slot, even a worsening one, except that players
+        swapped out in the last self.tabuTenure iterations stay out unless
+        they give a new best lineup.
+        """
+        rows = list(rows)
+        current = sum(self.objective[row] for row in rows)
+        best, bestRows = current, list(rows)
+        tabuUntil = {}
+        start = time.time()
+        for it in range(self.maxIterations):
+            if self.timeLimit is not None and it % 256 == 0 and time.time() - start > self.timeLimit:
+                break
+            self.numIterations += 1
+
+            # candidate swaps of every slot, best first
+            candidates = []
+            for j in range(len(rows)):
+                domain = self.domains[j]
+                deltas = self.objectiveColumn[domain] - self.objective[rows[j]]
+                mask = ~np.in1d(domain, rows)
+                for (inConstraint, values, column, lower, upper), total in zip(self.linear, totals):
+                    if inConstraint[j]:
+                        newTotals = total + column[domain] - values[rows[j]]
+                        mask &= (newTotals >= lower) & (newTotals <= upper)
+                for i in np.flatnonzero(mask).tolist():
+                    candidates.append((deltas[i], j, int(domain[i])))
+            candidates.sort(key=lambda candidate: -candidate[0])
+
+            for delta, j, row in candidates:
+                if tabuUntil.get(row, -1) >= it and current + delta <= best + 1e-9:
+                    continue
+                deltas = self.moveDeltas(rows, [(j, row)])
+                old = rows[j]
+                rows[j] = row
+                if not self.consistent(rows, j, row):
+                    rows[j] = old
+                    continue
+                self.numAccepted += 1
+                for c in range(len(totals)):
+                    totals[c] += deltas[c]
+                tabuUntil[old] = it + self.tabuTenure
+                current += delta
+                if current > best + 1e-9:
+                    best, bestRows = current, list(rows)
+                break
+            else:
+                break
+        return bestRows
@@ -0,0 +1,85 @@
+# A vectorized lineup generator: samples whole batches of lineups with numpy
+# and keeps the distinct ones that satisfy the CSP.
+# Usage:
+#   search = MonteCarloSearch(batchSize = 100000)
+#   search.solve(csp, numLineups, comparisonIndex)
+#   search.allAssignments   # LineupSet, as from BacktrackingSearch
+
+import numpy as np
+from AliasSampler import AliasTable
+from LineupFilter import LineupFilter
+from LineupSet import LineupSet
+from PlayerTable import ensurePlayerTable
+
+class MonteCarloSearch():
+
+    def __init__(self, batchSize = 100000, maxBatches = 100):
+        """
+        @param batchSize: Number of candidate lineups sampled per batch.
+        @param maxBatches: Number of batches after which solve gives up,
+            e.g. when the CSP has fewer distinct lineups than requested.
+        """
+        self.batchSize = batchSize
+        self.maxBatches = maxBatches
+
+    def reset_results(self):
+        # Distinct lineups found, in the order they were sampled.
+        self.allAssignments = LineupSet(self.csp)
+
+        # Number of batches, of candidate lineups sampled, and of candidates
+        # that satisfied every constraint (duplicates included).
+        self.numBatches = 0
+        self.numSamples = 0
+        self.numFeasible = 0
+
+    def print_stats(self):
+        print 'Sampled %d lineups in %d batches: %d feasible, %d distinct' % \
+            (self.numSamples, self.numBatches, self.numFeasible, len(self.allAssignments))
+
+    def solve(self, csp, numLineups, comparisonIndex):
+        """
+        Samples lineups until |numLineups| distinct feasible ones are found
+        or self.maxBatches batches were drawn. Every slot is drawn
+        independently with probability proportional to column
+        |comparisonIndex| of the player table (1 salary, 2 projection,
+        3 efficiency); candidates are then filtered with masks for the
+        unary and binary factors, distinct players within each symmetry
+        group and the linear constraints (the salary bounds), and put in
+        canonical form.
+
+        @param csp: A weighted CSP, as built by createCSPWithVariables.
+        @param numLineups: Number of lineups to generate.
+        @param comparisonIndex: Domain tuple position the draws are weighted by.
+        """
+        self.csp = csp
+        self.reset_results()
+        table = ensurePlayerTable(csp)
+        lineupFilter = LineupFilter(csp)
+        domains = lineupFilter.domains
+        numVars = len(domains)
+
+        # Unary factors zero the weight of a value; the filter checks them
+        # again, in case a whole domain is zero.
+        aliases = [AliasTable(np.where(allowed, table.column(comparisonIndex)[rows], 0)) \
+            for rows, allowed in zip(domains, lineupFilter.allowed)]
+
+        while len(self.allAssignments) < numLineups and self.numBatches < self.maxBatches:
+            self.numBatches += 1
+            self.numSamples += self.batchSize
+            if any(not len(rows) for rows in domains):
+                continue
+
+            positions = np.empty((self.batchSize, numVars), dtype=np.int64)
+            lineups = np.empty((self.batchSize, numVars), dtype=np.int64)
+            for j in range(numVars):
+                positions[:, j] = aliases[j].drawMany(np.random.random_sample(self.batchSize))
+                lineups[:, j] = domains[j][positions[:, j]]
+
+            lineups = lineups[lineupFilter.feasible(lineups, positions)]
+            self.numFeasible += len(lineups)
+            lineupFilter.canonical(lineups)
+
+            for row in lineups.tolist():
+                if len(self.allAssignments) >= numLineups:
+                    break
+                self.allAssignments.appendUniqueIndices(row)
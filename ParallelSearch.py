@@ -0,0 +1,228 @@
+# Lineup generation split across independently seeded BacktrackingSearch runs.
+# Usage:
+#   search = ParallelBacktrackingSearch(numWorkers = 4)
+#   search.solve(csp, numLineups, ep_greedy, comparisonIndex, seed = [0])
+#   search.allAssignments   # merged, deduplicated LineupSet
+#   search.resume(csp, filename)   # continues a saved BacktrackingSearch
+#   search.close()          # stops the worker pool, kept between solves
+
+import multiprocessing
+import random
+import time
+import numpy as np
+from AliasSampler import RandomBuffer
+from BacktrackSearch import BacktrackingSearch
+from LineupSet import LineupSet
+from SearchStats import SearchStats
+
+# The CSP being solved, set once per worker process by setChunkCSP so it is
+# not pickled with every chunk.
+chunkCSP = None
+
+def setChunkCSP(csp):
+    global chunkCSP
+    chunkCSP = csp
+
+def generateChunk(job):
+    """
+    Runs BacktrackingSearch for one chunk of the lineup budget with its own
+    random streams, and returns its lineups as player-index rows together
+    with its search statistics (and a SearchStats if |collectStats|).
+    """
+    chunkSeed, numLineups, ep_greedy, comparisonIndex, collectStats, deadline = job
+    np.random.seed(chunkSeed)
+    random.seed(np.random.randint(2**31 - 1))
+    search = BacktrackingSearch()
+    stats = SearchStats() if collectStats else None
+    search.solve(chunkCSP, numLineups, ep_greedy, comparisonIndex, stats=stats, deadline=deadline)
+    return search.allAssignments.indices(), search.numOperations, search.numAssignments, stats, \
+        search.timedOut
+
+def resumeChunk(job):
+    """
+    Resumes one part of a split BacktrackingSearch frontier and returns what
+    generateChunk returns, counting only the lineups and statistics added
+    since the split. Part 0 keeps the saved random streams, so a single part
+    continues exactly as the saved search would; the others are reseeded.
+    """
+    state, part, chunkSeed, numLineups, collectStats, deadline = job
+    search = BacktrackingSearch()
+    stats = SearchStats() if collectStats else None
+    search.set_state(chunkCSP, state, stats)
+    if part > 0:
+        np.random.seed(chunkSeed)
+        random.seed(np.random.randint(2**31 - 1))
+        search.randoms = RandomBuffer()
+    numFound = len(search.allAssignments)
+    numOperations, numAssignments = search.numOperations, search.numAssignments
+    for lineup in search.resume(numLineups, deadline=deadline):
+        pass
+    return search.allAssignments.indices()[numFound:], search.numOperations - numOperations, \
+        search.numAssignments - numAssignments, stats, search.timedOut
+
+class ParallelBacktrackingSearch():
+
+    def __init__(self, numWorkers = 1, numChunks = 4):
+        """
+        @param numWorkers: Number of worker processes (1 runs in-process).
+            The pool is started on the first solve and kept for later solves
+            of the same CSP; call close() when done.
+        @param numChunks: Number of independently seeded runs the lineup
+            budget is split into. The output depends only on the seed and
+            numChunks, never on numWorkers.
+        """
+        self.numWorkers = numWorkers
+        self.numChunks = numChunks
+        self.pool = None
+        self.poolCSP = None
+
+    def reset_results(self):
+        # Merged, deduplicated lineups of all chunks.
+        self.allAssignments = LineupSet(self.csp)
+
+        # Totals over the chunks of the BacktrackingSearch statistics.
+        self.numOperations = 0
+        self.numAssignments = 0
+
+        # Number of lineups each chunk found, in chunk order, and the number
+        # of rounds of chunks that ran.
+        self.chunkLineups = []
+        self.numRounds = 0
+
+        # Whether the time limit stopped any chunk.
+        self.timedOut = False
+
+    def solve(self, csp, numLineups, ep_greedy, comparisonIndex, seed = [0], stats = None, \
+            timeLimit = None):
+        """
+        Splits |numLineups| over self.numChunks BacktrackingSearch runs, runs
+        them on the process pool and merges their lineups in chunk order,
+        dropping lineups an earlier chunk already found (counted in
+        self.allAssignments.dedupHits). Chunk c is seeded from seed + [c];
+        numpy's init_by_array seeding gives each chunk its own stream.
+
+        Chunks overlap, so while lineups are missing another round of chunks
+        of the same sizes (c = numChunks, numChunks + 1, ...) is merged, up to
+        numLineups lineups, until they are found or a round adds none (the
+        CSP has fewer lineups the chunks can reach). Small chunks of just the
+        missing count would mostly return lineups already found.
+
+        Deterministic searches (ep_greedy >= 1) find much the same lineups
+        in every chunk, so they run as a single chunk of the whole budget.
+
+        The node and cut counters of every chunk are added to |stats|, if given.
+        With |timeLimit|, every chunk stops |timeLimit| seconds after this
+        call (chunks still queued then return nothing) and the lineups found
+        so far are kept.
+        """
+        self.csp = csp
+        self.reset_results()
+
+        deadline = time.time() + timeLimit if timeLimit is not None else None
+        numChunks = 1 if ep_greedy >= 1 else self.numChunks
+        c = 0
+        while len(self.allAssignments) < numLineups and not self.timedOut:
+            jobs = []
+            for i in range(numChunks):
+                chunkSize = numLineups // numChunks + (1 if i < numLineups % numChunks else 0)
+                if chunkSize > 0:
+                    jobs.append((list(seed) + [c], chunkSize, ep_greedy, comparisonIndex, stats is not None, deadline))
+                c += 1
+
+            found = len(self.allAssignments)
+            self.merge(self.run_chunks(csp, jobs), numLineups, stats)
+            self.numRounds += 1
+            if len(self.allAssignments) == found:
+                break
+
+    def resume(self, csp, filename, numLineups = None, seed = [0], stats = None, timeLimit = None):
+        """
+        Continues a search written by BacktrackingSearch.save_state for |csp|
+        on the process pool: its frontier is split into up to self.numChunks
+        disjoint parts (BacktrackingSearch.split_frontier), part c > 0
+        reseeded from seed + [c], and the lineups found before the save are
+        merged first, then each part's new lineups in part order, up to
+        |numLineups| (by default the saved search's budget). Each part may
+        find the whole remaining budget; the parts cover the rest of the
+        search, so no further rounds are run.
+
+        |stats| and |timeLimit| are as for solve.
+        """
+        self.csp = csp
+        self.reset_results()
+
+        search = BacktrackingSearch()
+        search.load_state(csp, filename)
+        if numLineups is None:
+            numLineups = search.numLineups
+        for row in search.allAssignments.indices()[:numLineups]:
+            self.allAssignments.appendIndices(row)
+        self.numOperations = search.numOperations
+        self.numAssignments = search.numAssignments
+        states = search.split_frontier(self.numChunks)
+
+        deadline = time.time() + timeLimit if timeLimit is not None else None
+        jobs = [(state, c, list(seed) + [c], numLineups, stats is not None, deadline) \
+            for c, state in enumerate(states)]
+        self.merge(self.run_chunks(csp, jobs, resumeChunk), numLineups, stats)
+        self.numRounds = 1
+
+    def run_chunks(self, csp, jobs, runChunk = generateChunk):
+        """
+        Runs |runChunk| (generateChunk or resumeChunk) on |jobs|, on the pool
+        if there is more than one worker and job, and returns the results in
+        job order.
+        """
+        if self.numWorkers > 1 and len(jobs) > 1:
+            pool = self.get_pool(csp)
+            try:
+                return pool.map(runChunk, jobs)
+            except:
+                # ^C or a failed chunk: do not leave the workers running
+                self.pool.terminate()
+                self.pool.join()
+                self.pool = None
+                self.poolCSP = None
+                raise
+        setChunkCSP(csp)
+        return [runChunk(job) for job in jobs]
+
+    def merge(self, results, numLineups, stats):
+        """
+        Adds the lineups of chunk |results| in order, up to numLineups in
+        total, and their statistics.
+        """
+        for indices, numOperations, numAssignments, chunkStats, timedOut in results:
+            self.timedOut = self.timedOut or timedOut
+            if stats is not None:
+                stats.merge(chunkStats)
+            self.numOperations += numOperations
+            self.numAssignments += numAssignments
+            self.chunkLineups.append(len(indices))
+            for row in indices:
+                if len(self.allAssignments) == numLineups:
+                    break
+                self.allAssignments.appendUniqueIndices(row)
+
+    def get_pool(self, csp):
+        """
+        Returns the worker pool, whose workers hold |csp|. The pool is
+        started on first use and restarted when another CSP is solved (a
+        CSP changed in place after it was solved needs close() first).
+        """
+        if self.pool is not None and self.poolCSP is not csp:
+            self.close()
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.numWorkers, setChunkCSP, (csp,))
+            self.poolCSP = csp
+        return self.pool
+
+    def close(self):
+        """
+        Stops the worker pool, if it was started.
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+            self.poolCSP = None
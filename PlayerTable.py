@@ -0,0 +1,79 @@
+# A columnar table of the players of a slate.
+# Usage:
+#   table = PlayerTable(names, ids, positions, teams, salaries, projections, risks, uppers, lowers)
+#   table.salaries[rows], table.column(comparisonIndex)[rows]
+#   table.tuples[row]   # the (player, salary, projection, efficiency) domain value
+
+import numpy as np
+
+class PlayerTable():
+
+    def __init__(self, names, ids, positions, teams, salaries, projections, risks, \
+            uppers = None, lowers = None):
+        """
+        Builds the table from parallel lists with one entry per player.
+        Missing ids, positions or teams are '' and missing risks and upper
+        and lower projections are NaN.
+        """
+        # Domain values as used by the CSP and in assignments. Efficiency is
+        # projected points per 1000 dollars.
+        self.tuples = []
+        for name, salary, projection in zip(names, salaries, projections):
+            efficiency = 0 if salary == 0 else projection*1000/salary
+            self.tuples.append((name, salary, projection, efficiency))
+        self.rowOf = {val: row for row, val in enumerate(self.tuples)}
+
+        self.names = np.array(names, dtype=object)
+        self.ids = np.array(ids, dtype=object)
+        self.positions = np.array(positions, dtype=object)
+        self.teams = np.array(teams, dtype=object)
+        self.salaries = np.array(salaries, dtype=np.int64)
+        self.projections = np.array(projections, dtype=float)
+        self.efficiencies = np.array([val[3] for val in self.tuples], dtype=float)
+        self.risks = np.array(risks, dtype=float)
+        self.uppers = np.array(uppers if uppers is not None else [np.nan] * len(names), dtype=float)
+        self.lowers = np.array(lowers if lowers is not None else [np.nan] * len(names), dtype=float)
+
+    def __len__(self):
+        return len(self.tuples)
+
+    def column(self, comparisonIndex):
+        """
+        Returns the column matching position |comparisonIndex| of the domain
+        tuples (1 salary, 2 projection, 3 efficiency).
+        """
+        return [self.names, self.salaries, self.projections, self.efficiencies][comparisonIndex]
+
+    def rows(self, values):
+        """
+        Returns the rows of a list of domain values.
+        """
+        return np.array([self.rowOf[val] for val in values], dtype=np.int64)
+
+def ensurePlayerTable(csp):
+    """
+    Makes sure |csp| has a player table and a domain index array for every
+    variable. CSPs built by createCSPWithVariables already have them; for
+    others the table is built from the distinct (player, salary, projection,
+    efficiency) values of the domains.
+    """
+    if csp.playerTable is None:
+        values = []
+        seen = set()
+        for var in csp.variables:
+            for val in csp.values[var]:
+                if val not in seen:
+                    seen.add(val)
+                    values.append(val)
+        table = PlayerTable([val[0] for val in values], [''] * len(values), \
+            [''] * len(values), [''] * len(values), [val[1] for val in values], \
+            [val[2] for val in values], [np.nan] * len(values))
+        # keep the given tuples, in case their efficiency was computed differently
+        table.tuples = values
+        table.rowOf = {val: row for row, val in enumerate(values)}
+        table.efficiencies = np.array([val[3] for val in values], dtype=float)
+        csp.playerTable = table
+    for var in csp.variables:
+        if var not in csp.domainIndices:
+            csp.domainIndices[var] = csp.playerTable.rows(csp.values[var])
+    return csp.playerTable
@@ -0,0 +1,71 @@
+# Choosing which lineups to submit from simulated outcomes.
+# Usage:
+#   wins = lineupWins(indices, playerScores, winnerThreshold)
+#   selected = selectPortfolio(wins, numSelected, 'atLeastOne', priority = projections)
+
+import heapq
+import numpy as np
+
+# Number of set bits of every byte value.
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.int32)
+
+def selectPortfolio(wins, numSelected, objective = 'atLeastOne', priority = None):
+    """
+    Returns the indices of |numSelected| lineups, in the order they were
+    chosen, from the boolean (lineups, simulations) matrix |wins|.
+
+    'atLeastOne' maximizes the number of simulations in which at least one
+    chosen lineup wins. That coverage function is submodular, so lazy
+    greedy picks the same lineups as plain greedy: gains are kept in a
+    priority queue as upper bounds and only the top one is recomputed, as
+    a popcount of the lineup's packed wins outside the covered set. Once
+    no lineup adds a covered simulation, the rest are filled in the
+    'expected' order.
+
+    'expected' maximizes the expected number of wins, which is additive,
+    so the lineups with the most simulated wins are taken.
+
+    Ties go to the lineup with more simulated wins, then the higher
+    |priority| (e.g. projection), then the lower index.
+    """
+    numLineups = len(wins)
+    numSelected = min(numSelected, numLineups)
+    if priority is None:
+        priority = np.zeros(numLineups)
+    winCounts = wins.sum(axis=1)
+    # most wins first, then highest priority, then lowest index
+    expectedOrder = np.lexsort((np.arange(numLineups), -np.asarray(priority, dtype=float), -winCounts))
+    if objective == 'expected':
+        return expectedOrder[:numSelected].tolist()
+    if objective != 'atLeastOne':
+        raise Exception('Unknown portfolio objective %s' % objective)
+
+    packed = np.packbits(wins, axis=1)
+    covered = np.zeros(packed.shape[1], dtype=np.uint8)
+    rankOf = np.empty(numLineups, dtype=np.int64)
+    rankOf[expectedOrder] = np.arange(numLineups)
+    # (-gain bound, tie-break rank, lineup)
+    heap = [(-int(winCounts[i]), int(rankOf[i]), i) for i in range(numLineups)]
+    heapq.heapify(heap)
+    selected = []
+    isSelected = np.zeros(numLineups, dtype=bool)
+    while heap and len(selected) < numSelected:
+        negBound, rank, i = heapq.heappop(heap)
+        if negBound == 0:
+            break
+        gain = int(POPCOUNT[packed[i] & ~covered].sum())
+        if heap and gain < -heap[0][0] or (heap and gain == -heap[0][0] and rank > heap[0][1]):
+            heapq.heappush(heap, (-gain, rank, i))
+            continue
+        if gain == 0:
+            break
+        selected.append(i)
+        isSelected[i] = True
+        covered |= packed[i]
+
+    for i in expectedOrder.tolist():
+        if len(selected) >= numSelected:
+            break
+        if not isSelected[i]:
+            selected.append(i)
+    return selected
@@ -0,0 +1,89 @@
+# Simulated fantasy scores for players and lineups.
+# Usage:
+#   playerScores = simulatePlayerScores(csp.playerTable, numSamples)
+#   wins = lineupWins(search.allAssignments.indices(), playerScores, 111.21)
+#   probabilities = winProbabilities(csp.playerTable, indices, 10000, 111.21)
+
+import numpy as np
+
+def playerSpreads(table, spread = 0.35, riskScale = 0.05):
+    """
+    Returns the standard deviations of each player's score above and below
+    the projection: the distances to the FFA upper and lower projections,
+    or |spread| times the projection where those are missing, scaled up by
+    1 + |riskScale| * risk.
+    """
+    projections = table.projections
+    fallback = spread * np.abs(projections)
+    above = table.uppers - projections
+    below = projections - table.lowers
+    with np.errstate(invalid='ignore'):
+        above = np.where(above >= 0, above, fallback)
+        below = np.where(below >= 0, below, fallback)
+    riskFactor = np.where(np.isnan(table.risks), 1.0, 1 + riskScale * np.maximum(table.risks, 0))
+    return above * riskFactor, below * riskFactor
+
+def simulatePlayerScores(table, numSamples, teamCorrelation = 0.2, spread = 0.35, riskScale = 0.05):
+    """
+    Returns a (players, numSamples) float32 matrix of simulated scores.
+    Each player's score is the projection plus a standard normal draw
+    scaled by the spread above or below it (playerSpreads), so the
+    projection is the median and the upper/lower skew is kept. The draws of
+    players of the same team share a team factor, so they are correlated
+    with coefficient |teamCorrelation|; players without a team are
+    independent.
+    """
+    above, below = playerSpreads(table, spread, riskScale)
+    teams, teamIndex = np.unique(table.teams.astype(str), return_inverse=True)
+    correlation = np.where(table.teams.astype(str) == '', 0.0, teamCorrelation)
+
+    z = np.random.standard_normal((len(table), numSamples)).astype(np.float32)
+    z *= np.sqrt(1 - correlation).astype(np.float32)[:, None]
+    teamFactors = np.random.standard_normal((len(teams), numSamples)).astype(np.float32)
+    z += np.sqrt(correlation).astype(np.float32)[:, None] * teamFactors[teamIndex]
+
+    scale = np.where(z > 0, above.astype(np.float32)[:, None], below.astype(np.float32)[:, None])
+    return table.projections.astype(np.float32)[:, None] + scale * z
+
+def lineupScores(indices, playerScores, chunkSize = 1000):
+    """
+    Returns the (lineups, samples) matrix of simulated lineup scores for the
+    (lineups, slots) player index matrix |indices|, |chunkSize| lineups at
+    a time, adding one slot at a time so no (lineups, slots, samples)
+    array is built.
+    """
+    scores = np.zeros((len(indices), playerScores.shape[1]), dtype=playerScores.dtype)
+    for start in range(0, len(indices), chunkSize):
+        chunk = indices[start:start + chunkSize]
+        for j in range(chunk.shape[1]):
+            scores[start:start + chunkSize] += playerScores[chunk[:, j]]
+    return scores
+
+def lineupWins(indices, playerScores, winnerThreshold, chunkSize = 1000):
+    """
+    Returns the boolean (lineups, samples) matrix of whether each lineup
+    scores at least |winnerThreshold| in each simulation.
+    """
+    wins = np.empty((len(indices), playerScores.shape[1]), dtype=bool)
+    for start in range(0, len(indices), chunkSize):
+        chunk = indices[start:start + chunkSize]
+        wins[start:start + chunkSize] = lineupScores(chunk, playerScores, chunkSize) >= winnerThreshold
+    return wins
+
+def winProbabilities(table, indices, numSamples, winnerThreshold, sampleChunk = 1000, \
+        lineupChunk = 1000, **simulationArgs):
+    """
+    Returns P(score >= |winnerThreshold|) for each lineup of the player
+    index matrix |indices|, estimated from |numSamples| simulations of
+    simulatePlayerScores. Simulations are drawn |sampleChunk| at a time and
+    lineups are scored |lineupChunk| at a time, so memory stays bounded by
+    (players + lineupChunk) x sampleChunk scores whatever the sizes.
+    """
+    numWins = np.zeros(len(indices), dtype=np.int64)
+    for start in range(0, numSamples, sampleChunk):
+        playerScores = simulatePlayerScores(table, min(sampleChunk, numSamples - start), **simulationArgs)
+        for first in range(0, len(indices), lineupChunk):
+            chunk = indices[first:first + lineupChunk]
+            numWins[first:first + lineupChunk] += \
+                (lineupScores(chunk, playerScores, lineupChunk) >= winnerThreshold).sum(axis=1)
+    return numWins / float(max(numSamples, 1))
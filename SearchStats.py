@@ -0,0 +1,177 @@
+# Opt-in instrumentation: timers for the phases of the lineup pipeline, and
+# node and cut counters for BacktrackingSearch. Code that is not handed a
+# SearchStats does not pay for it beyond a None check.
+# Usage:
+#   stats = SearchStats(profile = True)
+#   with timedPhase(stats, 'addConstraints'):
+#       addConstraints(csp, salaryCap, salaryFloor)
+#   search.solve(csp, numLineups, ep_greedy, comparisonIndex, stats = stats)
+#   stats.print_stats()
+
+import time
+import cProfile
+import pstats
+from contextlib import contextmanager
+
+# The rules BacktrackingSearch counts cuts for:
+#   overCap: values of the branching variable cut because the total would
+#       exceed a linear upper bound (the salary cap) even if every other
+#       unassigned variable took its smallest value
+#   floorUnreachable: values cut because the total could not reach a linear
+#       lower bound (the salary floor) even with the largest values
+#   zeroWeight: values whose factors give the assignment weight 0
+#   noValues: nodes with no value left to try
+#   inconsistent: values after which arc consistency emptied a domain
+#   duplicate: complete lineups rejected as already found
+#   lineupBudget: searches stopped because numLineups were found
+#   deadline: searches stopped because the anytime deadline passed
+CUT_RULES = ['overCap', 'floorUnreachable', 'zeroWeight', 'noValues', 'inconsistent', \
+    'duplicate', 'lineupBudget', 'deadline']
+
+class ProfileData():
+    # pstats.Stats loads anything with create_stats() and a stats dictionary.
+    def __init__(self, stats):
+        self.stats = dict(stats)
+
+    def create_stats(self):
+        pass
+
+class SearchStats():
+
+    def __init__(self, profile = False, trace = None):
+        """
+        @param profile: When enabled, cProfile runs during the timed phases.
+        @param trace: Optional function called as trace(event, depth, count)
+            on every node ('node') and cut (its rule) of BacktrackingSearch.
+        """
+        # Seconds spent in and number of entries of each phase; phases may
+        # nest (e.g. parse within createCSPWithVariables).
+        self.phaseTimes = {}
+        self.phaseCalls = {}
+        self.phaseOrder = []
+        self.openPhases = 0
+
+        # Number of backtrack() nodes at each depth (number of assigned variables).
+        self.nodesAtDepth = []
+
+        # Number of cuts of each rule in CUT_RULES.
+        self.cuts = dict((rule, 0) for rule in CUT_RULES)
+
+        self.profile = cProfile.Profile() if profile else None
+        self.trace = trace
+
+        # Profiles of merged SearchStats, e.g. from worker processes.
+        self.profiles = []
+
+    def __getstate__(self):
+        # The profiler and the trace function stay in their process; what was
+        # profiled travels as pstats data.
+        state = dict(self.__dict__)
+        state['profiles'] = self.profileData()
+        state['profile'] = None
+        state['trace'] = None
+        return state
+
+    def profileData(self):
+        """
+        Returns the pstats dictionaries of this process and of the merged
+        SearchStats.
+        """
+        profiles = list(self.profiles)
+        if self.profile is not None and self.openPhases == 0:
+            self.profile.create_stats()
+            if self.profile.stats:
+                profiles.append(dict(self.profile.stats))
+        return profiles
+
+    def start_phase(self, name):
+        if name not in self.phaseTimes:
+            self.phaseTimes[name] = 0.0
+            self.phaseCalls[name] = 0
+            self.phaseOrder.append(name)
+        self.phaseCalls[name] += 1
+        self.openPhases += 1
+        if self.profile is not None and self.openPhases == 1:
+            self.profile.enable()
+        return time.time()
+
+    def end_phase(self, name, start):
+        self.phaseTimes[name] += time.time() - start
+        self.openPhases -= 1
+        if self.profile is not None and self.openPhases == 0:
+            self.profile.disable()
+
+    def node(self, depth):
+        while len(self.nodesAtDepth) <= depth:
+            self.nodesAtDepth.append(0)
+        self.nodesAtDepth[depth] += 1
+        if self.trace is not None:
+            self.trace('node', depth, 1)
+
+    def cut(self, rule, depth, count = 1):
+        self.cuts[rule] += count
+        if self.trace is not None:
+            self.trace(rule, depth, count)
+
+    def merge(self, other):
+        """
+        Adds the timers, counters and profiles of |other| to these, e.g. to
+        total the SearchStats returned by worker processes.
+        """
+        for name in other.phaseOrder:
+            if name not in self.phaseTimes:
+                self.phaseTimes[name] = 0.0
+                self.phaseCalls[name] = 0
+                self.phaseOrder.append(name)
+            self.phaseTimes[name] += other.phaseTimes[name]
+            self.phaseCalls[name] += other.phaseCalls[name]
+        while len(self.nodesAtDepth) < len(other.nodesAtDepth):
+            self.nodesAtDepth.append(0)
+        for depth, count in enumerate(other.nodesAtDepth):
+            self.nodesAtDepth[depth] += count
+        for rule, count in other.cuts.iteritems():
+            self.cuts[rule] = self.cuts.get(rule, 0) + count
+        self.profiles.extend(other.profileData())
+
+    def profileReport(self):
+        """
+        Returns a pstats.Stats over all profiled phases, or None.
+        """
+        profiles = self.profileData()
+        if not profiles:
+            return None
+        report = pstats.Stats(ProfileData(profiles[0]))
+        for data in profiles[1:]:
+            report.add(ProfileData(data))
+        return report
+
+    def print_stats(self, numFunctions = 20):
+        """
+        Prints the phase times, the nodes per depth, the cuts per rule and,
+        if profiled, the |numFunctions| functions with the most cumulative time.
+        """
+        for name in self.phaseOrder:
+            print 'Phase %s: %.3f seconds in %d calls' % (name, self.phaseTimes[name], self.phaseCalls[name])
+        if self.nodesAtDepth:
+            print 'Nodes by depth: %s (%d total)' % \
+                (' '.join(str(count) for count in self.nodesAtDepth), sum(self.nodesAtDepth))
+        for rule in CUT_RULES:
+            print 'Cuts (%s): %d' % (rule, self.cuts.get(rule, 0))
+        report = self.profileReport()
+        if report is not None:
+            report.sort_stats('cumulative').print_stats(numFunctions)
+
+@contextmanager
+def timedPhase(stats, name):
+    """
+    Times the enclosed block as phase |name| of |stats|; does nothing when
+    |stats| is None.
+    """
+    if stats is None:
+        yield
+        return
+    start = stats.start_phase(name)
+    try:
+        yield
+    finally:
+        stats.end_phase(name, start)
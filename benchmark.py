@@ -0,0 +1,236 @@
+import sys
+import json
+import time
+import random
+import platform
+import multiprocessing
+import numpy as np
+from createCSP import createCSPWithVariables, addConstraints
+from BacktrackSearch import BacktrackingSearch
+from BranchAndBoundSearch import BranchAndBoundSearch
+from MonteCarloSearch import MonteCarloSearch
+from GeneticSearch import GeneticSearch
+
+# Benchmark of the lineup searches: every configuration runs on every week
+# with a fixed seed, in a fresh worker process; the memory a search takes
+# is its peak resident memory above the parsed slate.
+# usage (run): python benchmark.py -r [results.json] [baseline.json to compare against]
+# usage (compare): python benchmark.py -c [baseline.json] [results.json]
+
+# weeks to benchmark on: (week, future); past weeks use 2015W*.txt, the
+# future week the FanDuel slate
+benchmarkWeeks = [(w, False) for w in range(1,10)] + [(13, True)]
+year = 2015
+salaryCap = 60000
+salaryFloor = 58000
+seed = 0
+# times every run is repeated (with the same seed); the fastest counts
+numRepeats = 3
+# fractional slowdown of a configuration's total wall time over the weeks
+# reported as a regression; single runs are too short to compare alone
+timeTolerance = .2
+# drop in best or average projection reported as a regression
+projectionTolerance = 1e-6
+# fractional growth of a configuration's largest search memory over the
+# weeks reported as a regression, beyond a slack in kilobytes for noise
+memoryTolerance = .2
+memorySlack = 1024
+
+# (name, solver, parameters)
+configurations = [
+	('backtrack-greedy', 'backtrack', {'numLineups': 2000, 'ep_greedy': 1.0, 'comparisonIndex': 3}),
+	('backtrack-epsilon', 'backtrack', {'numLineups': 2000, 'ep_greedy': .5, 'comparisonIndex': 2}),
+	('backtrack-efficiency', 'backtrack', {'numLineups': 500, 'ep_greedy': -1, 'comparisonIndex': 3}),
+	('backtrack-mcv-ac3', 'backtrack', {'numLineups': 2000, 'ep_greedy': 1.0, 'comparisonIndex': 3, 'mcv': True, 'ac3': True}),
+	('topk', 'topk', {'numLineups': 1000}),
+	('branch-and-bound', 'branchandbound', {}),
+	('monte-carlo', 'montecarlo', {'numLineups': 10000, 'comparisonIndex': 2}),
+	('genetic', 'genetic', {'numLineups': 5000, 'comparisonIndex': 2}),
+]
+
+def runSolver(solver, params, csp):
+	# returns the search and its count of search effort (nodes)
+	if solver == 'backtrack':
+		search = BacktrackingSearch()
+		search.solve(csp, params['numLineups'], params['ep_greedy'], params['comparisonIndex'], \
+			mcv=params.get('mcv', False), ac3=params.get('ac3', False))
+		return search, search.numOperations
+	if solver == 'topk':
+		search = BacktrackingSearch()
+		search.solveTopK(csp, params['numLineups'])
+		return search, search.numOperations
+	if solver == 'branchandbound':
+		search = BranchAndBoundSearch()
+		search.solve(csp)
+		return search, search.numNodes
+	if solver == 'montecarlo':
+		search = MonteCarloSearch()
+		search.solve(csp, params['numLineups'], params['comparisonIndex'])
+		return search, search.numSamples
+	if solver == 'genetic':
+		search = GeneticSearch()
+		search.solve(csp, params['numLineups'], params['comparisonIndex'], seed=[seed])
+		return search, search.numEvaluations
+	raise Exception('Unknown solver %s' % solver)
+
+def memoryStatus(field):
+	# the VmRSS or VmHWM (peak) line of /proc/self/status in kilobytes, or
+	# None where there is none (not Linux)
+	try:
+		with open('/proc/self/status') as statusfile:
+			for line in statusfile:
+				if line.startswith(field + ':'):
+					return int(line.split()[1])
+	except IOError:
+		pass
+	return None
+
+def resetPeakMemory():
+	# makes VmHWM restart from the current resident memory (Linux 4.0 and later)
+	try:
+		with open('/proc/self/clear_refs', 'w') as clearfile:
+			clearfile.write('5')
+		return True
+	except IOError:
+		return False
+
+def benchmarkJob(job):
+	# one configuration on one week; runs in its own worker process
+	c, week, future = job
+	name, solver, params = configurations[c]
+
+	start = time.time()
+	csp, scores, projections = createCSPWithVariables(week, year, future)
+	addConstraints(csp, salaryCap, salaryFloor)
+	setupTime = time.time() - start
+
+	wallTime = None
+	searchMemory = None
+	for repeat in range(numRepeats):
+		np.random.seed([seed, c, week])
+		random.seed(np.random.randint(2**31 - 1))
+		# the peak is measured around the search only, not the parsing
+		before = memoryStatus('VmRSS') if resetPeakMemory() else None
+		start = time.time()
+		search, nodes = runSolver(solver, params, csp)
+		elapsed = time.time() - start
+		wallTime = elapsed if wallTime is None else min(wallTime, elapsed)
+		peak = memoryStatus('VmHWM')
+		if before is not None and peak is not None:
+			searchMemory = max(searchMemory, peak - before)
+
+	if solver == 'branchandbound':
+		numLineups = 1 if search.optimalAssignment else 0
+		bestProjection = averageProjection = search.optimalProjection
+	else:
+		numLineups = len(search.allAssignments)
+		computedProjections = search.allAssignments.projectionTotals()
+		bestProjection = float(computedProjections.max()) if numLineups else None
+		averageProjection = float(computedProjections.mean()) if numLineups else None
+
+	return {
+		'configuration': name,
+		'solver': solver,
+		'params': params,
+		'week': week,
+		'future': future,
+		'setupTime': setupTime,
+		'wallTime': wallTime,
+		'nodes': nodes,
+		'nodesPerSecond': nodes / wallTime if wallTime > 0 else None,
+		'lineups': numLineups,
+		'lineupsPerSecond': numLineups / wallTime if wallTime > 0 else None,
+		# kilobytes, None if it cannot be measured
+		'searchMemory': searchMemory,
+		'bestProjection': bestProjection,
+		'averageProjection': averageProjection,
+	}
+
+def runBenchmark():
+	jobs = [(c, week, future) for c in range(len(configurations)) for week, future in benchmarkWeeks]
+	# one process at a time, so runs do not compete for the CPU, and a new
+	# one per run, so peak memory is the run's own
+	pool = multiprocessing.Pool(1, maxtasksperchild=1)
+	results = []
+	for result in pool.imap(benchmarkJob, jobs):
+		print '%-22s week %2d: %8.3fs, %10d nodes, %6d lineups, best projection %s' % \
+			(result['configuration'], result['week'], result['wallTime'], result['nodes'], \
+			result['lineups'], result['bestProjection'])
+		sys.stdout.flush()
+		results.append(result)
+	pool.close()
+	pool.join()
+	return {
+		'meta': {'seed': seed, 'year': year, 'python': platform.python_version(), \
+			'numpy': np.__version__, 'machine': platform.platform(), 'time': time.time()},
+		'results': results,
+	}
+
+def compareResults(baseline, current):
+	# returns a list of messages, one per regression: per run, fewer lineups
+	# or lower projections (runs are seeded, so these should not move); per
+	# configuration, slower total wall time, fewer nodes per second or more
+	# search memory in its largest run
+	regressions = []
+	baselineRuns = dict(((run['configuration'], run['week']), run) for run in baseline['results'])
+	oldTotals = {}
+	newTotals = {}
+	oldMemory = {}
+	newMemory = {}
+	for run in current['results']:
+		key = (run['configuration'], run['week'])
+		if key not in baselineRuns:
+			continue
+		old = baselineRuns[key]
+		where = '%s week %d' % key
+		if run['lineups'] < old['lineups']:
+			regressions.append('%s: %d lineups, was %d' % (where, run['lineups'], old['lineups']))
+		for field in ['bestProjection', 'averageProjection']:
+			if old[field] is not None and (run[field] is None or run[field] < old[field] - projectionTolerance):
+				regressions.append('%s: %s %s, was %f' % (where, field, run[field], old[field]))
+		for totals, result in [(oldTotals, old), (newTotals, run)]:
+			wallTime, nodes = totals.get(run['configuration'], (0.0, 0))
+			totals[run['configuration']] = (wallTime + result['wallTime'], nodes + result['nodes'])
+		# baselines from before searchMemory was recorded are not compared
+		if old.get('searchMemory') is not None and run.get('searchMemory') is not None:
+			for memory, result in [(oldMemory, old), (newMemory, run)]:
+				memory[run['configuration']] = max(memory.get(run['configuration']), result['searchMemory'])
+
+	for name, (wallTime, nodes) in sorted(newTotals.iteritems()):
+		oldWallTime, oldNodes = oldTotals[name]
+		if wallTime > oldWallTime * (1 + timeTolerance):
+			regressions.append('%s: total wall time %.3fs, was %.3fs' % (name, wallTime, oldWallTime))
+		if wallTime > 0 and oldWallTime > 0 and nodes / wallTime < oldNodes / oldWallTime / (1 + timeTolerance):
+			regressions.append('%s: %.0f nodes per second, was %.0f' % (name, nodes / wallTime, oldNodes / oldWallTime))
+	for name, memory in sorted(newMemory.iteritems()):
+		if memory > oldMemory[name] * (1 + memoryTolerance) + memorySlack:
+			regressions.append('%s: %d kB of search memory, was %d kB' % (name, memory, oldMemory[name]))
+	return regressions
+
+def printComparison(baseline, current):
+	regressions = compareResults(baseline, current)
+	for regression in regressions:
+		print 'REGRESSION %s' % regression
+	print '%d regressions against the baseline' % len(regressions)
+	return regressions
+
+if __name__ == '__main__':
+	if len(sys.argv) >= 3 and sys.argv[1] == '-r':
+		results = runBenchmark()
+		with open(sys.argv[2], 'w') as outputfile:
+			json.dump(results, outputfile, indent=1, sort_keys=True)
+		if len(sys.argv) >= 4:
+			with open(sys.argv[3]) as inputfile:
+				regressions = printComparison(json.load(inputfile), results)
+			sys.exit(1 if regressions else 0)
+
+	elif len(sys.argv) == 4 and sys.argv[1] == '-c':
+		with open(sys.argv[2]) as inputfile:
+			baseline = json.load(inputfile)
+		with open(sys.argv[3]) as inputfile:
+			current = json.load(inputfile)
+		sys.exit(1 if printComparison(baseline, current) else 0)
+
+	else:
+		print 'usage (run): python benchmark.py -r [results.json] [baseline.json to compare against]'
+		print 'usage (compare): python benchmark.py -c [baseline.json] [results.json]'
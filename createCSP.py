@@ -1,5 +1,85 @@
-from getSalaries import getSalariesAndPositions, getFutureSalariesAndPositions
-from getProjections import getProjections
+from getSalaries import getSalariesAndPositions, getFutureSalariesAndPositions, \
+    getPlayerIdsAndTeams, getFuturePlayerIdsAndTeams
+from getProjections import getProjections, getProjectionRanges
+from PlayerTable import PlayerTable
+from SearchStats import timedPhase
+import numpy as np
+
+class LinearConstraint:
+    """
+    A global constraint lower <= sum of val[attribute] <= upper over the
+    values assigned to |variables|, where val is a domain tuple (attribute 1
+    is the salary). Either bound may be None.
+    """
+    def __init__(self, variables, attribute, lower, upper):
+        self.variables = list(variables)
+        self.attribute = attribute
+        self.lower = lower
+        self.upper = upper
+
+class RankOrderFactor:
+    """
+    The binary factor table between two variables of a symmetry group,
+    stored as the rank of each value instead of a dense table:
+    factor[val1][val2] is 1 if rank[val1] < rank[val2] (rank[val1] >
+    rank[val2] when not |ascending|) and 0 otherwise. It is looked up like
+    the nested dictionaries of the other factors.
+    """
+    def __init__(self, rank, ascending):
+        self.rank = rank
+        self.ascending = ascending
+        # rows built so far, by val1
+        self.rows = {}
+
+    def __getitem__(self, val1):
+        row = self.rows.get(val1)
+        if row is None:
+            row = self.rows[val1] = RankOrderRow(self.rank, self.rank[val1], self.ascending)
+        return row
+
+    def __iter__(self):
+        return iter(self.rank)
+
+    def __contains__(self, val):
+        return val in self.rank
+
+    def dense(self):
+        """
+        Returns the factor as a nested dictionary, to merge other factors
+        into.
+        """
+        return {val1: {val2: self[val1][val2] for val2 in self.rank} for val1 in self.rank}
+
+    def compatible(self, values1, values2):
+        """
+        Returns the boolean (len(values1), len(values2)) matrix of the value
+        pairs with a nonzero factor.
+        """
+        ranks1 = np.array([self.rank[val] for val in values1], dtype=np.int64)
+        ranks2 = np.array([self.rank[val] for val in values2], dtype=np.int64)
+        if self.ascending:
+            return ranks1[:, None] < ranks2[None, :]
+        return ranks1[:, None] > ranks2[None, :]
+
+class RankOrderRow:
+    """
+    factor[val1] of a RankOrderFactor.
+    """
+    def __init__(self, rank, rank1, ascending):
+        self.rank = rank
+        self.rank1 = rank1
+        self.ascending = ascending
+
+    def __getitem__(self, val2):
+        if self.ascending:
+            return 1.0 if self.rank1 < self.rank[val2] else 0.0
+        return 1.0 if self.rank1 > self.rank[val2] else 0.0
+
+    def __iter__(self):
+        return iter(self.rank)
+
+    def __contains__(self, val):
+        return val in self.rank
 
 class CSP:
     def __init__(self):
@@ -39,6 +119,25 @@ class CSP:
 
         self.binaryFactors = {}
 
+        # Groups of interchangeable variables that share a domain, such as
+        # RB1 and RB2. Within a group values are kept in ascending canonical
+        # order, so each multiset of values is assigned exactly once.
+        # symmetryRanks[i] maps each value of group i to its rank in that
+        # order.
+        self.symmetryGroups = []
+        self.symmetryRanks = []
+
+        # Optional columnar table of every domain value (a PlayerTable), and
+        # for each variable the array of table rows making up its domain, in
+        # the same order as values[var].
+        self.playerTable = None
+        self.domainIndices = {}
+
+        # Global linear constraints (LinearConstraint) over several variables,
+        # such as the salary cap. They are not expanded into factor tables;
+        # searches propagate their bounds directly.
+        self.linearConstraints = []
+
     def add_variable(self, var, domain):
         """
         Add a new variable to the CSP.
@@ -106,6 +205,77 @@ class CSP:
             {val2: {val1: float(factor_func(val1, val2)) \
                 for val1 in self.values[var1]} for val2 in self.values[var2]})
 
+    def add_symmetry_group(self, variables, key = None):
+        """
+        Declares |variables| interchangeable: they must share a domain, and
+        any assignment to them is only allowed in canonical form, with the
+        values in strictly ascending order of key(val) (ties, or every value
+        without a key, by position in the domain). This removes the
+        permutations of the same values (2 for a pair, 6 for a triple) from
+        the search space and also forbids repeats.
+        """
+        domain = self.values[variables[0]]
+        for var in variables:
+            assert self.values[var] == domain
+        order = range(len(domain))
+        if key is not None:
+            order.sort(key=lambda i: key(domain[i]))
+        rank = {domain[i]: r for r, i in enumerate(order)}
+        # the tables of ordered pairs are quadratic in the domain, so they
+        # are kept as the ranks (RankOrderFactor)
+        for i in range(len(variables)):
+            for j in range(i + 1, len(variables)):
+                self.update_binary_factor_table(variables[i], variables[j], RankOrderFactor(rank, True))
+                self.update_binary_factor_table(variables[j], variables[i], RankOrderFactor(rank, False))
+        self.symmetryGroups.append(list(variables))
+        self.symmetryRanks.append(rank)
+
+    def add_linear_constraint(self, variables, attribute, lower = None, upper = None):
+        """
+        Adds the global constraint lower <= sum of val[attribute] <= upper
+        over the values assigned to |variables|, e.g. the salary cap with
+        attribute 1. Unlike get_sum_variable this adds no auxiliary
+        variables; the searches prune with the bounds of the partial sums.
+        """
+        for var in variables:
+            if var not in self.values:
+                raise Exception('Unknown variable %s' % var)
+        self.linearConstraints.append(LinearConstraint(variables, attribute, lower, upper))
+
+    def get_salary_bounds(self):
+        """
+        Returns the (floor, cap) of the total salary of a lineup: the
+        tightest bounds of the linear constraints on the salary (attribute
+        1) over every variable. The floor is None if no constraint sets one.
+        Raises an exception if there is no cap, so a search never runs
+        unconstrained on a CSP built without addConstraints.
+        """
+        floor = None
+        cap = None
+        for constraint in self.linearConstraints:
+            if constraint.attribute != 1 or set(constraint.variables) != set(self.variables):
+                continue
+            if constraint.lower is not None:
+                floor = constraint.lower if floor is None else max(floor, constraint.lower)
+            if constraint.upper is not None:
+                cap = constraint.upper if cap is None else min(cap, constraint.upper)
+        if cap is None:
+            raise Exception('The CSP has no salary cap; add one with addConstraints')
+        return floor, cap
+
+    def canonical_assignment(self, assignment):
+        """
+        Returns a copy of a complete |assignment| with the values of every
+        symmetry group sorted into canonical order. Searches that only keep
+        groupmates distinct use this to store each roster in a single form.
+        """
+        canonical = dict(assignment)
+        for group, rank in zip(self.symmetryGroups, self.symmetryRanks):
+            values = sorted((assignment[var] for var in group), key=lambda val: rank[val])
+            for var, val in zip(group, values):
+                canonical[var] = val
+        return canonical
+
     def update_binary_factor_table(self, var1, var2, table):
         """
         Private method you can skip for 0c, might be useful for 1c though.
@@ -117,71 +287,59 @@ class CSP:
             self.binaryFactors[var1][var2] = table
         else:
             currentTable = self.binaryFactors[var1][var2]
+            if isinstance(currentTable, RankOrderFactor):
+                currentTable = currentTable.dense()
+                self.binaryFactors[var1][var2] = currentTable
             for i in table:
                 for j in table[i]:
                     assert i in currentTable and j in currentTable[i]
                     currentTable[i][j] *= table[i][j]
 
-def createCSPWithVariables(week, year,future):
+def createCSPWithVariables(week, year,future, stats = None):
     csp = CSP()
     yw = str(year) + "W" + str(week)
     filename = yw + ".txt"
     filename2 = 'FFA-CustomRankings'+yw+'.csv'
     filename3 = 'FanDuel'+yw+'.csv'
-    if future:
-        salaries, positions, scores = getFutureSalariesAndPositions(filename3)
-    else:
-        salaries, positions, scores = getSalariesAndPositions(filename)
-    projections = getProjections(filename2)
-
-    TE_domain = []
-    RB_domain = []
-    WR_domain = []
-    K_domain = []
-    QB_domain = []
-    Defense_domain = []
-
-    for player in salaries: 
-        position = positions[player]
-        salary = salaries[player]
-        if player in projections:
-            projection = projections[player]
+    with timedPhase(stats, 'parse'):
+        if future:
+            salaries, positions, scores = getFutureSalariesAndPositions(filename3)
+            ids, teams = getFuturePlayerIdsAndTeams(filename3)
         else:
-            projection = 0
-        # projected points per 1000 dollars
-        if salary == 0:
-            efficiency = 0
-        else:
-            efficiency = projection*1000/salary
-
-        if position == "QB":
-            QB_domain.append((player, salary, projection, efficiency))
-        if position == "RB":
-            RB_domain.append((player, salary, projection, efficiency))
-        if position == "WR":
-            WR_domain.append((player, salary, projection, efficiency))
-        if position == "TE":
-            TE_domain.append((player, salary, projection, efficiency))
-        if position == "PK":
-            K_domain.append((player, salary, projection, efficiency))
-        if position == "Def":
-            Defense_domain.append((player, salary, projection, efficiency))
-    
-    csp.add_variable("QB", QB_domain)
-    csp.add_variable("RB1", RB_domain)
-    csp.add_variable("RB2", RB_domain)
-    csp.add_variable("WR1", WR_domain)
-    csp.add_variable("WR2", WR_domain)
-    csp.add_variable("WR3", WR_domain)
-    csp.add_variable("TE", TE_domain)
-    csp.add_variable("K", K_domain)
-    csp.add_variable("D", Defense_domain)
+            salaries, positions, scores = getSalariesAndPositions(filename)
+            ids, teams = getPlayerIdsAndTeams(filename)
+        projections = getProjections(filename2)
+        upper, lower, risks = getProjectionRanges(filename2)
+
+    # sorted, so the domain order does not depend on dict internals (a
+    # dict loaded from the parse cache can iterate differently)
+    players = sorted(salaries)
+    table = PlayerTable(players, [ids.get(player, '') for player in players], \
+        [positions[player] for player in players], [teams.get(player, '') for player in players], \
+        [salaries[player] for player in players], \
+        [projections[player] if player in projections else 0 for player in players], \
+        [risks.get(player, float('nan')) for player in players], \
+        [upper.get(player, float('nan')) for player in players], \
+        [lower.get(player, float('nan')) for player in players])
+
+    domains = {}
+    for position in ["QB", "RB", "WR", "TE", "PK", "Def"]:
+        rows = [row for row in range(len(table)) if table.positions[row] == position]
+        domains[position] = (np.array(rows, dtype=np.int64), [table.tuples[row] for row in rows])
+
+    csp.playerTable = table
+    for var, position in [("QB", "QB"), ("RB1", "RB"), ("RB2", "RB"), ("WR1", "WR"), \
+            ("WR2", "WR"), ("WR3", "WR"), ("TE", "TE"), ("K", "PK"), ("D", "Def")]:
+        rows, domain = domains[position]
+        csp.add_variable(var, domain)
+        csp.domainIndices[var] = rows
 
     return csp, scores, projections
 
-def addConstraints(csp, salaryCap):
-    csp.add_binary_factor("RB1", "RB2", lambda x,y: x != y)
-    csp.add_binary_factor("WR1", "WR2", lambda x,y: x != y)
-    csp.add_binary_factor("WR2", "WR3", lambda x,y: x != y)
-    csp.add_binary_factor("WR1", "WR3", lambda x,y: x != y)
-    variables = ["QB", "RB1", "RB2", "WR1", "WR2", "WR3", "K", "D", "TE"]
\ No newline at end of file
+def addConstraints(csp, salaryCap, salaryFloor = None):
+    # Groupmates in ascending salary order, so the searches can bound the
+    # salary of the slots left in a group from its assigned slots.
+    csp.add_symmetry_group(["RB1", "RB2"], key=lambda val: val[1])
+    csp.add_symmetry_group(["WR1", "WR2", "WR3"], key=lambda val: val[1])
+    variables = ["QB", "RB1", "RB2", "WR1", "WR2", "WR3", "K", "D", "TE"]
+    csp.add_linear_constraint(variables, 1, lower=salaryFloor, upper=salaryCap)
@@ -1,10 +1,22 @@
+import os
 import sys
 import csv
 import numpy as np
 import random
-from printProjectedResults import printProjectedResults, computeFutureProjection
+import heapq
+import multiprocessing
+from printProjectedResults import printProjectedResults
 from createCSP import createCSPWithVariables, addConstraints
 from BacktrackSearch import BacktrackingSearch
+from BranchAndBoundSearch import BranchAndBoundSearch
+from ParallelSearch import ParallelBacktrackingSearch
+from MonteCarloSearch import MonteCarloSearch
+from LocalSearch import LocalSearch
+from GeneticSearch import GeneticSearch
+from ScoreSimulation import simulatePlayerScores, lineupWins
+from PortfolioSelection import selectPortfolio
+from SearchStats import SearchStats, timedPhase
+from FanDuelExport import FanDuelWriter
 from getSalaries import getSalariesAndPositions, getFutureSalariesAndPositions
 from getProjections import getProjections
 
@@ -15,8 +27,16 @@ from getProjections import getProjections
 numLineups = 10000
 # once lineups are generated, what percentage to submit given their projected scores
 percentLineupsUsed = .5
-# this variable doesn't actually get used; fix this where it is hardcoded in solve of BacktrackingSearch
+# how to choose the lineups to submit: None for the highest projections, or a
+# selectPortfolio objective over simulated scores ('atLeastOne' or 'expected')
+portfolioObjective = None
+# number of simulated outcomes portfolio selection uses
+numSimulations = 1000
+# score a lineup needs to win
+winnerThreshold = 111.21
+# maximum and minimum total salary of a lineup
 salaryCap = 60000
+salaryFloor = 58000
 # week to generate lineups for
 futureWeek = 13
 # year to generate lineups for
@@ -25,6 +45,33 @@ futureYear = 2015
 evalWeeks = range(1,10)
 # year to evaluate lineups for
 evalYear = 2015
+# number of worker processes for the backtest and lineup generation (1 runs serially)
+numWorkers = multiprocessing.cpu_count()
+# number of independently seeded runs the future-week lineup budget is split into;
+# results depend on this and the seed, not on numWorkers
+numChunks = 8
+# base seed; every backtest job derives its own seed from it and its position
+seed = 0
+# number of sampled lineups local search starts from, and moves tried on each
+numLocalSearchSeeds = 100
+numLocalSearchMoves = 2000
+# epsilon-greedy probability of the BacktrackingSearch the genetic search is compared to
+benchmarkEpGreedy = .5
+# for -t and -f: time each phase (parse, createCSPWithVariables, addConstraints,
+# search, printProjectedResults), count BacktrackingSearch nodes per depth and
+# cuts per rule, and print them at the end
+collectStats = False
+# with collectStats, also run cProfile during the phases and print the top functions
+profileStats = False
+# for -f on a future week and for -e: seconds after which each lineup search
+# stops and keeps what it found (None searches until numLineups are found)
+searchTimeLimit = None
+# for -e: file the search frontier is saved to when searchTimeLimit stops the
+# export early; the next -e run resumes from it and appends to the upload file
+exportStateFile = None
+# epsilon-greedy probability and comparison index of the lineups streamed to a FanDuel upload file
+exportEpGreedy = .5
+exportComparisonIndex = 2
 # epsilon-greedy probability (higher is more deterministic)
 # ep_greedy = 1.0
 # number of iterations of each test
@@ -46,60 +93,331 @@ def parseArgs():
 	return ep_greedy, numIters, numEpGreedyTrials, future
 
 def futureProjections(ep_greedy, numIters, numEpGreedyTrials):
-	csp, scores, projections = createCSPWithVariables(futureWeek, futureYear,future)
-	addConstraints(csp, salaryCap)
-	search = BacktrackingSearch()
+	stats = SearchStats(profileStats) if collectStats else None
+	with timedPhase(stats, 'createCSPWithVariables'):
+		csp, scores, projections = createCSPWithVariables(futureWeek, futureYear,future,stats)
+	with timedPhase(stats, 'addConstraints'):
+		addConstraints(csp, salaryCap, salaryFloor)
+	search = ParallelBacktrackingSearch(numWorkers, numChunks)
 
-	for i in range(0, numEpGreedyTrials):
-		if i > 0:
-			ep_greedy -= .1
+	# exact optimum, for reference against the sampled maxima below
+	exact = BranchAndBoundSearch()
+	exact.solve(csp)
+	print 'Exact Max Projection: %f (%d nodes)' % (exact.optimalProjection, exact.numNodes)
+
+	# the worker pool is kept between the solves below
+	try:
+		for i in range(0, numEpGreedyTrials):
+			if i > 0:
+				ep_greedy -= .1
 
-		print 'BacktrackingSearch with epsilon-greedy value of %f' % ep_greedy
-		for k in range(1,4):
-			if i + 1 == numEpGreedyTrials and (k == 1 or k == 2):
-				continue
+			print 'BacktrackingSearch with epsilon-greedy value of %f' % ep_greedy
+			for k in range(1,4):
+				if i + 1 == numEpGreedyTrials and (k == 1 or k == 2):
+					continue
 
-			average = 0.0
-			for j in range(0, numIters):
-				search.solve(csp,numLineups,ep_greedy,k)
-				computedProjections = []
+				average = 0.0
+				for j in range(0, numIters):
+					with timedPhase(stats, 'search'):
+						search.solve(csp,numLineups,ep_greedy,k,seed=[seed, i, k, j],stats=stats,timeLimit=searchTimeLimit)
+					computedProjections = search.allAssignments.projectionTotals()
+					average += float(computedProjections.max()) / float(numIters)
 
-				for assignment in search.allAssignments:
-				    projection = computeFutureProjection(assignment,projections)
-				    computedProjections.append(projection)
-				average += float(max(computedProjections)) / float(numIters)
+				print 'Average Max Projection with comparison index %d: %f' % (k, average)
+			print '\n'
+	finally:
+		search.close()
 
-			print 'Average Max Projection with comparison index %d: %f' % (k, average)
-		print '\n'
+	if stats is not None:
+		stats.print_stats()
+
+def selectLineups(search, csp):
+	# indices of the lineups to submit, or None for the top projections
+	if portfolioObjective is None:
+		return None
+	lineups = search.allAssignments
+	numSelected = int(len(lineups)*percentLineupsUsed)
+	if numSelected == 0:
+		numSelected = len(lineups)
+	playerScores = simulatePlayerScores(csp.playerTable, numSimulations)
+	wins = lineupWins(lineups.indices(), playerScores, winnerThreshold)
+	return selectPortfolio(wins, numSelected, portfolioObjective, priority=lineups.projectionTotals())
+
+def backtestJob(job):
+	# one week of one iteration of one (epsilon, comparison index) test;
+	# runs in a worker process, seeded only from the job itself; returns the
+	# week's (winners, lineups submitted) and its SearchStats if collectStats
+	ep_greedy, k, jobSeed, w = job
+	np.random.seed(jobSeed)
+	random.seed(np.random.randint(2**31 - 1))
+	stats = SearchStats(profileStats) if collectStats else None
+	with timedPhase(stats, 'createCSPWithVariables'):
+		csp, scores, projections = createCSPWithVariables(w, evalYear, False, stats)
+	with timedPhase(stats, 'addConstraints'):
+		addConstraints(csp, salaryCap, salaryFloor)
+	search = BacktrackingSearch()
+	with timedPhase(stats, 'search'):
+		search.solve(csp,numLineups,ep_greedy,k,stats=stats)
+	with timedPhase(stats, 'printProjectedResults'):
+		win, total = printProjectedResults(search,scores,w,projections,percentLineupsUsed,winnerThreshold,selectLineups(search, csp))
+	return win, total, stats
 
 def pastPerformance(ep_greedy, numIters, numEpGreedyTrials):
+	trials = []
 	for i in range(0, numEpGreedyTrials):
 		if i > 0:
 			ep_greedy -= .1
+		trials.append(ep_greedy)
+
+	# every (trial, k, iteration, week) is independent; results come back in
+	# job order, so the aggregation below matches the serial loops
+	jobs = [(trials[i], k, [seed, i, k, j, w], w) for i in range(0, numEpGreedyTrials) \
+		for k in range(1, 4) for j in range(0, numIters) for w in evalWeeks]
+	pool = multiprocessing.Pool(numWorkers) if numWorkers > 1 else None
+	try:
+		if pool is not None:
+			results = pool.imap(backtestJob, jobs)
+		else:
+			results = (backtestJob(job) for job in jobs)
+
+		# phase times are summed over the jobs
+		stats = SearchStats() if collectStats else None
+		for i in range(0, numEpGreedyTrials):
+			print 'BacktrackingSearch with epsilon-greedy value of %f' % trials[i]
+			for k in range(1, 4):
+				average = 0.0
+				for j in range(0,numIters):
+					win = 0
+					total = 0
+					for w in evalWeeks:
+						win_from_week, total_from_week, jobStats = next(results)
+						if stats is not None:
+							stats.merge(jobStats)
+						win += win_from_week
+						total += total_from_week
+					if total > 0:
+						average += float(win)/(total*float(numIters))
+				print 'Average win percentage with comparison index %d: %f' % (k, average)
+			print '\n'
+	finally:
+		# every job is done unless one raised (or ^C); then the rest are dropped
+		# rather than left running
+		if pool is not None:
+			pool.terminate()
+			pool.join()
+
+	if stats is not None:
+		stats.print_stats()
+
+def topKProjections():
+	csp, scores, projections = createCSPWithVariables(futureWeek, futureYear, future)
+	addConstraints(csp, salaryCap, salaryFloor)
+	search = BacktrackingSearch()
+	search.solveTopK(csp, int(numLineups*percentLineupsUsed))
+	computedProjections = search.allAssignments.projectionTotals()
+	print 'Top %d lineups: projections from %f down to %f' % (len(computedProjections), computedProjections[0], computedProjections[-1])
+
+def topKPerformance():
+	win = 0
+	total = 0
+	for w in evalWeeks:
+		csp, scores, projections = createCSPWithVariables(w, evalYear, future)
+		addConstraints(csp, salaryCap, salaryFloor)
+		search = BacktrackingSearch()
+		# the search already returns only the lineups we would submit
+		search.solveTopK(csp, int(numLineups*percentLineupsUsed))
+		win_from_week, total_from_week = printProjectedResults(search,scores,w,projections,1.0)
+		win += win_from_week
+		total += total_from_week
+	if total > 0:
+		print 'Top-K win percentage: %f' % (float(win)/total)
+
+def monteCarloProjections():
+	csp, scores, projections = createCSPWithVariables(futureWeek, futureYear, future)
+	addConstraints(csp, salaryCap, salaryFloor)
+	search = MonteCarloSearch()
+	for k in range(1,4):
+		np.random.seed([seed, k])
+		search.solve(csp, numLineups, k)
+		search.print_stats()
+		computedProjections = search.allAssignments.projectionTotals()
+		print 'Max Projection with comparison index %d: %f' % (k, computedProjections.max())
+
+def monteCarloPerformance():
+	search = MonteCarloSearch()
+	for k in range(1,4):
+		win = 0
+		total = 0
+		for w in evalWeeks:
+			np.random.seed([seed, k, w])
+			csp, scores, projections = createCSPWithVariables(w, evalYear, future)
+			addConstraints(csp, salaryCap, salaryFloor)
+			search.solve(csp, numLineups, k)
+			win_from_week, total_from_week = printProjectedResults(search,scores,w,projections,percentLineupsUsed,winnerThreshold,selectLineups(search, csp))
+			win += win_from_week
+			total += total_from_week
+		if total > 0:
+			print 'Monte Carlo win percentage with comparison index %d: %f' % (k, float(win)/total)
+
+def localSearchLineups(csp, k):
+	# improve the best Monte Carlo lineups by simulated annealing
+	seeds = MonteCarloSearch()
+	seeds.solve(csp, numLineups, k)
+	best = np.argsort(-seeds.allAssignments.projectionTotals(), kind='mergesort')[:numLocalSearchSeeds]
+	search = LocalSearch('anneal', numLocalSearchMoves)
+	search.solve(csp, [seeds.allAssignments[i] for i in best.tolist()])
+	search.print_stats()
+	return search
+
+def localSearchProjections():
+	csp, scores, projections = createCSPWithVariables(futureWeek, futureYear, future)
+	addConstraints(csp, salaryCap, salaryFloor)
+	for k in range(1,4):
+		np.random.seed([seed, k])
+		random.seed(np.random.randint(2**31 - 1))
+		search = localSearchLineups(csp, k)
+		computedProjections = search.allAssignments.projectionTotals()
+		print 'Max Projection with comparison index %d: %f' % (k, computedProjections.max())
+
+def localSearchPerformance():
+	for k in range(1,4):
+		win = 0
+		total = 0
+		for w in evalWeeks:
+			np.random.seed([seed, k, w])
+			random.seed(np.random.randint(2**31 - 1))
+			csp, scores, projections = createCSPWithVariables(w, evalYear, future)
+			addConstraints(csp, salaryCap, salaryFloor)
+			search = localSearchLineups(csp, k)
+			win_from_week, total_from_week = printProjectedResults(search,scores,w,projections,1.0)
+			win += win_from_week
+			total += total_from_week
+		if total > 0:
+			print 'Local search win percentage with comparison index %d: %f' % (k, float(win)/total)
 
-		print 'BacktrackingSearch with epsilon-greedy value of %f' % ep_greedy
-		for k in range(1, 4):
-			average = 0.0
-			for j in range(0,numIters):
-				win = 0
-				total = 0
-				for w in evalWeeks:
-					csp, scores, projections = createCSPWithVariables(w, evalYear, future)
-					addConstraints(csp, salaryCap)
-					search = BacktrackingSearch()
-					search.solve(csp,numLineups,ep_greedy,k)
-					win_from_week, total_from_week = printProjectedResults(search,scores,w,projections,percentLineupsUsed)
-					win += win_from_week
-					total += total_from_week
-				if total > 0:
-					average += float(win)/(total*float(numIters))
-			print 'Average win percentage with comparison index %d: %f' % (k, average)
-		print '\n'
+def cpuTime():
+	# user and system time of this process and of its finished worker processes
+	times = os.times()
+	return times[0] + times[1] + times[2] + times[3]
+
+def submittedProjection(search):
+	# mean projection of the lineups we would submit
+	computedProjections = np.sort(search.allAssignments.projectionTotals())[::-1]
+	return computedProjections[:max(int(len(computedProjections)*percentLineupsUsed), 1)].mean()
+
+def geneticProjections():
+	csp, scores, projections = createCSPWithVariables(futureWeek, futureYear, future)
+	addConstraints(csp, salaryCap, salaryFloor)
+	def backtrack(search):
+		search.solve(csp,numLineups,benchmarkEpGreedy,k,seed=[seed,k])
+		# workers count toward cpuTime once they exit
+		search.close()
+	for k in range(1,4):
+		searches = [('Genetic search', GeneticSearch(numWorkers), lambda search: search.solve(csp,numLineups,k,seed=[seed,k])), \
+			('BacktrackingSearch', ParallelBacktrackingSearch(numWorkers, numChunks), backtrack)]
+		for name, search, solve in searches:
+			start = cpuTime()
+			solve(search)
+			seconds = cpuTime() - start
+			print '%s with comparison index %d: %d lineups, mean submitted projection %f, max %f, %.2f CPU seconds' % \
+				(name, k, len(search.allAssignments), submittedProjection(search), search.allAssignments.projectionTotals().max(), seconds)
+
+def geneticPerformance():
+	search = GeneticSearch(numWorkers)
+	for k in range(1,4):
+		win = 0
+		total = 0
+		start = cpuTime()
+		for w in evalWeeks:
+			csp, scores, projections = createCSPWithVariables(w, evalYear, future)
+			addConstraints(csp, salaryCap, salaryFloor)
+			search.solve(csp, numLineups, k, seed=[seed, k, w])
+			win_from_week, total_from_week = printProjectedResults(search,scores,w,projections,percentLineupsUsed,winnerThreshold,selectLineups(search, csp))
+			win += win_from_week
+			total += total_from_week
+		if total > 0:
+			print 'Genetic search win percentage with comparison index %d: %f (%.2f CPU seconds)' % (k, float(win)/total, cpuTime() - start)
+
+def exportLineups(filename):
+	# streams the future week's lineups into a FanDuel upload file as they
+	# are found, scoring each on the way and keeping only the best ones
+	# we would submit in a bounded heap (of this run, when resuming)
+	csp, scores, projections = createCSPWithVariables(futureWeek, futureYear, True)
+	addConstraints(csp, salaryCap, salaryFloor)
+	numSubmitted = max(int(numLineups*percentLineupsUsed), 1)
+	best = []
+	search = BacktrackingSearch()
+	resuming = exportStateFile is not None and os.path.exists(exportStateFile)
+	if resuming:
+		search.load_state(csp, exportStateFile)
+		lineups = search.resume(timeLimit=searchTimeLimit)
+	else:
+		np.random.seed(seed)
+		random.seed(np.random.randint(2**31 - 1))
+		lineups = search.iter_lineups(csp, numLineups, exportEpGreedy, exportComparisonIndex, \
+			timeLimit=searchTimeLimit)
+	with open(filename, 'ab' if resuming else 'wb') as outputfile:
+		writer = FanDuelWriter(outputfile, csp, writeHeader=not resuming)
+		for assignment in lineups:
+			writer.write(assignment)
+			projection = sum(val[2] for val in assignment.itervalues())
+			if len(best) < numSubmitted:
+				heapq.heappush(best, projection)
+			else:
+				heapq.heappushpop(best, projection)
+	print 'Wrote %d lineups to %s; the best %d project from %f down to %f' % \
+		(writer.numRows, filename, len(best), max(best) if best else 0, best[0] if best else 0)
+	if search.timedOut:
+		print 'Stopped after %.1f seconds; best projection over time:' % searchTimeLimit
+	for seconds, found, bestProjection in search.qualityCurve[::max(len(search.qualityCurve) // 10, 1)]:
+		print '%8.2fs: %6d lineups, best projection %s' % (seconds, found, bestProjection)
+	if exportStateFile is not None:
+		if search.timedOut:
+			search.save_state(exportStateFile)
+			print 'Saved the search to %s; run -e again to continue it' % exportStateFile
+		elif resuming:
+			os.remove(exportStateFile)
 
 if __name__ == '__main__':
-	if len(sys.argv) <= 3:
+	if len(sys.argv) == 3 and sys.argv[1] == '-k':
+		future = False if sys.argv[2] == '0' else True
+		if future:
+			topKProjections()
+		else:
+			topKPerformance()
+
+	elif len(sys.argv) == 3 and sys.argv[1] == '-m':
+		future = False if sys.argv[2] == '0' else True
+		if future:
+			monteCarloProjections()
+		else:
+			monteCarloPerformance()
+
+	elif len(sys.argv) == 3 and sys.argv[1] == '-l':
+		future = False if sys.argv[2] == '0' else True
+		if future:
+			localSearchProjections()
+		else:
+			localSearchPerformance()
+
+	elif len(sys.argv) == 3 and sys.argv[1] == '-g':
+		future = False if sys.argv[2] == '0' else True
+		if future:
+			geneticProjections()
+		else:
+			geneticPerformance()
+
+	elif len(sys.argv) == 3 and sys.argv[1] == '-e':
+		exportLineups(sys.argv[2])
+
+	elif len(sys.argv) <= 3:
 		print 'usage (for one test): python final_cleaned.py -t [0 for Past or 1 for Future] [1 to 100 for number of iterations of the each test] [float between 0 and 1 for epsilon-greedy prob (higher is more deterministic]'
 		print 'usage (for test suite): python final_cleaned.py -f [0 for Past or 1 for Future] [1 to 100 for number of iterations of the each test]'
+		print 'usage (for top-K lineups): python final_cleaned.py -k [0 for Past or 1 for Future]'
+		print 'usage (for Monte Carlo lineups): python final_cleaned.py -m [0 for Past or 1 for Future]'
+		print 'usage (for Monte Carlo lineups improved by local search): python final_cleaned.py -l [0 for Past or 1 for Future]'
+		print 'usage (for genetic search, benchmarked against BacktrackingSearch): python final_cleaned.py -g [0 for Past or 1 for Future]'
+		print 'usage (for a FanDuel upload file of future lineups): python final_cleaned.py -e [output.csv]'
 
 	else:
 		ep_greedy, numIters, numEpGreedyTrials, future = parseArgs()
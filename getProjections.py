@@ -1,21 +1,39 @@
 import csv
+from parseCache import cachedParse
 
+def projectionName(line):
+    if line[3] == 'DST':
+        return line[4].lower() + 'Defense'
+    return line[2]
+
+@cachedParse(1)
 def getProjections(filename):
     with open(filename) as inputfile:
         results = list(csv.reader(inputfile))
     projections = {}
+    for i in range(1,len(results) - 1):
+        line = results[i]
+        projections[projectionName(line)] = float(line[8])
+    return projections
+
+@cachedParse(1)
+def getProjectionRanges(filename):
+    """
+    Returns the upper and lower projections and the risk of every player
+    with a value for them, keyed by the same names as getProjections.
+    """
+    with open(filename) as inputfile:
+        results = list(csv.reader(inputfile))
+    upper = {}
+    lower = {}
     risks = {}
     for i in range(1,len(results) - 1):
         line = results[i]
-        name = ''
-        projection = ''
-        if line[3] == 'DST':
-            name = line[4].lower() + 'Defense'
-        else:
-            name = line[2]
-        projection = line[8]
-        projections[name] = float(projection)
-        risk = line[21]
-        if risk != 'null':
-            risks[name] = float(risk)
-    return projections
\ No newline at end of file
+        name = projectionName(line)
+        if line[19] != 'null':
+            upper[name] = float(line[19])
+        if line[20] != 'null':
+            lower[name] = float(line[20])
+        if line[21] != 'null':
+            risks[name] = float(line[21])
+    return upper, lower, risks
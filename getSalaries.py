@@ -1,5 +1,69 @@
 import csv
+from parseCache import cachedParse
 
+def parseLine(line):
+    """
+    Returns (name, salary, position, score, id, team) for a line of a
+    past-week salary file.
+    """
+    if line[4] == 'Def':
+        if line[5] == 'nwe':
+            line[5] = 'ne'
+        if line[5] == 'kan':
+            line[5] = 'kc'
+        if line[5] == 'nor':
+            line[5] = 'no'
+        if line[5] == 'gnb':
+            line[5] = 'gb'
+        if line[5] == 'tam':
+            line[5] = 'tb'
+        if line[5] == 'sfo':
+            line[5] = 'sf'
+        if line[5] == 'sdg':
+            line[5] = 'sd'
+        name = line[5]+'Defense'
+        salary = line[9]
+        position = line[4]
+        score = line[8]
+        team = line[5]
+    else:
+        firstName = line[4]
+        lastName = line[3]
+        name = '%s %s' %(firstName,lastName)
+        if name == 'Odell BeckhamJr.':
+            name = 'Odell Beckham'
+        salary = line[10]
+        position = line[5]
+        score = line[9]
+        team = line[6]
+    return name, salary, position, score, line[2], team
+
+def parseFutureLine(line):
+    """
+    Returns (name, salary, position, id, team) for a line of a FanDuel
+    salary file.
+    """
+    if line[1] == 'D':
+        name = line[8].lower()+'Defense'
+        salary = line[6]
+        position = "Def"
+    elif line[1] == 'K':
+        firstName = line[2]
+        lastName = line[3]
+        name = '%s %s' %(firstName,lastName)
+        salary = line[6]
+        position = 'PK'
+    else:
+        firstName = line[2]
+        lastName = line[3]
+        name = '%s %s' %(firstName,lastName)
+        if name == 'Odell Beckham Jr.':
+            name = 'Odell Beckham'
+        salary = line[6]
+        position = line[1]
+    return name, salary, position, line[0], line[8]
+
+@cachedParse(1)
 def getSalariesAndPositions(filename):
     with open(filename) as inputfile:
         results = list(csv.reader(inputfile))
@@ -7,35 +71,7 @@ def getSalariesAndPositions(filename):
     positions = {}
     scores = {}
     for i in range(1,len(results) - 1):
-        line = results[i]
-        if line[4] == 'Def':
-            if line[5] == 'nwe':
-                line[5] = 'ne'
-            if line[5] == 'kan':
-                line[5] = 'kc'
-            if line[5] == 'nor':
-                line[5] = 'no'
-            if line[5] == 'gnb':
-                line[5] = 'gb'
-            if line[5] == 'tam':
-                line[5] = 'tb'
-            if line[5] == 'sfo':
-                line[5] = 'sf'
-            if line[5] == 'sdg':
-                line[5] = 'sd'
-            name = line[5]+'Defense'
-            salary = line[9]
-            position = line[4]
-            score = line[8]
-        else:
-            firstName = line[4]
-            lastName = line[3]
-            name = '%s %s' %(firstName,lastName)
-            if name == 'Odell BeckhamJr.':
-                name = 'Odell Beckham'
-            salary = line[10]
-            position = line[5]
-            score = line[9]
+        name, salary, position, score, playerId, team = parseLine(results[i])
 
         if not salary == '' and not position == '':
             salaries[name] = int(salary)
@@ -44,35 +80,50 @@ def getSalariesAndPositions(filename):
 
     return salaries, positions, scores
 
+@cachedParse(1)
 def getFutureSalariesAndPositions(filename):
     with open(filename) as inputfile:
         results = list(csv.reader(inputfile))
     salaries = {}
     positions = {}
     for i in range(1,len(results) - 1):
-        line = results[i]
-        if line[1] == 'D':
-            name = line[8].lower()+'Defense'
-            salary = line[6]
-            position = "Def"
-        elif line[1] == 'K':
-            firstName = line[2]
-            lastName = line[3]
-            name = '%s %s' %(firstName,lastName)
-            salary = line[6]
-            position = 'PK'
-        else:
-            firstName = line[2]
-            lastName = line[3]
-            name = '%s %s' %(firstName,lastName)
-            if name == 'Odell Beckham Jr.':
-                name = 'Odell Beckham'
-            salary = line[6]
-            position = line[1]
+        name, salary, position, playerId, team = parseFutureLine(results[i])
 
         if not salary == '' and not position == '':
             salaries[name] = int(salary)
             positions[name] = position
 
     scores = {}
-    return salaries, positions, scores
\ No newline at end of file
+    return salaries, positions, scores
+
+@cachedParse(1)
+def getPlayerIdsAndTeams(filename):
+    """
+    Returns the ids (GID) and teams of the players of a past-week salary
+    file, keyed by the same names as getSalariesAndPositions.
+    """
+    with open(filename) as inputfile:
+        results = list(csv.reader(inputfile))
+    ids = {}
+    teams = {}
+    for i in range(1,len(results) - 1):
+        name, salary, position, score, playerId, team = parseLine(results[i])
+        ids[name] = playerId
+        teams[name] = team
+    return ids, teams
+
+@cachedParse(1)
+def getFuturePlayerIdsAndTeams(filename):
+    """
+    Returns the FanDuel ids and teams of the players of a FanDuel salary
+    file, keyed by the same names as getFutureSalariesAndPositions.
+    """
+    with open(filename) as inputfile:
+        results = list(csv.reader(inputfile))
+    ids = {}
+    teams = {}
+    for i in range(1,len(results) - 1):
+        name, salary, position, playerId, team = parseFutureLine(results[i])
+        ids[name] = playerId
+        teams[name] = team
+    return ids, teams
@@ -0,0 +1,69 @@
+import os
+import cPickle as pickle
+
+# whether parsed files are also cached on disk, next to the source file in
+# a .parsecache directory, so later runs skip parsing entirely
+useDiskCache = True
+
+# in-process memo: (parser name, absolute path) -> (file key, parsed result)
+memo = {}
+
+def fileKey(path):
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime)
+
+def cachedParse(version):
+    """
+    Decorator for a function that parses the file named by its only
+    argument. The parsed result is memoized in-process and pickled to disk,
+    keyed by the file's path, size and mtime, and by |version|, which must
+    be bumped whenever the parser's output changes.
+
+    Results are shared between calls and must not be modified by callers.
+    """
+    def decorator(parse):
+        def cached(filename):
+            path = os.path.abspath(filename)
+            key = (version,) + fileKey(path)
+            memoKey = (parse.__name__, path)
+            if memoKey in memo and memo[memoKey][0] == key:
+                return memo[memoKey][1]
+
+            cacheDir = os.path.join(os.path.dirname(path), '.parsecache')
+            cachePath = os.path.join(cacheDir, '%s.%s.pkl' % (os.path.basename(path), parse.__name__))
+            result = None
+            if useDiskCache and os.path.exists(cachePath):
+                try:
+                    with open(cachePath, 'rb') as cacheFile:
+                        storedKey, storedResult = pickle.load(cacheFile)
+                    if storedKey == key:
+                        result = storedResult
+                except Exception:
+                    # a truncated, stale or otherwise unreadable pickle can
+                    # raise almost anything; it is only a cache miss
+                    result = None
+
+            if result is None:
+                result = parse(filename)
+                if useDiskCache:
+                    writeCache(cacheDir, cachePath, (key, result))
+
+            memo[memoKey] = (key, result)
+            return result
+        cached.__name__ = parse.__name__
+        cached.__doc__ = parse.__doc__
+        return cached
+    return decorator
+
+def writeCache(cacheDir, cachePath, entry):
+    # written to a temporary file and renamed, so concurrent readers (e.g.
+    # backtest worker processes) never see a partial pickle
+    try:
+        if not os.path.isdir(cacheDir):
+            os.makedirs(cacheDir)
+        tmpPath = '%s.%d.tmp' % (cachePath, os.getpid())
+        with open(tmpPath, 'wb') as cacheFile:
+            pickle.dump(entry, cacheFile, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmpPath, cachePath)
+    except (IOError, OSError):
+        pass
@@ -9,52 +9,43 @@ def computeFutureProjection(assignment,projections):
     return projection
 
 
-def printProjectedResults(search,scores,week,projections,percentLineupsUsed):
-
-    def computeProjection(assignment):
-        projection = 0
-        for position in assignment:        
-            player = assignment[position][0]  
-            if player in projections:      
-                projection += projections[player]
-        return projection
-
-    def computeScore(assignment):
-        score = 0
-        for position in assignment:        
-            player = assignment[position][0]        
-            score += scores[player]
-        return score
-
-    computedScores = []
-    computedProjections = []
-    for assignment in search.allAssignments:
-        score = computeScore(assignment)
-        projection = computeProjection(assignment)
-        computedScores.append(score)
-        computedProjections.append(projection)
-
-    computedProjections = np.array(computedProjections)
+def computeLineupArrays(lineups,scores,projections):
+    """
+    Returns the (actual scores, projections) arrays of |lineups|, either a
+    LineupSet or a list of assignment dictionaries.
+    """
+    if hasattr(lineups, 'totals'):
+        return lineups.scoreTotals(scores), lineups.totals(lineups.playerVector(projections))
+    computedScores = np.array([sum(scores[assignment[position][0]] for position in assignment) \
+        for assignment in lineups], dtype=float)
+    computedProjections = np.array([computeFutureProjection(assignment,projections) \
+        for assignment in lineups], dtype=float)
+    return computedScores, computedProjections
+
+
+def printProjectedResults(search,scores,week,projections,percentLineupsUsed,winnerThreshold=111.21,selected=None):
+    """
+    Returns (number of winners, number of lineups submitted) for the top
+    |percentLineupsUsed| of the lineups of |search| by projection, or for
+    the lineup indices |selected| if given (e.g. from selectPortfolio).
+    """
+    computedScores, computedProjections = computeLineupArrays(search.allAssignments,scores,projections)
     s = len(computedProjections)
-    maxIndices = computedProjections.argsort()[-int(s*percentLineupsUsed):]
-
-    sumTop = 0
-    sumBottom = 0
-    for i in range(s):
-        if i in maxIndices:
-            sumTop += computedScores[i]
-        else:
-            sumBottom += computedScores[i]
-    # print sumBottom/(s-len(maxIndices)),sumTop/(len(maxIndices))
-
-
-    numWinners = 0
-    for i in maxIndices: 
-        if computedScores[i] >= 111.21:
-            numWinners += 1 
+    numTop = int(s*percentLineupsUsed)
+    if selected is not None:
+        topMask = np.zeros(s, dtype=bool)
+        topMask[np.asarray(selected, dtype=np.int64)] = True
+    # a fraction rounding down to no lineups keeps them all, as slicing [-0:] did
+    elif numTop == 0 or numTop >= s:
+        topMask = np.ones(s, dtype=bool)
+    else:
+        topMask = np.zeros(s, dtype=bool)
+        topMask[np.argpartition(computedProjections, s - numTop)[s - numTop:]] = True
+
+    numWinners = int(np.count_nonzero(computedScores[topMask] >= winnerThreshold))
     # print 'Week %s' % week
-    # print "The max score was %f" % max(computedScores)
-    # print "The min score was %f" % min(computedScores)
-    # print "The average score was %f" % np.average(computedScores)           
-    # print "The number of winners was %d out of %d" % (numWinners, len(maxIndices))
-    return numWinners, len(maxIndices)
\ No newline at end of file
+    # print "The max score was %f" % computedScores.max()
+    # print "The min score was %f" % computedScores.min()
+    # print "The average score was %f" % computedScores.mean()
+    # print "The number of winners was %d out of %d" % (numWinners, np.count_nonzero(topMask))
+    return numWinners, int(np.count_nonzero(topMask))
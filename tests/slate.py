@@ -0,0 +1,88 @@
+# Small synthetic slates for the tests, built the way createCSPWithVariables
+# builds a real week but without reading any files.
+# Usage:
+#   csp = syntheticCSP(seed=0)
+#   lineups = bruteForce(csp)   # every feasible lineup, best first
+
+import itertools
+import random
+from createCSP import CSP, addConstraints
+from PlayerTable import PlayerTable
+import numpy as np
+
+SLOTS = [("QB", "QB"), ("RB1", "RB"), ("RB2", "RB"), ("WR1", "WR"), ("WR2", "WR"), \
+    ("WR3", "WR"), ("TE", "TE"), ("K", "PK"), ("D", "Def")]
+
+SIZES = {"QB": 3, "RB": 4, "WR": 5, "TE": 2, "PK": 2, "Def": 2}
+
+def syntheticCSP(seed = 0, sizes = SIZES, salaryCap = 60000, salaryFloor = None, \
+        projectionShift = 0.0, constrained = True):
+    """
+    Returns a CSP over the nine FanDuel slots with |sizes| random players per
+    position, salaries in multiples of 100 and projections drawn from |seed|.
+    |projectionShift| is added to every projection (use a negative shift
+    for slates whose lineups all project at or below 0). Unless
+    |constrained| is False, addConstraints adds the symmetry groups and the
+    salary constraint.
+    """
+    rng = random.Random(seed)
+    names, positions, salaries, projections = [], [], [], []
+    for position in ["QB", "RB", "WR", "TE", "PK", "Def"]:
+        for i in range(sizes[position]):
+            names.append('%s %d' % (position, i))
+            positions.append(position)
+            salaries.append(100 * rng.randint(35, 85))
+            projections.append(round(rng.uniform(2, 25), 1) + projectionShift)
+    n = len(names)
+    table = PlayerTable(names, ['id%d' % i for i in range(n)], positions, ['T%d' % (i % 4) for i in range(n)], \
+        salaries, projections, [rng.uniform(0, 2) for _ in range(n)], \
+        [p + 5 for p in projections], [p - 5 for p in projections])
+
+    csp = CSP()
+    csp.playerTable = table
+    for var, position in SLOTS:
+        rows = [row for row in range(n) if positions[row] == position]
+        csp.add_variable(var, [table.tuples[row] for row in rows])
+        csp.domainIndices[var] = np.array(rows, dtype=np.int64)
+    if constrained:
+        addConstraints(csp, salaryCap, salaryFloor)
+    return csp
+
+def feasible(csp, assignment):
+    """
+    Returns whether a complete |assignment| satisfies every factor and
+    linear constraint of |csp|.
+    """
+    for var in csp.variables:
+        val = assignment[var]
+        if csp.unaryFactors[var] and csp.unaryFactors[var][val] == 0:
+            return False
+        for var2, factor in csp.binaryFactors[var].iteritems():
+            if factor[val][assignment[var2]] == 0:
+                return False
+    for constraint in csp.linearConstraints:
+        total = sum(assignment[var][constraint.attribute] for var in constraint.variables)
+        if constraint.lower is not None and total < constraint.lower:
+            return False
+        if constraint.upper is not None and total > constraint.upper:
+            return False
+    return True
+
+def bruteForce(csp):
+    """
+    Returns every feasible lineup of |csp| as (projection, assignment)
+    pairs, highest projection first.
+    """
+    lineups = []
+    for values in itertools.product(*[csp.values[var] for var in csp.variables]):
+        assignment = dict(zip(csp.variables, values))
+        if feasible(csp, assignment):
+            lineups.append((sum(val[2] for val in values), assignment))
+    lineups.sort(key=lambda pair: -pair[0])
+    return lineups
+
+def roster(assignment):
+    """
+    Returns the order-independent set of players of a lineup.
+    """
+    return frozenset(val[0] for val in assignment.values())
@@ -0,0 +1,41 @@
+import unittest
+import numpy as np
+from AliasSampler import AliasTable, RandomBuffer
+
+class AliasTableTest(unittest.TestCase):
+
+    def assertDistribution(self, indices, weights):
+        expected = np.asarray(weights, dtype=float) / sum(weights)
+        counts = np.bincount(indices, minlength=len(weights))
+        observed = counts / float(len(indices))
+        # 5 standard deviations of a binomial frequency
+        tolerance = 5 * np.sqrt(expected * (1 - expected) / len(indices)) + 1e-12
+        self.assertTrue((np.abs(observed - expected) <= tolerance).all(), (observed, expected))
+
+    def test_draw_many_matches_weights(self):
+        np.random.seed(0)
+        weights = [5, 0, 1, 3.5, 0.5, 10]
+        table = AliasTable(weights)
+        indices = table.drawMany(np.random.random_sample(200000))
+        self.assertDistribution(indices, weights)
+        self.assertEqual((indices == 1).sum(), 0)
+
+    def test_scalar_draws_match_weights(self):
+        np.random.seed(1)
+        weights = [1, 2, 3, 4]
+        table = AliasTable(weights)
+        buffer = RandomBuffer(size=1000)
+        self.assertDistribution(np.array([table.draw(buffer.next()) for _ in range(50000)]), weights)
+
+    def test_zero_weights_are_uniform(self):
+        np.random.seed(2)
+        table = AliasTable([0, 0, 0])
+        self.assertDistribution(table.drawMany(np.random.random_sample(30000)), [1, 1, 1])
+
+    def test_scalar_and_vector_draws_agree(self):
+        table = AliasTable([0.2, 7, 1, 0, 3])
+        u = np.random.RandomState(3).random_sample(1000)
+        self.assertEqual([table.draw(x) for x in u.tolist()], table.drawMany(u).tolist())
+
+if __name__ == '__main__':
+    unittest.main()
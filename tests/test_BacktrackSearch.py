@@ -0,0 +1,418 @@
+import itertools
+import os
+import random
+import tempfile
+import time
+import unittest
+import numpy as np
+from AliasSampler import RandomBuffer
+from BacktrackSearch import BacktrackingSearch
+from SearchStats import SearchStats
+from tests.slate import SIZES, syntheticCSP, bruteForce, feasible, roster
+
+class TopKTest(unittest.TestCase):
+
+    def test_matches_brute_force_order(self):
+        csp = syntheticCSP(0)
+        expected = [projection for projection, assignment in bruteForce(csp)[:25]]
+        search = BacktrackingSearch()
+        search.solveTopK(csp, 25)
+        lineups = list(search.allAssignments)
+        projections = [sum(val[2] for val in lineup.values()) for lineup in lineups]
+        self.assertEqual(len(lineups), 25)
+        for projection, best in zip(projections, expected):
+            self.assertAlmostEqual(projection, best)
+        self.assertEqual(len(set(roster(lineup) for lineup in lineups)), 25)
+        for lineup in lineups:
+            self.assertTrue(feasible(csp, lineup))
+
+    def test_salary_floor(self):
+        csp = syntheticCSP(0, salaryFloor=58500)
+        expected = bruteForce(csp)
+        search = BacktrackingSearch()
+        search.solveTopK(csp, 1000)
+        self.assertEqual(len(search.allAssignments), len(expected))
+        for lineup, (projection, assignment) in zip(search.allAssignments, expected):
+            self.assertTrue(feasible(csp, lineup))
+            self.assertAlmostEqual(sum(val[2] for val in lineup.values()), projection)
+
+    def test_fewer_lineups_than_requested(self):
+        csp = syntheticCSP(3, sizes={"QB": 1, "RB": 2, "WR": 3, "TE": 1, "PK": 1, "Def": 2})
+        expected = len(bruteForce(csp))
+        self.assertTrue(0 < expected < 10)
+        search = BacktrackingSearch()
+        search.solveTopK(csp, 10)
+        self.assertEqual(len(search.allAssignments), expected)
+
+class SolveTest(unittest.TestCase):
+
+    def test_lineups_respect_salary_bounds(self):
+        csp = syntheticCSP(2, salaryFloor=58500)
+        expected = set(roster(assignment) for projection, assignment in bruteForce(csp))
+        for ep_greedy, comparisonIndex in [(1.0, 3), (.5, 2), (0.0, 1), (-1, 3)]:
+            np.random.seed(2)
+            random.seed(2)
+            search = BacktrackingSearch()
+            search.solve(csp, 40, ep_greedy, comparisonIndex)
+            self.assertTrue(len(search.allAssignments) > 0)
+            for lineup in search.allAssignments:
+                self.assertTrue(roster(lineup) in expected)
+
+    def test_requires_salary_cap(self):
+        csp = syntheticCSP(0, constrained=False)
+        self.assertRaises(Exception, BacktrackingSearch().solve, csp, 10, 1.0, 3)
+        self.assertRaises(Exception, BacktrackingSearch().solveTopK, csp, 10)
+
+class SymmetryTest(unittest.TestCase):
+
+    def assertCanonical(self, csp, lineup):
+        for group, rank in zip(csp.symmetryGroups, csp.symmetryRanks):
+            ranks = [rank[lineup[var]] for var in group]
+            self.assertEqual(ranks, sorted(set(ranks)))
+
+    def test_exhaustive_search_reaches_each_roster_once(self):
+        csp = syntheticCSP(0, salaryFloor=50000)
+        expected = set(roster(assignment) for projection, assignment in bruteForce(csp))
+        for options in [{}, {'ac3': True, 'mcv': True}, {'varOrder': 'domwdeg'}, \
+                {'varOrder': 'domwdeg', 'ac3': True}, {'varOrder': 'salary'}]:
+            np.random.seed(0)
+            random.seed(0)
+            stats = SearchStats()
+            search = BacktrackingSearch()
+            search.solve(csp, 10**6, 1.0, 2, stats=stats, **options)
+            lineups = list(search.allAssignments)
+            self.assertEqual(set(roster(lineup) for lineup in lineups), expected)
+            self.assertEqual(len(lineups), len(expected))
+            # permutations of a group are never completed, let alone expanded
+            self.assertEqual(stats.cuts['duplicate'], 0)
+            for lineup in lineups:
+                self.assertCanonical(csp, lineup)
+
+    def test_samplers_keep_groups_in_order(self):
+        csp = syntheticCSP(1, salaryFloor=50000)
+        for ep_greedy, comparisonIndex in [(0.0, 1), (-1, 3), (.5, 2)]:
+            np.random.seed(1)
+            random.seed(1)
+            search = BacktrackingSearch()
+            search.solve(csp, 50, ep_greedy, comparisonIndex)
+            self.assertTrue(0 < len(search.allAssignments) <= 50)
+            for lineup in search.allAssignments:
+                self.assertTrue(feasible(csp, lineup))
+                self.assertCanonical(csp, lineup)
+
+    def test_rank_window(self):
+        csp = syntheticCSP(0)
+        search = BacktrackingSearch()
+        search.csp = csp
+        search.prepare_groups()
+        values = sorted(csp.values['WR1'], key=lambda val: csp.symmetryRanks[1][val])
+        n = len(values)
+        self.assertEqual(search.rank_window({}, 'WR1'), (0, n - 3))
+        self.assertEqual(search.rank_window({}, 'WR3'), (2, n - 1))
+        self.assertEqual(search.rank_window({'WR3': values[3]}, 'WR2'), (1, 2))
+        self.assertEqual(search.rank_window({'WR1': values[0], 'WR3': values[4]}, 'WR2'), (1, 3))
+
+class VariableOrderTest(unittest.TestCase):
+
+    def test_domwdeg_weighs_wipeouts(self):
+        csp = syntheticCSP(0, salaryFloor=50000)
+        # pairs of slots whose players must fit a joint budget, so that
+        # assigning one can wipe the other's domain out
+        csp.add_binary_factor('QB', 'TE', lambda x, y: x[1] + y[1] <= 12000)
+        csp.add_binary_factor('K', 'D', lambda x, y: x[1] + y[1] <= 12000)
+        expected = set(roster(assignment) for projection, assignment in bruteForce(csp))
+        for options in [{}, {'ac3': True}]:
+            stats = SearchStats()
+            search = BacktrackingSearch()
+            search.solve(csp, 10**6, 1.0, 2, varOrder='domwdeg', stats=stats, **options)
+            self.assertEqual(set(roster(lineup) for lineup in search.allAssignments), expected)
+            self.assertEqual(len(search.allAssignments), len(expected))
+            # every inconsistent branch was a wipeout that weighed a factor up
+            self.assertTrue(stats.cuts['inconsistent'] > 0)
+            self.assertEqual(sum(search.factorWeight.values()) - len(search.factorWeight), \
+                2 * stats.cuts['inconsistent'])
+
+class ArcConsistencyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.csp = syntheticCSP(0)
+        self.search = BacktrackingSearch()
+        self.search.csp = self.csp
+        self.search.ac3 = True
+        self.search.varOrder = 'mcv'
+        self.search.propagate = True
+        self.search.prepare_search()
+        self.search.assignment = {}
+
+    def snapshot(self):
+        return dict((var, alive.copy()) for var, alive in self.search.alive.iteritems()), \
+            dict(self.search.domainSize)
+
+    def assertDomains(self, snapshot):
+        alive, domainSize = snapshot
+        for var in self.csp.variables:
+            self.assertTrue((self.search.alive[var] == alive[var]).all())
+        self.assertEqual(self.search.domainSize, domainSize)
+
+    def assign(self, var, val):
+        mark = len(self.search.trail)
+        self.search.assignment[var] = val
+        row = self.search.table.rowOf[val]
+        self.assertTrue(self.search.arc_consistency_check(self.search.assignment, var, row))
+        return mark
+
+    def test_trail_undoes_removals_in_order(self):
+        rank = self.csp.symmetryRanks[1]
+        values = sorted(self.csp.values['WR1'], key=lambda val: rank[val])
+        start = self.snapshot()
+        mark1 = self.assign('WR1', values[1])
+        # WR2 and WR3 must rank after WR1, and WR2 before some WR3
+        ranks2 = sorted(rank[self.csp.values['WR2'][i]] for i in np.flatnonzero(self.search.alive['WR2']))
+        ranks3 = sorted(rank[self.csp.values['WR3'][i]] for i in np.flatnonzero(self.search.alive['WR3']))
+        self.assertEqual(ranks2, range(2, len(values) - 1))
+        self.assertEqual(ranks3, range(3, len(values)))
+        middle = self.snapshot()
+        mark2 = self.assign('WR3', values[3])
+        self.assertEqual(self.search.domainSize['WR2'], 1)
+        self.search.restore_domains(mark2)
+        self.assertDomains(middle)
+        self.search.restore_domains(mark1)
+        self.assertDomains(start)
+        self.assertEqual(self.search.trail, [])
+
+    def test_wipeout_is_reported(self):
+        rank = self.csp.symmetryRanks[1]
+        values = sorted(self.csp.values['WR1'], key=lambda val: rank[val])
+        start = self.snapshot()
+        self.assign('WR1', values[1])
+        self.search.assignment['WR3'] = values[2]
+        weights = dict(self.search.factorWeight)
+        # WR2 has no rank left between WR1 and WR3
+        self.assertFalse(self.search.arc_consistency_check(self.search.assignment, 'WR3', \
+            self.search.table.rowOf[values[2]]))
+        self.search.restore_domains(0)
+        self.assertDomains(start)
+        # dom/wdeg: the factor that wiped WR2 out weighs more, in both directions
+        for pair, weight in weights.iteritems():
+            bump = 1 if pair in [('WR3', 'WR2'), ('WR2', 'WR3')] else 0
+            self.assertEqual(self.search.factorWeight[pair], weight + bump)
+
+class SampleRowsTest(unittest.TestCase):
+
+    def test_slot_weights_are_never_negative(self):
+        # a shift of -12 makes some projections negative, -30 all of them
+        for projectionShift in [-12.0, -30.0]:
+            csp = syntheticCSP(0, projectionShift=projectionShift)
+            search = BacktrackingSearch()
+            search.csp = csp
+            search.propagate = False
+            search.prepare_search()
+            projections = search.table.projections
+            self.assertTrue((projections < 0).any())
+            for var in csp.variables:
+                weights = search.slotWeights(var, 2)
+                self.assertTrue((weights >= 0).all())
+                self.assertTrue(weights.sum() > 0)
+                positive = projections[csp.domainIndices[var]] > 0
+                if var not in search.groupOf and positive.any():
+                    # only the players with a positive projection are drawn
+                    self.assertTrue((weights[~positive] == 0).all())
+
+    def test_rejection_keeps_the_distribution(self):
+        np.random.seed(4)
+        sizes = dict(SIZES)
+        sizes['QB'] = 8
+        # Under this cap only the 4 cheapest QBs fit, so the salary bounds
+        # reject about half of the draws, and the exclusion some more.
+        csp = syntheticCSP(0, sizes=sizes, salaryCap=50000)
+        search = BacktrackingSearch()
+        search.csp = csp
+        search.propagate = False
+        search.prepare_search()
+        search.assignment = {}
+        search.randoms = RandomBuffer()
+        excluded = [int(search.candidateRows('QB', ())[-1])]
+        rows = search.candidateRows('QB', excluded)
+        self.assertTrue(0 < len(rows) < len(csp.values['QB']) - 1)
+        weights = search.table.column(1)[rows].astype(float)
+        expected = dict(zip(rows.tolist(), (weights / weights.sum()).tolist()))
+        for n in [1, 20000]:
+            counts = {}
+            for draw in range(20000 // n):
+                for row, count in search.sampleRows('QB', 1, n, excluded).iteritems():
+                    counts[row] = counts.get(row, 0) + count
+            self.assertTrue(set(counts) <= set(expected))
+            for row, p in expected.iteritems():
+                self.assertTrue(abs(counts.get(row, 0) / 20000.0 - p) < 5 * np.sqrt(p * (1 - p) / 20000) + 1e-9)
+
+class StreamingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.csp = syntheticCSP(0, salaryFloor=50000)
+
+    def test_depth_first_search_streams_in_constant_memory(self):
+        expected = set(roster(assignment) for projection, assignment in bruteForce(self.csp))
+        for ep_greedy, comparisonIndex, numLineups in [(1.0, 2, 10**6), (.5, 3, 300)]:
+            np.random.seed(0)
+            random.seed(0)
+            search = BacktrackingSearch()
+            streamed = []
+            for lineup in search.iter_lineups(self.csp, numLineups, ep_greedy, comparisonIndex):
+                streamed.append(roster(lineup))
+                self.assertEqual(len(search.allAssignments.indices()), 0)
+                self.assertTrue(search.allAssignments.fingerprints is None)
+            self.assertEqual(len(streamed), len(set(streamed)))
+            self.assertEqual(len(search.allAssignments), len(streamed))
+            self.assertTrue(set(streamed) <= expected)
+            if ep_greedy == 1.0:
+                self.assertEqual(set(streamed), expected)
+
+    def test_restarts_keep_fingerprints(self):
+        np.random.seed(0)
+        random.seed(0)
+        search = BacktrackingSearch()
+        streamed = [roster(lineup) for lineup in search.iter_lineups(self.csp, 100, -1, 3)]
+        self.assertEqual(len(streamed), len(set(streamed)))
+        self.assertEqual(len(search.allAssignments.fingerprints), len(streamed))
+
+def pausedSearch(csp, numLineups, numBefore, ep_greedy, comparisonIndex, **options):
+    """
+    Returns the lineups of a search stopped after |numBefore| of them, and
+    the file its state was saved to.
+    """
+    np.random.seed(4)
+    random.seed(4)
+    search = BacktrackingSearch()
+    lineups = search.iter_lineups(csp, numLineups, ep_greedy, comparisonIndex, keepLineups=True, **options)
+    before = [roster(lineup) for lineup in itertools.islice(lineups, numBefore)]
+    handle, filename = tempfile.mkstemp()
+    os.close(handle)
+    search.save_state(filename)
+    return before, filename
+
+class PauseResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.csp = syntheticCSP(0, salaryFloor=50000)
+        self.filenames = []
+
+    def tearDown(self):
+        for filename in self.filenames:
+            os.remove(filename)
+
+    def test_resume_continues_exactly(self):
+        for ep_greedy, comparisonIndex, options in [(.5, 2, {}), (1.0, 3, {'ac3': True, 'mcv': True}), \
+                (-1, 3, {})]:
+            np.random.seed(4)
+            random.seed(4)
+            search = BacktrackingSearch()
+            search.solve(self.csp, 80, ep_greedy, comparisonIndex, **options)
+            expected = [roster(lineup) for lineup in search.allAssignments]
+
+            before, filename = pausedSearch(self.csp, 80, 30, ep_greedy, comparisonIndex, **options)
+            self.filenames.append(filename)
+            resumed = BacktrackingSearch()
+            resumed.load_state(self.csp, filename)
+            after = [roster(lineup) for lineup in resumed.resume()]
+            self.assertEqual(before + after, expected)
+
+    def test_split_frontier_covers_the_rest_once(self):
+        expected = set(roster(assignment) for projection, assignment in bruteForce(self.csp))
+        before, filename = pausedSearch(self.csp, 10**6, 20, 1.0, 2)
+        self.filenames.append(filename)
+        search = BacktrackingSearch()
+        search.load_state(self.csp, filename)
+        for numParts in [2, 4, 8]:
+            states = search.split_frontier(numParts)
+            self.assertTrue(1 < len(states) <= numParts)
+            found = []
+            for state in states:
+                part = BacktrackingSearch()
+                part.set_state(self.csp, state)
+                found.extend(roster(lineup) for lineup in part.resume())
+            self.assertEqual(len(found), len(set(found)))
+            self.assertEqual(set(before) | set(found), expected)
+            self.assertEqual(len(before) + len(found), len(expected))
+        # the split search itself still continues where it stopped
+        self.assertEqual(set(before) | set(roster(lineup) for lineup in search.resume()), expected)
+
+class AnytimeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.csp = syntheticCSP(0, salaryFloor=50000)
+        self.expected = set(roster(assignment) for projection, assignment in bruteForce(self.csp))
+
+    def assertMonotonic(self, curve):
+        self.assertTrue(len(curve) > 1)
+        for (seconds, found, best), (nextSeconds, nextFound, nextBest) in zip(curve, curve[1:]):
+            self.assertTrue(seconds <= nextSeconds)
+            self.assertTrue(found <= nextFound)
+            # None (no lineup yet) sorts before any projection
+            self.assertTrue(best <= nextBest)
+
+    def test_tiny_limits_time_out(self):
+        for timeLimit, deadline in [(0.0, None), (None, time.time() - 1), (1000.0, time.time() - 1)]:
+            for ep_greedy, comparisonIndex in [(1.0, 2), (-1, 3)]:
+                np.random.seed(0)
+                random.seed(0)
+                search = BacktrackingSearch()
+                search.solve(self.csp, 10**6, ep_greedy, comparisonIndex, timeLimit=timeLimit, \
+                    deadline=deadline, checkInterval=4)
+                self.assertTrue(search.timedOut)
+                # stopped at the first check
+                self.assertTrue(search.numOperations <= 4)
+                self.assertTrue(len(search.allAssignments) < len(self.expected))
+
+    def test_no_time_out_without_limits(self):
+        search = BacktrackingSearch()
+        search.solve(self.csp, 10**6, 1.0, 2, timeLimit=1000.0)
+        self.assertFalse(search.timedOut)
+        self.assertEqual(len(search.allAssignments), len(self.expected))
+
+    def test_quality_curve_is_monotonic(self):
+        search = BacktrackingSearch()
+        search.solve(self.csp, 10**6, 1.0, 2, timeLimit=1000.0, checkInterval=1)
+        curve = search.qualityCurve
+        self.assertMonotonic(curve)
+        self.assertEqual(curve[0][1:], (0, None))
+        best = max(sum(val[2] for val in lineup.values()) for lineup in search.allAssignments)
+        self.assertEqual(curve[-1][1], len(self.expected))
+        self.assertAlmostEqual(curve[-1][2], best)
+
+    def test_resume_after_time_out(self):
+        for ep_greedy, comparisonIndex, numLineups in [(1.0, 2, 10**6), (.5, 3, 300), (-1, 3, 150)]:
+            np.random.seed(0)
+            random.seed(0)
+            search = BacktrackingSearch()
+            lineups = search.iter_lineups(self.csp, numLineups, ep_greedy, comparisonIndex, timeLimit=1000.0, \
+                checkInterval=1, keepLineups=True)
+            before = []
+            for lineup in lineups:
+                before.append(roster(lineup))
+                if len(before) == 30:
+                    # the deadline passes; the search stops after the next
+                    # node, which may still complete a lineup
+                    search.deadline = time.time()
+            self.assertTrue(search.timedOut)
+            self.assertTrue(30 <= len(before) <= 31)
+            after = [roster(lineup) for lineup in search.resume(timeLimit=1000.0)]
+            self.assertFalse(search.timedOut)
+            found = before + after
+            self.assertEqual(len(found), len(set(found)))
+            self.assertTrue(set(found) <= self.expected)
+            self.assertEqual(len(search.allAssignments), len(found))
+            # all of them when exhaustive, with no repeats
+            self.assertEqual(len(found), min(numLineups, len(self.expected)))
+            # the curve goes on across the resume
+            self.assertMonotonic(search.qualityCurve)
+
+    def test_resume_past_the_deadline_times_out_again(self):
+        search = BacktrackingSearch()
+        self.assertEqual(list(search.iter_lineups(self.csp, 10**6, 1.0, 2, timeLimit=0.0)), [])
+        numOperations = search.numOperations
+        self.assertEqual(list(search.resume()), [])
+        self.assertTrue(search.timedOut)
+        self.assertEqual(search.numOperations, numOperations)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from BranchAndBoundSearch import BranchAndBoundSearch
+from tests.slate import syntheticCSP, bruteForce, feasible
+
+class BranchAndBoundSearchTest(unittest.TestCase):
+
+    def assertOptimal(self, csp):
+        best = bruteForce(csp)[0][0]
+        search = BranchAndBoundSearch()
+        search.solve(csp)
+        self.assertTrue(search.optimalAssignment)
+        self.assertTrue(feasible(csp, search.optimalAssignment))
+        self.assertAlmostEqual(search.optimalProjection, best)
+        self.assertAlmostEqual(search.gap, 0.0)
+
+    def test_matches_brute_force(self):
+        for seed in range(3):
+            self.assertOptimal(syntheticCSP(seed))
+
+    def test_non_positive_projections(self):
+        # Every lineup projects below 0; the incumbent must not start at 0.
+        self.assertOptimal(syntheticCSP(1, projectionShift=-30.0))
+
+    def test_salary_floor(self):
+        # The unconstrained optimum costs 57900.
+        self.assertOptimal(syntheticCSP(0, salaryFloor=59500))
+
+    def test_requires_salary_cap(self):
+        search = BranchAndBoundSearch()
+        self.assertRaises(Exception, search.solve, syntheticCSP(0, constrained=False))
+
+    def test_node_limit_keeps_valid_bound(self):
+        csp = syntheticCSP(2)
+        best = bruteForce(csp)[0][0]
+        search = BranchAndBoundSearch()
+        search.solve(csp, maxNodes=20)
+        self.assertTrue(search.aborted)
+        self.assertTrue(search.upperBound >= best - 1e-9)
+
+    def test_gap_when_aborted(self):
+        csp = syntheticCSP(2)
+        search = BranchAndBoundSearch()
+        search.solve(csp, maxNodes=1)
+        self.assertTrue(search.aborted)
+        self.assertFalse(search.optimalAssignment)
+        self.assertEqual(search.gap, float('inf'))
+        self.assertEqual(search.absoluteGap, float('inf'))
+
+        # aborted with an incumbent, on a slate of negative projections
+        csp = syntheticCSP(1, projectionShift=-30.0)
+        search.solve(csp, maxNodes=20)
+        self.assertTrue(search.aborted)
+        self.assertTrue(search.optimalAssignment)
+        self.assertAlmostEqual(search.absoluteGap, search.upperBound - search.optimalProjection)
+        self.assertTrue(search.absoluteGap > 0)
+        self.assertAlmostEqual(search.gap, search.absoluteGap / abs(search.upperBound))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import csv
+import unittest
+from StringIO import StringIO
+from FanDuelExport import FanDuelWriter
+from LineupSet import LineupSet
+from tests.slate import syntheticCSP, bruteForce
+
+class FanDuelWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.csp = syntheticCSP(0)
+        self.assignments = [assignment for projection, assignment in bruteForce(self.csp)[:3]]
+        self.table = self.csp.playerTable
+
+    def test_writes_header_and_ids(self):
+        outputfile = StringIO()
+        writer = FanDuelWriter(outputfile, self.csp)
+        lineups = LineupSet(self.csp)
+        for assignment in self.assignments:
+            lineups.append(assignment)
+        for indices in lineups.indices():
+            writer.writeIndices(indices)
+        writer.write(self.assignments[0])
+        rows = list(csv.reader(StringIO(outputfile.getvalue())))
+        self.assertEqual(rows[0], ['QB', 'RB', 'RB', 'WR', 'WR', 'WR', 'TE', 'K', 'D'])
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(writer.numRows, 4)
+        for row, assignment in zip(rows[1:], self.assignments + self.assignments[:1]):
+            self.assertEqual(row, [self.table.ids[self.table.rowOf[assignment[var]]] \
+                for var in self.csp.variables])
+
+    def test_without_header(self):
+        outputfile = StringIO()
+        writer = FanDuelWriter(outputfile, self.csp, writeHeader=False)
+        writer.write(self.assignments[0])
+        self.assertEqual(len(list(csv.reader(StringIO(outputfile.getvalue())))), 1)
+
+    def test_missing_id(self):
+        row = self.table.rowOf[self.assignments[0]['TE']]
+        self.table.ids[row] = ''
+        outputfile = StringIO()
+        writer = FanDuelWriter(outputfile, self.csp)
+        indices = [self.table.rowOf[self.assignments[0][var]] for var in self.csp.variables]
+        self.assertRaises(Exception, writer.writeIndices, indices)
+        self.assertEqual(writer.numRows, 0)
+        # nothing but the header was written
+        self.assertEqual(len(list(csv.reader(StringIO(outputfile.getvalue())))), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import numpy as np
+import GeneticSearch
+from GeneticSearch import GeneticSearch as Search, boundedDraw
+from LineupFilter import LineupFilter
+from PlayerTable import ensurePlayerTable
+from tests.slate import syntheticCSP, bruteForce, roster
+
+class GeneticSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.csp = syntheticCSP(3, salaryFloor=55000)
+        self.lineups = bruteForce(self.csp)
+        self.feasible = set(roster(assignment) for p, assignment in self.lineups)
+
+    def test_lineups_are_feasible_and_distinct(self):
+        numLineups = min(200, len(self.lineups))
+        search = Search(numIslands=2, populationSize=100, numEpochs=2, generationsPerEpoch=5)
+        search.solve(self.csp, numLineups, 2, seed=[0])
+        lineups = list(search.allAssignments)
+        self.assertEqual(len(lineups), numLineups)
+        rosters = [roster(lineup) for lineup in lineups]
+        self.assertEqual(len(set(rosters)), len(rosters))
+        for lineup in rosters:
+            self.assertTrue(lineup in self.feasible)
+        projections = [sum(val[2] for val in lineup.values()) for lineup in lineups]
+        for better, worse in zip(projections, projections[1:]):
+            self.assertTrue(better >= worse - 1e-6)
+
+    def test_reseeds_until_enough_lineups(self):
+        # one small island converges long before it sees enough lineups
+        numLineups = min(300, len(self.lineups))
+        search = Search(numIslands=1, populationSize=30, numEpochs=1, generationsPerEpoch=2, \
+            maxReseeds=50)
+        search.solve(self.csp, numLineups, 2, seed=[0])
+        self.assertTrue(search.numReseeds > 0)
+        self.assertEqual(len(search.allAssignments), numLineups)
+
+    def test_mutation_keeps_salary_bounds(self):
+        ensurePlayerTable(self.csp)
+        lineupFilter = LineupFilter(self.csp)
+        self.addCleanup(setattr, GeneticSearch, 'islandFilter', GeneticSearch.islandFilter)
+        GeneticSearch.islandFilter = lineupFilter
+        np.random.seed(0)
+        # feasible lineups as table rows, from the brute-force rosters
+        table = lineupFilter.table
+        rowOf = {}
+        for j, domain in enumerate(lineupFilter.domains):
+            for row in domain.tolist():
+                rowOf[j, table.names[row]] = row
+        lineups = np.array([[rowOf[j, assignment[var][0]] for j, var in enumerate(lineupFilter.variables)] \
+            for p, assignment in self.lineups[:100]], dtype=np.int64)
+        for j, domain in enumerate(lineupFilter.domains):
+            weights = np.ones(len(domain))
+            draw = lambda j, n: lineupFilter.domains[j][np.random.randint(len(lineupFilter.domains[j]), size=n)]
+            mutated = lineups.copy()
+            mutated[:, j] = boundedDraw(lineupFilter, lineups, j, draw, weights)
+            for (columns, values, lower, upper), totals in zip(lineupFilter.linear, lineupFilter.linearTotals(mutated)):
+                if lower is not None:
+                    self.assertTrue((totals >= lower).all())
+                if upper is not None:
+                    self.assertTrue((totals <= upper).all())
+
+    def test_pool_is_terminated_when_an_island_raises(self):
+        calls = []
+        class FailingPool():
+            def __init__(self, numWorkers, initializer, initargs):
+                calls.append('start')
+            def map(self, function, jobs):
+                raise ValueError('island failed')
+            def terminate(self):
+                calls.append('terminate')
+            def close(self):
+                calls.append('close')
+            def join(self):
+                calls.append('join')
+        self.addCleanup(setattr, GeneticSearch.multiprocessing, 'Pool', GeneticSearch.multiprocessing.Pool)
+        GeneticSearch.multiprocessing.Pool = FailingPool
+        search = Search(numWorkers=2, numIslands=2, populationSize=20)
+        self.assertRaises(ValueError, search.solve, self.csp, 10, 2)
+        self.assertEqual(calls, ['start', 'terminate', 'join'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import numpy as np
+from LineupSet import LineupSet
+from tests.slate import syntheticCSP, bruteForce
+
+class LineupSetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.csp = syntheticCSP(0)
+        self.assignments = [assignment for projection, assignment in bruteForce(self.csp)[:10]]
+
+    def test_round_trip_and_growth(self):
+        lineups = LineupSet(self.csp, capacity=4)
+        for assignment in self.assignments:
+            lineups.append(assignment)
+        self.assertEqual(len(lineups), 10)
+        self.assertEqual(list(lineups), self.assignments)
+        self.assertEqual(lineups[-1], self.assignments[-1])
+        self.assertRaises(IndexError, lambda: lineups[10])
+        projections = [sum(val[2] for val in assignment.values()) for assignment in self.assignments]
+        self.assertTrue(np.allclose(lineups.projectionTotals(), projections))
+
+    def test_dedup_ignores_slot_order(self):
+        lineups = LineupSet(self.csp)
+        first = self.assignments[0]
+        self.assertTrue(lineups.appendUnique(first))
+        swapped = dict(first)
+        swapped['WR1'], swapped['WR3'] = first['WR3'], first['WR1']
+        swapped['RB1'], swapped['RB2'] = first['RB2'], first['RB1']
+        self.assertFalse(lineups.appendUnique(swapped))
+        self.assertTrue(lineups.appendUnique(self.assignments[1]))
+        self.assertEqual(len(lineups), 2)
+        self.assertEqual((lineups.dedupHits, lineups.dedupMisses), (1, 2))
+
+    def test_streaming_only_counts(self):
+        lineups = LineupSet(self.csp, keepLineups=False)
+        for assignment in self.assignments + self.assignments:
+            lineups.appendUnique(assignment)
+        self.assertEqual(len(lineups), 10)
+        self.assertEqual(len(lineups.indices()), 0)
+
+    def test_without_duplicate_checks(self):
+        lineups = LineupSet(self.csp, keepLineups=False, checkDuplicates=False)
+        for assignment in self.assignments + self.assignments:
+            self.assertTrue(lineups.appendUnique(assignment))
+        self.assertEqual(len(lineups), 20)
+        self.assertTrue(lineups.fingerprints is None)
+
+if __name__ == '__main__':
+    unittest.main()
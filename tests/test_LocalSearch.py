@@ -0,0 +1,51 @@
+import random
+import unittest
+import numpy as np
+from LocalSearch import LocalSearch
+from tests.slate import syntheticCSP, bruteForce, roster
+
+def projection(assignment):
+    return sum(val[2] for val in assignment.values())
+
+class LocalSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.csp = syntheticCSP(2, salaryFloor=55000)
+        self.lineups = bruteForce(self.csp)
+        self.feasible = set(roster(assignment) for p, assignment in self.lineups)
+        # the worst lineups of the slate
+        self.seeds = [assignment for p, assignment in self.lineups[-10:]]
+
+    def assertImproves(self, search):
+        improved = list(search.allAssignments)
+        self.assertTrue(0 < len(improved) <= len(self.seeds))
+        for lineup in improved:
+            self.assertTrue(roster(lineup) in self.feasible)
+            self.assertEqual(lineup, self.csp.canonical_assignment(lineup))
+        self.assertTrue(min(projection(lineup) for lineup in improved) >= \
+            min(projection(seed) for seed in self.seeds))
+        self.assertTrue(max(projection(lineup) for lineup in improved) > \
+            max(projection(seed) for seed in self.seeds))
+
+    def test_anneal(self):
+        np.random.seed(0)
+        random.seed(0)
+        search = LocalSearch('anneal', maxIterations=500)
+        search.solve(self.csp, self.seeds)
+        self.assertImproves(search)
+
+    def test_tabu(self):
+        np.random.seed(0)
+        random.seed(0)
+        search = LocalSearch('tabu', maxIterations=50)
+        search.solve(self.csp, self.seeds)
+        self.assertImproves(search)
+
+    def test_optimum_is_kept(self):
+        best, optimum = self.lineups[0]
+        search = LocalSearch('tabu', maxIterations=50)
+        search.solve(self.csp, [optimum])
+        self.assertAlmostEqual(projection(search.allAssignments[0]), best)
+
+if __name__ == '__main__':
+    unittest.main()
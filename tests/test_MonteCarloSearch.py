@@ -0,0 +1,31 @@
+import unittest
+import numpy as np
+from MonteCarloSearch import MonteCarloSearch
+from tests.slate import syntheticCSP, bruteForce, roster
+
+class MonteCarloSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.csp = syntheticCSP(0, salaryFloor=55000)
+        self.expected = set(roster(assignment) for projection, assignment in bruteForce(self.csp))
+
+    def test_distinct_feasible_canonical_lineups(self):
+        np.random.seed(0)
+        search = MonteCarloSearch(batchSize=20000)
+        search.solve(self.csp, 100, 2)
+        lineups = list(search.allAssignments)
+        self.assertEqual(len(lineups), 100)
+        self.assertEqual(len(set(roster(lineup) for lineup in lineups)), 100)
+        for lineup in lineups:
+            self.assertTrue(roster(lineup) in self.expected)
+            self.assertEqual(lineup, self.csp.canonical_assignment(lineup))
+
+    def test_gives_up_after_max_batches(self):
+        np.random.seed(1)
+        search = MonteCarloSearch(batchSize=20000, maxBatches=3)
+        search.solve(self.csp, 10**6, 1)
+        self.assertEqual(search.numBatches, 3)
+        self.assertTrue(set(roster(lineup) for lineup in search.allAssignments) <= self.expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import unittest
+from BacktrackSearch import BacktrackingSearch
+from ParallelSearch import ParallelBacktrackingSearch
+from tests.slate import syntheticCSP, bruteForce, feasible, roster
+from tests.test_BacktrackSearch import pausedSearch
+
+class ParallelSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.csp = syntheticCSP(0, salaryFloor=50000)
+
+    def lineups(self, search):
+        return [tuple(row) for row in search.allAssignments.indices().tolist()]
+
+    def test_tops_up_to_the_lineup_budget(self):
+        search = ParallelBacktrackingSearch(1, 4)
+        search.solve(self.csp, 200, .5, 2, seed=[3])
+        lineups = list(search.allAssignments)
+        self.assertEqual(len(lineups), 200)
+        self.assertEqual(len(set(roster(lineup) for lineup in lineups)), 200)
+        for lineup in lineups:
+            self.assertTrue(feasible(self.csp, lineup))
+
+    def test_stops_when_the_slate_runs_out(self):
+        csp = syntheticCSP(3, sizes={"QB": 2, "RB": 3, "WR": 4, "TE": 1, "PK": 1, "Def": 2})
+        search = ParallelBacktrackingSearch(1, 4)
+        search.solve(csp, 500, .5, 2, seed=[3])
+        self.assertEqual(len(search.allAssignments), len(bruteForce(csp)))
+        self.assertTrue(search.numRounds > 1)
+
+    def test_deterministic_search_runs_one_chunk(self):
+        search = ParallelBacktrackingSearch(1, 4)
+        search.solve(self.csp, 100, 1.0, 3, seed=[3])
+        self.assertEqual(search.chunkLineups, [100])
+        self.assertEqual(len(search.allAssignments), 100)
+
+    def test_output_does_not_depend_on_workers(self):
+        serial = ParallelBacktrackingSearch(1, 4)
+        serial.solve(self.csp, 150, .5, 2, seed=[7])
+        parallel = ParallelBacktrackingSearch(2, 4)
+        try:
+            parallel.solve(self.csp, 150, .5, 2, seed=[7])
+            pool = parallel.pool
+            self.assertTrue(pool is not None)
+            self.assertEqual(self.lineups(parallel), self.lineups(serial))
+            # the pool is kept for the next solve of the same CSP
+            parallel.solve(self.csp, 150, .5, 1, seed=[8])
+            self.assertTrue(parallel.pool is pool)
+        finally:
+            parallel.close()
+        self.assertTrue(parallel.pool is None)
+
+    def test_resume_splits_the_saved_frontier(self):
+        before, filename = pausedSearch(self.csp, 10**6, 20, 1.0, 2)
+        try:
+            # one part continues exactly as the saved search
+            serial = BacktrackingSearch()
+            serial.load_state(self.csp, filename)
+            expected = before + [roster(lineup) for lineup in serial.resume()]
+            search = ParallelBacktrackingSearch(1, 1)
+            search.resume(self.csp, filename)
+            self.assertEqual([roster(lineup) for lineup in search.allAssignments], expected)
+
+            search = ParallelBacktrackingSearch(2, 4)
+            try:
+                search.resume(self.csp, filename)
+            finally:
+                search.close()
+            self.assertTrue(len(search.chunkLineups) > 1)
+            lineups = [roster(lineup) for lineup in search.allAssignments]
+            self.assertEqual(lineups[:20], before)
+            self.assertEqual(len(lineups), len(expected))
+            self.assertEqual(set(lineups), set(expected))
+            self.assertEqual(search.allAssignments.dedupHits, 0)
+        finally:
+            os.remove(filename)
+
+if __name__ == '__main__':
+    unittest.main()
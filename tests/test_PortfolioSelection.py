@@ -0,0 +1,58 @@
+import itertools
+import unittest
+import numpy as np
+from PortfolioSelection import selectPortfolio
+
+def coverage(wins, selected):
+    return int(wins[selected].any(axis=0).sum()) if selected else 0
+
+def plainGreedy(wins, numSelected, priority):
+    # recomputes every gain each step; ties to the most wins, the higher
+    # priority, then the lower index
+    selected = []
+    while len(selected) < numSelected:
+        gains = [(coverage(wins, selected + [i]) - coverage(wins, selected), wins[i].sum(), priority[i], -i) \
+            for i in range(len(wins)) if i not in selected]
+        gain, numWins, p, i = max(gains)
+        if gain == 0:
+            break
+        selected.append(-i)
+    return selected
+
+class PortfolioSelectionTest(unittest.TestCase):
+
+    def test_lazy_greedy_matches_plain_greedy(self):
+        rng = np.random.RandomState(0)
+        for trial in range(20):
+            wins = rng.random_sample((30, 100)) < rng.uniform(0.02, 0.2)
+            priority = rng.randint(5, size=30).astype(float)
+            greedy = plainGreedy(wins, 10, priority)
+            selected = selectPortfolio(wins, 10, 'atLeastOne', priority)
+            self.assertEqual(selected[:len(greedy)], greedy)
+            self.assertEqual(len(selected), 10)
+            self.assertEqual(len(set(selected)), 10)
+
+    def test_greedy_is_near_optimal(self):
+        rng = np.random.RandomState(1)
+        wins = rng.random_sample((12, 40)) < 0.15
+        best = max(coverage(wins, list(subset)) for subset in itertools.combinations(range(12), 3))
+        selected = selectPortfolio(wins, 3, 'atLeastOne')
+        self.assertTrue(coverage(wins, selected) >= (1 - 1 / np.e) * best)
+
+    def test_covering_beats_stacking(self):
+        # lineups 0 and 1 win the same simulations; 2 wins others
+        wins = np.array([[1, 1, 1, 0, 0], [1, 1, 1, 0, 0], [0, 0, 0, 1, 1]], dtype=bool)
+        self.assertEqual(selectPortfolio(wins, 2, 'atLeastOne'), [0, 2])
+        self.assertEqual(selectPortfolio(wins, 2, 'expected'), [0, 1])
+        # once everything is covered the rest come in expected order
+        self.assertEqual(selectPortfolio(wins, 3, 'atLeastOne'), [0, 2, 1])
+
+    def test_expected_ties_go_to_priority(self):
+        wins = np.array([[1, 0], [0, 1], [1, 1]], dtype=bool)
+        self.assertEqual(selectPortfolio(wins, 3, 'expected', priority=[1.0, 2.0, 0.0]), [2, 1, 0])
+
+    def test_unknown_objective(self):
+        self.assertRaises(Exception, selectPortfolio, np.zeros((2, 2), dtype=bool), 1, 'median')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+from PlayerTable import PlayerTable
+from ScoreSimulation import playerSpreads, simulatePlayerScores, lineupScores, lineupWins, \
+    winProbabilities
+
+def slateTable():
+    # two teams of two players, and one player without a team or a range
+    return PlayerTable(['a', 'b', 'c', 'd', 'e'], [''] * 5, ['QB', 'WR', 'QB', 'WR', 'PK'], \
+        ['NE', 'NE', 'NYG', 'NYG', ''], [7000, 6000, 6500, 5500, 4500], \
+        [20.0, 15.0, 18.0, 12.0, 8.0], [0.0, 2.0, float('nan'), 0.0, 0.0], \
+        uppers=[30.0, 20.0, 22.0, 16.0, float('nan')], lowers=[16.0, 10.0, 14.0, 8.0, float('nan')])
+
+class ScoreSimulationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = slateTable()
+
+    def test_spreads(self):
+        above, below = playerSpreads(self.table, spread=0.5, riskScale=0.1)
+        np.testing.assert_allclose(above, [10.0, 5.0 * 1.2, 4.0, 4.0, 4.0])
+        np.testing.assert_allclose(below, [4.0, 5.0 * 1.2, 4.0, 4.0, 4.0])
+
+    def test_scores_are_skewed_around_the_projection(self):
+        np.random.seed(0)
+        scores = simulatePlayerScores(self.table, 40000)
+        self.assertEqual(scores.shape, (5, 40000))
+        self.assertEqual(scores.dtype, np.float32)
+        np.testing.assert_allclose(np.median(scores, axis=1), self.table.projections, atol=0.15)
+        # player a: one standard deviation is 10 above and 4 below
+        self.assertAlmostEqual(np.percentile(scores[0], 84.13), 30.0, delta=0.4)
+        self.assertAlmostEqual(np.percentile(scores[0], 15.87), 16.0, delta=0.2)
+
+    def test_teammates_are_correlated(self):
+        np.random.seed(1)
+        scores = simulatePlayerScores(self.table, 40000, teamCorrelation=0.5)
+        # the normal draws behind the scores, recovered through the spreads
+        above, below = playerSpreads(self.table)
+        offset = scores - self.table.projections[:, None]
+        z = np.where(offset > 0, offset / above[:, None], offset / below[:, None])
+        correlation = np.corrcoef(z)
+        self.assertAlmostEqual(correlation[0, 1], 0.5, delta=0.03)
+        self.assertAlmostEqual(correlation[2, 3], 0.5, delta=0.03)
+        self.assertAlmostEqual(correlation[0, 2], 0.0, delta=0.03)
+        self.assertAlmostEqual(correlation[0, 4], 0.0, delta=0.03)
+
+    def test_lineup_scores_and_wins(self):
+        np.random.seed(2)
+        scores = simulatePlayerScores(self.table, 100)
+        indices = np.array([[0, 1, 4], [2, 3, 4], [0, 3, 4]], dtype=np.int64)
+        expected = scores[indices].sum(axis=1)
+        np.testing.assert_allclose(lineupScores(indices, scores, chunkSize=2), expected, rtol=1e-6)
+        np.testing.assert_array_equal(lineupWins(indices, scores, 45.0, chunkSize=2), \
+            lineupScores(indices, scores) >= 45.0)
+
+    def test_win_probabilities_match_one_chunk_of_wins(self):
+        indices = np.array([[0, 1, 4], [2, 3, 4], [0, 3, 4]], dtype=np.int64)
+        np.random.seed(3)
+        probabilities = winProbabilities(self.table, indices, 500, 45.0, sampleChunk=500, lineupChunk=2)
+        np.random.seed(3)
+        wins = lineupWins(indices, simulatePlayerScores(self.table, 500), 45.0)
+        np.testing.assert_allclose(probabilities, wins.mean(axis=1))
+        # the best projected lineup wins most often
+        self.assertEqual(np.argmax(winProbabilities(self.table, indices, 5000, 45.0, sampleChunk=700)), 0)
+
+if __name__ == '__main__':
+    unittest.main()
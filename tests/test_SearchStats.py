@@ -0,0 +1,160 @@
+import pickle
+import random
+import unittest
+import numpy as np
+from BacktrackSearch import BacktrackingSearch
+from SearchStats import SearchStats, timedPhase, CUT_RULES
+from tests.slate import syntheticCSP
+
+def profiledWork(n):
+    return sum(i * i for i in range(n))
+
+def otherProfiledWork(n):
+    return sorted(range(n), reverse=True)
+
+def profiledFunctions(stats):
+    return set(name for filename, line, name in stats.profileReport().stats)
+
+class TimedPhaseTest(unittest.TestCase):
+
+    def test_without_stats(self):
+        ran = []
+        with timedPhase(None, 'parse'):
+            ran.append(True)
+        self.assertEqual(ran, [True])
+        def fail():
+            with timedPhase(None, 'parse'):
+                raise ValueError()
+        self.assertRaises(ValueError, fail)
+
+    def test_times_nested_phases(self):
+        stats = SearchStats()
+        for _ in range(2):
+            with timedPhase(stats, 'createCSP'):
+                with timedPhase(stats, 'parse'):
+                    profiledWork(1000)
+        with timedPhase(stats, 'search'):
+            pass
+        self.assertEqual(stats.phaseOrder, ['createCSP', 'parse', 'search'])
+        self.assertEqual(stats.phaseCalls, {'createCSP': 2, 'parse': 2, 'search': 1})
+        self.assertTrue(stats.phaseTimes['createCSP'] >= stats.phaseTimes['parse'] >= 0)
+        self.assertEqual(stats.openPhases, 0)
+        self.assertEqual(stats.profileReport(), None)
+
+    def test_phase_ends_on_error(self):
+        stats = SearchStats(profile=True)
+        def fail():
+            with timedPhase(stats, 'parse'):
+                profiledWork(10)
+                raise ValueError()
+        self.assertRaises(ValueError, fail)
+        self.assertEqual(stats.phaseCalls, {'parse': 1})
+        self.assertEqual(stats.openPhases, 0)
+        # only the phases are profiled
+        profiledWork(10)
+        otherProfiledWork(10)
+        functions = profiledFunctions(stats)
+        self.assertTrue('profiledWork' in functions)
+        self.assertFalse('otherProfiledWork' in functions)
+
+class MergeTest(unittest.TestCase):
+
+    def test_merge_adds_counters_and_profiles(self):
+        first = SearchStats(profile=True)
+        with timedPhase(first, 'search'):
+            profiledWork(100)
+        first.node(0)
+        first.node(1)
+        first.cut('overCap', 1, 3)
+        second = SearchStats(profile=True)
+        with timedPhase(second, 'parse'):
+            otherProfiledWork(100)
+        with timedPhase(second, 'search'):
+            pass
+        for depth in [0, 1, 2, 2]:
+            second.node(depth)
+        second.cut('overCap', 2, 2)
+        second.cut('duplicate', 9)
+        searchTime = first.phaseTimes['search'] + second.phaseTimes['search']
+
+        # as returned by a worker process
+        first.merge(pickle.loads(pickle.dumps(second, pickle.HIGHEST_PROTOCOL)))
+        self.assertEqual(first.phaseOrder, ['search', 'parse'])
+        self.assertEqual(first.phaseCalls, {'search': 2, 'parse': 1})
+        self.assertAlmostEqual(first.phaseTimes['search'], searchTime)
+        self.assertEqual(first.nodesAtDepth, [2, 2, 2])
+        expected = dict((rule, 0) for rule in CUT_RULES)
+        expected.update({'overCap': 5, 'duplicate': 1})
+        self.assertEqual(first.cuts, expected)
+        functions = profiledFunctions(first)
+        self.assertTrue('profiledWork' in functions)
+        self.assertTrue('otherProfiledWork' in functions)
+
+    def test_merge_into_empty_stats(self):
+        total = SearchStats()
+        part = SearchStats()
+        part.node(3)
+        part.cut('noValues', 3)
+        total.merge(part)
+        total.merge(part)
+        self.assertEqual(total.nodesAtDepth, [0, 0, 0, 2])
+        self.assertEqual(total.cuts['noValues'], 2)
+        self.assertEqual(total.profileReport(), None)
+
+class SearchCountersTest(unittest.TestCase):
+
+    def test_trace_and_linear_cuts(self):
+        csp = syntheticCSP(0, salaryFloor=58000)
+        search = BacktrackingSearch()
+        events = []
+        expected = []
+
+        def trace(event, depth, count):
+            events.append((event, depth, count))
+            if event != 'node':
+                return
+            self.assertEqual(depth, len(search.assignment))
+            self.assertEqual(count, 1)
+            if depth == csp.numVars:
+                return
+            # the values of the next variable outside the linear bounds,
+            # counted here from valueBounds rather than by cutCounts
+            var = search.get_unassigned_variable(search.assignment)
+            for c in search.linearOf[var]:
+                index = search.linearIndexes[c]
+                low, high = index.valueBounds(var, *search.linearBounds(c, var))
+                values = index.sortedValues[var]
+                below = int((values < low).sum())
+                above = int(((values > high) & (values >= low)).sum())
+                rows = index.feasibleRows(var, *search.linearBounds(c, var))
+                self.assertEqual(len(rows), len(values) - below - above)
+                if above:
+                    expected.append(('overCap', depth, above))
+                if below:
+                    expected.append(('floorUnreachable', depth, below))
+
+        np.random.seed(0)
+        random.seed(0)
+        stats = SearchStats(trace=trace)
+        search.solve(csp, 10**6, 1.0, 2, varOrder='mcv', stats=stats)
+        self.assertTrue(len(search.allAssignments) > 0)
+
+        linearCuts = [event for event in events if event[0] in ('overCap', 'floorUnreachable')]
+        self.assertEqual(linearCuts, expected)
+        for rule in ['overCap', 'floorUnreachable']:
+            self.assertTrue(stats.cuts[rule] > 0)
+            self.assertEqual(stats.cuts[rule], sum(count for event, depth, count in expected if event == rule))
+
+        # every counted node and cut went through the trace
+        nodesAtDepth = [0] * len(stats.nodesAtDepth)
+        cuts = dict((rule, 0) for rule in CUT_RULES)
+        for event, depth, count in events:
+            if event == 'node':
+                nodesAtDepth[depth] += count
+            else:
+                cuts[event] += count
+        self.assertEqual(nodesAtDepth, stats.nodesAtDepth)
+        self.assertEqual(cuts, stats.cuts)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import copy
+import unittest
+import benchmark
+from benchmark import compareResults
+
+def run(configuration, week, **fields):
+    result = {
+        'configuration': configuration,
+        'week': week,
+        'wallTime': 1.0,
+        'nodes': 1000,
+        'lineups': 10,
+        'bestProjection': 150.0,
+        'averageProjection': 140.0,
+        'searchMemory': 20000,
+    }
+    result.update(fields)
+    return result
+
+class CompareResultsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.baseline = {'results': [run('backtrack', 1), run('backtrack', 2), run('genetic', 1, wallTime=2.0)]}
+
+    def current(self, changes):
+        # the baseline with some fields of some runs replaced
+        current = copy.deepcopy(self.baseline)
+        for result in current['results']:
+            result.update(changes.get((result['configuration'], result['week']), {}))
+        return current
+
+    def test_identical_results(self):
+        self.assertEqual(compareResults(self.baseline, copy.deepcopy(self.baseline)), [])
+
+    def test_no_regression_within_tolerance(self):
+        current = self.current({
+            ('backtrack', 1): {'wallTime': 1.1, 'nodes': 1050, 'searchMemory': 20000 * (1 + benchmark.memoryTolerance)},
+            ('backtrack', 2): {'lineups': 12, 'bestProjection': 151.0, 'averageProjection': 140.0 - benchmark.projectionTolerance / 2},
+            ('genetic', 1): {'wallTime': 1.5, 'searchMemory': 20000 + benchmark.memorySlack},
+        })
+        self.assertEqual(compareResults(self.baseline, current), [])
+
+    def test_runs_missing_from_the_baseline_are_skipped(self):
+        current = copy.deepcopy(self.baseline)
+        current['results'].append(run('backtrack', 3, lineups=0, bestProjection=None, averageProjection=None, wallTime=100.0))
+        self.assertEqual(compareResults(self.baseline, current), [])
+
+    def test_per_run_regressions(self):
+        current = self.current({
+            ('backtrack', 1): {'lineups': 9, 'bestProjection': 149.0},
+            ('backtrack', 2): {'averageProjection': None},
+        })
+        regressions = compareResults(self.baseline, current)
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(regressions[0].startswith('backtrack week 1: 9 lineups'))
+        self.assertTrue(regressions[1].startswith('backtrack week 1: bestProjection 149.0'))
+        self.assertTrue(regressions[2].startswith('backtrack week 2: averageProjection None'))
+
+    def test_per_configuration_regressions(self):
+        # week 1 alone is 50% slower but the configuration's total is only 25% slower
+        current = self.current({
+            ('backtrack', 1): {'wallTime': 1.5},
+            ('genetic', 1): {'nodes': 700, 'searchMemory': 30000},
+        })
+        regressions = compareResults(self.baseline, current)
+        self.assertEqual(len(regressions), 4)
+        self.assertTrue(regressions[0].startswith('backtrack: total wall time 2.500s'))
+        self.assertTrue(regressions[1].startswith('backtrack: 800 nodes per second'))
+        self.assertTrue(regressions[2].startswith('genetic: 350 nodes per second'))
+        self.assertEqual(regressions[3], 'genetic: 30000 kB of search memory, was 20000 kB')
+
+    def test_memory_compares_the_largest_run(self):
+        current = self.current({('backtrack', 2): {'searchMemory': 5000}})
+        current['results'][0]['searchMemory'] = 30000
+        self.assertEqual(compareResults(self.baseline, current), ['backtrack: 30000 kB of search memory, was 20000 kB'])
+        current = self.current({('backtrack', 2): {'searchMemory': 24000}})
+        current['results'][0]['searchMemory'] = 5000
+        self.assertEqual(compareResults(self.baseline, current), [])
+
+    def test_baseline_without_search_memory(self):
+        for result in self.baseline['results']:
+            del result['searchMemory']
+        current = self.current({})
+        for result in current['results']:
+            result['searchMemory'] = 10**6
+        self.assertEqual(compareResults(self.baseline, current), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import numpy as np
+from createCSP import CSP, RankOrderFactor
+
+class SymmetryFactorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.domain = [('a', 300, 1.0, 0), ('b', 100, 2.0, 0), ('c', 200, 3.0, 0)]
+        self.csp = CSP()
+        for var in ['X', 'Y']:
+            self.csp.add_variable(var, list(self.domain))
+        self.csp.add_symmetry_group(['X', 'Y'], key=lambda val: val[1])
+
+    def test_factor_orders_by_key(self):
+        forward = self.csp.binaryFactors['X']['Y']
+        backward = self.csp.binaryFactors['Y']['X']
+        self.assertTrue(isinstance(forward, RankOrderFactor))
+        for x in self.domain:
+            for y in self.domain:
+                self.assertEqual(forward[x][y], float(x[1] < y[1]))
+                self.assertEqual(backward[y][x], forward[x][y])
+        dense = np.array([[forward[x][y] != 0 for y in self.domain] for x in self.domain])
+        np.testing.assert_array_equal(forward.compatible(self.domain, self.domain), dense)
+
+    def test_merging_another_factor(self):
+        self.csp.add_binary_factor('X', 'Y', lambda x, y: x[0] != 'c')
+        forward = self.csp.binaryFactors['X']['Y']
+        self.assertTrue(isinstance(forward, dict))
+        for x in self.domain:
+            for y in self.domain:
+                self.assertEqual(forward[x][y], float(x[1] < y[1] and x[0] != 'c'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import cPickle as pickle
+import shutil
+import tempfile
+import unittest
+import parseCache
+from parseCache import cachedParse
+
+class ParseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'week.txt')
+        self.write('a 1\nb 2\n')
+        self.calls = []
+        parseCache.memo.clear()
+
+    def tearDown(self):
+        parseCache.memo.clear()
+        shutil.rmtree(self.directory)
+
+    def write(self, text, mtime = 1000000000):
+        with open(self.path, 'w') as outputfile:
+            outputfile.write(text)
+        os.utime(self.path, (mtime, mtime))
+
+    def parser(self, version = 1):
+        @cachedParse(version)
+        def parseWeek(filename):
+            self.calls.append(filename)
+            with open(filename) as inputfile:
+                return dict(line.split() for line in inputfile)
+        return parseWeek
+
+    def test_memo_and_disk_cache(self):
+        parse = self.parser()
+        self.assertEqual(parse(self.path), {'a': '1', 'b': '2'})
+        self.assertEqual(parse(self.path), {'a': '1', 'b': '2'})
+        self.assertEqual(len(self.calls), 1)
+        # a new process only has the disk cache
+        parseCache.memo.clear()
+        self.assertEqual(parse(self.path), {'a': '1', 'b': '2'})
+        self.assertEqual(len(self.calls), 1)
+        self.assertTrue(os.path.isdir(os.path.join(self.directory, '.parsecache')))
+
+    def test_changed_file_is_parsed_again(self):
+        parse = self.parser()
+        parse(self.path)
+        self.write('a 1\nb 3\n', mtime=1000000100)
+        parseCache.memo.clear()
+        self.assertEqual(parse(self.path), {'a': '1', 'b': '3'})
+        # same size, only the mtime differs
+        self.write('a 1\nb 4\n', mtime=1000000200)
+        self.assertEqual(parse(self.path), {'a': '1', 'b': '4'})
+        self.assertEqual(len(self.calls), 3)
+
+    def test_version_bump_is_parsed_again(self):
+        self.parser(1)(self.path)
+        parseCache.memo.clear()
+        self.parser(2)(self.path)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_corrupt_cache_is_parsed_again(self):
+        parse = self.parser()
+        parse(self.path)
+        cacheDir = os.path.join(self.directory, '.parsecache')
+        cachePaths = [os.path.join(cacheDir, name) for name in os.listdir(cacheDir)]
+        with open(cachePaths[0], 'rb') as cacheFile:
+            valid = cacheFile.read()
+        corrupt = [
+            'not a pickle',                       # UnpicklingError
+            valid[:len(valid) // 2],              # truncated
+            'cnoSuchModule\nThing\n.',            # ImportError
+            'cparseCache\nnoSuchName\n.',         # AttributeError
+            pickle.dumps((1, 2, 3)),              # ValueError on unpacking
+            pickle.dumps(1),                      # TypeError on unpacking
+        ]
+        for i, contents in enumerate(corrupt):
+            for cachePath in cachePaths:
+                with open(cachePath, 'wb') as cacheFile:
+                    cacheFile.write(contents)
+            parseCache.memo.clear()
+            self.assertEqual(parse(self.path), {'a': '1', 'b': '2'})
+            self.assertEqual(len(self.calls), i + 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import random
+import unittest
+import numpy as np
+from LineupSet import LineupSet
+from printProjectedResults import printProjectedResults
+from tests.slate import syntheticCSP, bruteForce
+
+def baselineResults(lineups, scores, projections, percentLineupsUsed, winnerThreshold, selected = None):
+    # the per-lineup loops printProjectedResults replaced
+    computedScores = []
+    computedProjections = []
+    for assignment in lineups:
+        computedScores.append(sum(scores[assignment[position][0]] for position in assignment))
+        computedProjections.append(sum(projections[assignment[position][0]] for position in assignment \
+            if assignment[position][0] in projections))
+    computedProjections = np.array(computedProjections)
+    s = len(computedProjections)
+    if selected is None:
+        maxIndices = computedProjections.argsort()[-int(s*percentLineupsUsed):]
+    else:
+        maxIndices = selected
+    numWinners = 0
+    for i in maxIndices:
+        if computedScores[i] >= winnerThreshold:
+            numWinners += 1
+    return numWinners, len(maxIndices)
+
+class Search():
+    def __init__(self, allAssignments):
+        self.allAssignments = allAssignments
+
+class PrintProjectedResultsTest(unittest.TestCase):
+
+    def setUp(self):
+        csp = syntheticCSP(0)
+        rng = random.Random(0)
+        self.lineupSet = LineupSet(csp)
+        for projection, assignment in bruteForce(csp)[:300]:
+            self.lineupSet.append(assignment)
+        names = [val[0] for val in csp.playerTable.tuples]
+        self.scores = dict((name, rng.uniform(0, 25)) for name in names)
+        # distinct projections, so the top fraction is the same however ties are broken;
+        # one player has none and counts 0
+        self.projections = dict((name, rng.uniform(0, 25)) for name in names[1:])
+        # about half the lineups win
+        self.threshold = np.median(self.lineupSet.scoreTotals(self.scores))
+
+    def compare(self, percentLineupsUsed, selected = None):
+        expected = baselineResults(list(self.lineupSet), self.scores, self.projections, \
+            percentLineupsUsed, self.threshold, selected)
+        for lineups in [self.lineupSet, list(self.lineupSet)]:
+            self.assertEqual(printProjectedResults(Search(lineups), self.scores, 1, self.projections, \
+                percentLineupsUsed, self.threshold, selected), expected)
+        return expected
+
+    def test_top_fractions(self):
+        for percentLineupsUsed in [0.1, 0.25, 0.5, 1.0]:
+            numWinners, total = self.compare(percentLineupsUsed)
+            self.assertEqual(total, int(300 * percentLineupsUsed))
+            self.assertTrue(0 < numWinners < total)
+
+    def test_fraction_rounding_to_no_lineups_keeps_all(self):
+        self.assertEqual(self.compare(0.001)[1], 300)
+
+    def test_selected(self):
+        self.assertEqual(self.compare(0.1, selected=[3, 1, 4, 15, 92, 65, 35])[1], 7)
+
+    def test_missing_score(self):
+        lineup = self.lineupSet[0]
+        del self.scores[lineup['QB'][0]]
+        for lineups in [self.lineupSet, list(self.lineupSet)]:
+            self.assertRaises(KeyError, printProjectedResults, Search(lineups), self.scores, 1, \
+                self.projections, 0.5)
+
+if __name__ == '__main__':
+    unittest.main()